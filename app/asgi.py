@@ -0,0 +1,92 @@
+"""
+ASGI entry point, e.g. `uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2 --no-proxy-headers` (run from ./app).
+X-Forwarded-For is left to ProxyFix and TRUSTED_PROXY_HOPS, uvicorn would trust it from 127.0.0.1 by default.
+
+Serves the same Flask app. The event loop holds the connections, so slow or idle clients
+don't tie anything up, and each request only borrows one of ASGI_THREADS pool threads
+while the view (and its DB access) runs. /stream-status only borrows one to open the stream,
+the event loop sends the changes after that. Needs `pip install uvicorn a2wsgi`.
+"""
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError as e:
+    raise ImportError("The ASGI entry point needs a2wsgi and an ASGI server: pip install uvicorn a2wsgi") from e
+
+import asyncio
+import time
+from main import app as flask_app
+from modules.blueprints.stream_status import ASGI_HANDOFF, KEEPALIVE_S, changes
+from modules.utils.gv import ASGI_THREADS, STREAM_MAX_S
+from modules.utils.status_bus import Subscription
+
+def _terminated_input(environ, start_response):
+    #* a2wsgi's wsgi.input ends where the request body does, but without this flag Werkzeug
+    #* treats bodies without a Content-Length (chunked) as empty instead of reading them
+    environ["wsgi.input_terminated"] = True
+    return flask_app(environ, start_response)
+
+
+wsgi = WSGIMiddleware(_terminated_input, workers=ASGI_THREADS)
+
+
+async def _disconnected(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def stream_status(scope, receive, send) -> None:
+    """
+    /stream-status: the Flask view runs as usual (limits, validation, the start of the stream) and
+    hands the subscription over through the scope; the rest of the stream is sent from here.
+    """
+    handoff: list[tuple[Subscription, int | None]] = []
+    status = 0
+    held = None  # a2wsgi's last body message, it would end the response
+
+    async def send_start(message) -> None:
+        nonlocal status, held
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            held = message
+            return
+        await send(message)
+
+    await wsgi({**scope, ASGI_HANDOFF: handoff}, receive, send_start)
+    if not handoff:
+        if held is not None:
+            await send(held)
+        return
+
+    subscription, icon_size = handoff[0]
+    if status != 200 or held is None:
+        subscription.close()
+        if held is not None:
+            await send(held)
+        return
+
+    disconnected = asyncio.ensure_future(_disconnected(receive))
+    try:
+        await send({"type": "http.response.body", "body": held.get("body", b""), "more_body": True})
+        deadline = time.monotonic() + STREAM_MAX_S
+        while (left := deadline - time.monotonic()) > 0:
+            waiting = asyncio.ensure_future(subscription.wait_async(min(KEEPALIVE_S, left)))
+            await asyncio.wait((waiting, disconnected), return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                waiting.cancel()
+                return
+            events = waiting.result()
+            await send({"type": "http.response.body", "body": changes(subscription, events, icon_size).encode(), "more_body": True})
+            if events:
+                subscription.advance(events[-1].seq)  # only once the server has taken the events
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "http" and scope["path"] == "/stream-status":
+        await stream_status(scope, receive, send)
+    else:
+        await wsgi(scope, receive, send)
@@ -0,0 +1,86 @@
+"""
+gunicorn settings, picked up automatically when running `gunicorn` from ./app.
+
+GUNICORN_PROFILE picks the worker setup (see PROFILES), GUNICORN_WORKERS / GUNICORN_THREADS
+override the counts derived from the CPU count and GUNICORN_BIND the address.
+Anything passed on the command line still wins over this file.
+"""
+import multiprocessing
+from modules.utils.gv import GUNICORN_BIND, GUNICORN_PROFILE, GUNICORN_THREADS, GUNICORN_WORKERS, HISTORY_ENABLED, STATUS_BUS_ENABLED, STREAM_MAX_S
+
+CPUS = multiprocessing.cpu_count()
+
+# profile -> (app, worker class, workers, threads per worker or None if the worker class doesn't use them)
+PROFILES: dict[str, tuple[str, str, int, int | None]] = {
+    "sync": ("main:app", "sync", CPUS * 2 + 1, 1),  # one request per process, like plain `gunicorn main:app`
+    "gthread": ("main:app", "gthread", CPUS + 1, 4),  # threads wait on the DB/network while others run, keep-alive works
+    "asgi": ("asgi:app", "uvicorn.workers.UvicornWorker", CPUS + 1, None),  # needs uvicorn + a2wsgi, threads come from ASGI_THREADS
+}
+
+if GUNICORN_PROFILE not in PROFILES:
+    raise ValueError(f"Unknown GUNICORN_PROFILE \"{GUNICORN_PROFILE}\" (expected {', '.join(PROFILES)})")
+
+wsgi_app, worker_class, _workers, _threads = PROFILES[GUNICORN_PROFILE]
+
+bind = GUNICORN_BIND
+workers = GUNICORN_WORKERS or _workers
+if _threads is not None:
+    threads = GUNICORN_THREADS or _threads
+
+#* uvicorn workers would take the client address from X-Forwarded-For themselves on connections from
+#* forwarded_allow_ips (127.0.0.1 by default). Only ProxyFix may do that, with TRUSTED_PROXY_HOPS (see main.create_app)
+if GUNICORN_PROFILE == "asgi":
+    forwarded_allow_ips = ""
+
+#* import the app once in the master, workers are forked from it with everything already loaded
+preload_app = True
+
+#* recycle workers now and then so slow leaks can't build up, the jitter keeps them from all restarting at once
+max_requests = 5000
+max_requests_jitter = 500
+
+#* a sync worker can't check in with the master while it serves a request, so a /stream-status
+#* connection (open for up to STREAM_MAX_S) would get it killed as stuck. gthread and uvicorn workers
+#* check in from their main loop whatever the requests are doing
+timeout = int(STREAM_MAX_S) + 30 if STATUS_BUS_ENABLED and worker_class == "sync" else 30
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server) -> None:
+    # runs in the master after the app is loaded, before any worker is forked:
+    # create/migrate the schemas once here, then close everything so no connection is inherited
+    from modules.utils import database, history_db, telemetry_db
+
+    database.get_db()
+    telemetry_db.get_db()
+    if HISTORY_ENABLED:
+        history_db.get_db()
+    database.close_db()
+    telemetry_db.close_db()
+    history_db.close_db()
+    server.log.info(f"Database schemas ready, starting {workers} {worker_class} workers ({GUNICORN_PROFILE} profile)")
+
+
+def post_fork(server, worker) -> None:
+    # each worker creates its own engines on first use (the schema is already there, so that's cheap)
+    from modules.utils import database, group_presence, history_db, status_webhooks, telemetry_db
+    from main import start_background_tasks
+
+    database.reset_db()
+    telemetry_db.reset_db()
+    history_db.reset_db()
+    status_webhooks.reset_queue()
+    group_presence.reset_presence()
+    start_background_tasks()
+
+
+def worker_exit(server, worker) -> None:
+    # write out buffered statuses (STATUS_COALESCE_MS) and heartbeats (history) before the worker goes away
+    from modules.utils import database, group_presence, history_db, status_webhooks, telemetry_db
+
+    database.close_db()
+    telemetry_db.close_db()
+    history_db.close_db()
+    status_webhooks.close_queue()  # lets deliveries in progress finish
+    group_presence.close_presence()
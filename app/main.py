@@ -1,57 +1,123 @@
 # stdlib
+import os
 import sys
 # 3rd party
 from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.errors import RateLimitExceeded
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.middleware.proxy_fix import ProxyFix
 # local
 from modules.blueprint_tools import create_blueprints
-from modules.utils.gv import RATE_LIMITING, TELEMETRY_DISCORD_WEBHOOK_URL
+from modules.utils.gv import MAX_REQUEST_BYTES, RATE_LIMITING, TELEMETRY_DISCORD_WEBHOOK_URL, TRUSTED_PROXY_HOPS, WEBHOOKS_ENABLED
+from modules.utils import status_webhooks
 from modules.utils.telemetry import start_telemetry
 from modules.utils.telemetry_db import db
-from modules.utils.request import _get_client_ip, remote_addr
+from modules.utils.request import client_ip
 from modules.utils.logger import logger
+from modules.utils.json_provider import FastJSONProvider
+from modules.utils.limiter_storage import limiter_settings
+
+#* pid of the process the background threads were started in, threads don't survive a fork
+_background_pid: int | None = None
+
+
+def start_background_tasks() -> None:
+    global _background_pid
+    if _background_pid == os.getpid():
+        return
+    _background_pid = os.getpid()
+
+    #* this will only start if the URL provided is not None,
+    #* and TELEMETRY_DISCORD_WEBHOOK_URL is None if not provided
+    start_telemetry(TELEMETRY_DISCORD_WEBHOOK_URL)
+
+    #* every worker runs a dispatcher, but only the one holding the lease sends
+    if WEBHOOKS_ENABLED:
+        status_webhooks.get_queue().start()
+
+
+def create_app() -> Flask:
+    """
+    Builds the app without touching the databases or starting threads: the databases are created
+    on first use, and background tasks start with the first request of each process.
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+    CORS(app)
+
+    #* behind N reverse proxies, take the client address from X-Forwarded-For (only the entries those proxies added)
+    if TRUSTED_PROXY_HOPS > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
+    @app.before_request
+    def background_tasks() -> None:
+        start_background_tasks()
+
+    @app.after_request
+    def telemetry_logger(response: Response) -> Response:
+        ip: str = client_ip()
+        endpoint: str = request.path
+        method: str = request.method
+        status: int = response.status_code
+
+        if not "favicon.ico" in endpoint:
+            db.log_request(ip=ip, endpoint=endpoint, method=method, status=status)
+
+        return response #? no clue why i need to do this
+
+    #* the limiter reads the body for user-keyed limits before the view runs,
+    #* so oversized bodies can also be rejected there
+    @app.errorhandler(RequestEntityTooLarge)
+    def request_too_large_handler(e: RequestEntityTooLarge):
+        return jsonify({'error': f'Request body too large (max {MAX_REQUEST_BYTES} bytes)'}), 413
+
+    limiter = None
+    if RATE_LIMITING:
+        storage_uri, strategy = limiter_settings()
+        limiter = Limiter(
+            app=app,
+            key_func=client_ip,
+            storage_uri=storage_uri,
+            strategy=strategy,
+        )
+
+        @app.errorhandler(RateLimitExceeded)
+        def ratelimit_handler(e: RateLimitExceeded):
+            logger.warning(f"User {client_ip()} has exceeded rate limit of \"{e.description}\" for endpoint {request.path}")
+            return jsonify({
+                "error": "rate_limit_exceeded",
+                "message": str(e.description)
+            }), 429
+
+    for bp in create_blueprints(limiter):
+        if bp is not None:
+            app.register_blueprint(bp)
+
+    return app
+
+
+_app: Flask | None = None
+
+
+def get_app() -> Flask:
+    """The app served by gunicorn/uvicorn/the dev server, built on first use."""
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+def __getattr__(name: str) -> Flask:
+    #* `gunicorn main:app` and `from main import app` build the app here on first access,
+    #* so a plain `import main` doesn't create the limiter (or its storage) or anything else
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-app = Flask(__name__)
-CORS(app)
-
-#* this will only start if the URL provided is not None,
-#* and TELEMETRY_DISCORD_WEBHOOK_URL is None if not provided
-start_telemetry(TELEMETRY_DISCORD_WEBHOOK_URL)
-
-@app.after_request
-def telemetry_logger(response: Response) -> Response:
-    ip: str = str(remote_addr)
-    endpoint: str = request.path
-    method: str = request.method
-    status: int = response.status_code
-
-    if not "favicon.ico" in endpoint:
-        db.log_request(ip=ip, endpoint=endpoint, method=method, status=status)
-
-    return response #? no clue why i need to do this
-
-limiter = None
-if RATE_LIMITING:
-    limiter = Limiter(
-        app=app,
-        key_func=_get_client_ip,
-        storage_uri="memcached://localhost:11211",
-    )
-
-    @app.errorhandler(RateLimitExceeded)
-    def ratelimit_handler(e: RateLimitExceeded):
-        logger.warning(f"User {remote_addr} has exceeded rate limit of \"{e.description}\" for endpoint {request.path}")
-        return jsonify({
-            "error": "rate_limit_exceeded",
-            "message": str(e.description)
-        }), 429
-
-for bp in create_blueprints(limiter):
-    if bp is not None:
-        app.register_blueprint(bp)
 
 if __name__ == '__main__':
     i = input("Type 1 to start development server, 0 to cancel (default 1): ")
-    sys.exit(0) if i == '0' else app.run(host='127.0.0.1', port=5000, debug=False)
+    sys.exit(0) if i == '0' else get_app().run(host='127.0.0.1', port=5000, debug=False)
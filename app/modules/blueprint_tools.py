@@ -1,57 +1,136 @@
-from flask import Blueprint
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Callable, Literal
+from flask import Blueprint, Response, g, request
 from flask_limiter import Limiter
-from .blueprints import update_status, get_status, healthcheck, trigger_rate_limit, register_user, delete_user, check_if_user_exists
+from limits import parse_many
+from modules.utils.gv import ADMIN_TOKEN, GROUPS_ENABLED, MAX_REQUEST_BYTES, HISTORY_ENABLED, STATUS_BUS_ENABLED, WEBHOOKS_ENABLED, route_limit_override
+from modules.utils import route_metrics
+from modules.utils.request import client_ip
+from modules.utils.request_cost import COST_NORMAL, LIMIT_HEADROOM, current_cost, response_cost
+from .blueprints import update_status, get_status, healthcheck, trigger_rate_limit, register_user, delete_user, check_if_user_exists, icons, resolve_icons, get_stats, stream_status, register_webhook, delete_webhook, join_group, leave_group, group_status, admin_telemetry, admin_metrics
 
-def create_blueprints(limiter: Limiter | None) -> list[Blueprint | None]:
-    if limiter:
-        hc_blueprint = Blueprint('health_check', __name__)
-        hc_blueprint.route('/', methods=['GET'])(limiter.limit("60 per minute")(healthcheck.route))
 
-        us_blueprint = Blueprint('update_status', __name__)
-        us_blueprint.route('/update-status', methods=['POST'])(limiter.limit("30 per minute")(update_status.route))
+@dataclass(frozen=True)
+class RouteSpec:
+    name: str  # blueprint name, also used for the RATE_LIMIT_<NAME> .env override
+    path: str
+    methods: tuple[str, ...]
+    handler: Callable[..., tuple[Response, int]]
+    limit: str | None = None
+    limit_by: Literal["ip", "user"] = "ip"  # "user" keys the limit by userId + token instead of by IP
+    ip_limit: str | None = None  # per-IP backstop for user-keyed routes (otherwise rotating tokens would dodge the limit)
+    cache_max_age: int | None = None  # seconds successful responses may be cached for, None = not cacheable
+    auth: bool = False  # needs the user's token in the Authorization header
+    requires_limiter: bool = False  # only registered when rate limiting is enabled
+    requires_history: bool = False  # only registered when HISTORY_ENABLED is set
+    requires_status_bus: bool = False  # only registered when STATUS_BUS_ENABLED is set
+    requires_webhooks: bool = False  # only registered when WEBHOOKS_ENABLED is set
+    requires_groups: bool = False  # only registered when GROUPS_ENABLED is set
+    requires_admin_token: bool = False  # only registered when ADMIN_TOKEN is set
+    metrics: bool = True
 
-        gs_blueprint = Blueprint('get_status', __name__)
-        gs_blueprint.route('/get-status', methods=['GET'])(limiter.limit("45 per minute")(get_status.route))
 
-        ru_blueprint = Blueprint('register_user', __name__)
-        ru_blueprint.route('/register-user', methods=['POST'])(limiter.limit("5 per day")(register_user.route))
+ROUTES: list[RouteSpec] = [
+    RouteSpec("health_check", "/", ("GET",), healthcheck.route, limit="60 per minute"),
+    RouteSpec("update_status", "/update-status", ("POST",), update_status.route, limit="30 per minute", limit_by="user", ip_limit="120 per minute", auth=True),
+    RouteSpec("get_status", "/get-status", ("GET",), get_status.route, limit="45 per minute", cache_max_age=5),
+    RouteSpec("register_user", "/register-user", ("POST",), register_user.route, limit="5 per day", auth=True),
+    RouteSpec("delete_user", "/delete-user", ("DELETE",), delete_user.route, limit="10 per day", limit_by="user", ip_limit="30 per day", auth=True),
+    RouteSpec("check_if_user_exists", "/check-if-user-exists", ("GET",), check_if_user_exists.route, limit="45 per minute", cache_max_age=30),
+    RouteSpec("icons", "/icons/<name>.png", ("GET",), icons.route, limit="600 per minute"),
+    RouteSpec("icon_variants", "/icons/<int:size>/<name>.png", ("GET",), icons.route, limit="600 per minute"),
+    RouteSpec("icon_sprite_index", "/icons/sprite.json", ("GET",), icons.sprite_index_route, limit="60 per minute"),
+    RouteSpec("get_stats", "/get-stats", ("GET",), get_stats.route, limit="30 per minute", cache_max_age=60, requires_history=True),
+    RouteSpec("stream_status", "/stream-status", ("GET",), stream_status.route, limit="10 per minute", requires_status_bus=True),
+    RouteSpec("register_webhook", "/register-webhook", ("POST",), register_webhook.route, limit="10 per day", limit_by="user", ip_limit="30 per day", auth=True, requires_webhooks=True),
+    RouteSpec("delete_webhook", "/delete-webhook", ("DELETE",), delete_webhook.route, limit="10 per day", limit_by="user", ip_limit="30 per day", auth=True, requires_webhooks=True),
+    RouteSpec("join_group", "/join-group", ("POST",), join_group.route, limit="20 per day", limit_by="user", ip_limit="60 per day", auth=True, requires_groups=True),
+    RouteSpec("leave_group", "/leave-group", ("DELETE",), leave_group.route, limit="20 per day", limit_by="user", ip_limit="60 per day", auth=True, requires_groups=True),
+    RouteSpec("group_status", "/group-status", ("GET",), group_status.route, limit="45 per minute", cache_max_age=5, requires_groups=True),
+    RouteSpec("resolve_icons", "/resolve-icons", ("POST",), resolve_icons.route, limit="30 per minute"),
+    RouteSpec("admin_telemetry", "/admin/telemetry", ("GET",), admin_telemetry.route, limit="60 per minute", auth=True, requires_admin_token=True),
+    RouteSpec("admin_metrics", "/admin/metrics", ("GET",), admin_metrics.route, limit="60 per minute", auth=True, requires_admin_token=True),
+    RouteSpec("trigger_rate_limit", "/trigger-rate-limit", ("GET",), trigger_rate_limit.route, limit="1 per minute", requires_limiter=True),
+]
 
-        du_blueprint = Blueprint('delete_user', __name__)
-        du_blueprint.route('/delete-user', methods=['DELETE'])(limiter.limit("10 per day")(delete_user.route))
 
-        ciue_blueprint = Blueprint('check_if_user_exists', __name__)
-        ciue_blueprint.route('/check-if-user-exists', methods=['GET'])(limiter.limit("45 per minute")(check_if_user_exists.route))
+def _user_key() -> str:
+    # runs before the view's size checks (load_json_body), so only bodies that are known to be small
+    # are parsed here. Oversized or chunked ones are keyed by IP and rejected or read carefully by the view
+    data = None
+    if request.content_length is not None and request.content_length <= MAX_REQUEST_BYTES:
+        data = request.get_json(silent=True)  # cached by Flask, the view doesn't parse the body again
+    user_id = data.get("userId") if isinstance(data, dict) else None
+    auth_token = request.headers.get("Authorization")
 
-        trl_blueprint = Blueprint('trigger_rate_limit', __name__)
-        trl_blueprint.route('/trigger-rate-limit', methods=['GET'])(limiter.limit("1 per minute")(trigger_rate_limit.route))
+    if not isinstance(user_id, str) or not user_id or not auth_token:
+        return f"ip:{client_ip()}"  # will be rejected by the view anyway
 
-    else:
-        hc_blueprint = Blueprint('health_check', __name__)
-        hc_blueprint.route('/', methods=['GET'])(healthcheck.route)
+    # include the token so someone who only knows a userId can't use up that user's limit
+    return f"user:{user_id}:{hashlib.sha256(auth_token.encode()).hexdigest()[:16]}"
 
-        us_blueprint = Blueprint('update_status', __name__)
-        us_blueprint.route('/update-status', methods=['POST'])(update_status.route)
 
-        gs_blueprint = Blueprint('get_status', __name__)
-        gs_blueprint.route('/get-status', methods=['GET'])(get_status.route)
+def _scaled_limit(limit: str) -> str:
+    # limits are written in normal requests, but deductions are in request_cost units
+    return ";".join(f"{item.amount * COST_NORMAL + LIMIT_HEADROOM} per {item.multiples} {item.GRANULARITY.name}" for item in parse_many(limit))
 
-        ru_blueprint = Blueprint('register_user', __name__)
-        ru_blueprint.route('/register-user', methods=['POST'])(register_user.route)
 
-        du_blueprint = Blueprint('delete_user', __name__)
-        du_blueprint.route('/delete-user', methods=['DELETE'])(delete_user.route)
+def _apply_limit(limiter: Limiter, view: Callable, limit: str, key_func: Callable[[], str] | None) -> Callable:
+    return limiter.limit(
+        _scaled_limit(limit),
+        key_func=key_func,
+        cost=current_cost,
+        deduct_when=lambda response: response.status_code != 429,  # deducted after the view, once the cost is known
+        error_message=limit,
+    )(view)
 
-        ciue_blueprint = Blueprint('check_if_user_exists', __name__)
-        ciue_blueprint.route('/check-if-user-exists', methods=['GET'])(check_if_user_exists.route)
 
-        trl_blueprint = None  # useless if rate limiting is off
+def _cache_control(spec: RouteSpec, response: Response) -> None:
+    if "Cache-Control" in response.headers:
+        return
+    if spec.auth:
+        response.headers["Cache-Control"] = "no-store"
+    elif spec.cache_max_age is not None and response.status_code == 200:
+        response.headers["Cache-Control"] = f"public, max-age={spec.cache_max_age}"
 
+
+def _create_blueprint(spec: RouteSpec, limiter: Limiter | None) -> Blueprint:
+    blueprint = Blueprint(spec.name, __name__)
+
+    view = spec.handler
+    if limiter and spec.limit:
+        key_func = _user_key if spec.limit_by == "user" else None  # None = limiter's default (client IP)
+        view = _apply_limit(limiter, view, route_limit_override(spec.name) or spec.limit, key_func)
+        if spec.ip_limit:
+            view = _apply_limit(limiter, view, route_limit_override(f"{spec.name}_ip") or spec.ip_limit, None)
+
+    blueprint.route(spec.path, methods=list(spec.methods))(view)
+
+    @blueprint.before_request
+    def _start_timer() -> None:
+        g.route_started = time.perf_counter()
+
+    @blueprint.after_request
+    def _finish(response: Response) -> Response:
+        g.limit_cost = response_cost(response)
+        _cache_control(spec, response)
+        if spec.metrics and "route_started" in g:
+            route_metrics.record(spec.path, response.status_code, (time.perf_counter() - g.route_started) * 1000)
+        return response
+
+    return blueprint
+
+
+def create_blueprints(limiter: Limiter | None) -> list[Blueprint]:
     return [
-        hc_blueprint,
-        us_blueprint,
-        gs_blueprint,
-        ru_blueprint,
-        du_blueprint,
-        ciue_blueprint,
-        trl_blueprint
+        _create_blueprint(spec, limiter)
+        for spec in ROUTES
+        if (limiter or not spec.requires_limiter)  # trigger-rate-limit is useless if rate limiting is off
+        and (HISTORY_ENABLED or not spec.requires_history)  # nothing to compute stats from without the history
+        and (STATUS_BUS_ENABLED or not spec.requires_status_bus)
+        and (WEBHOOKS_ENABLED or not spec.requires_webhooks)
+        and (GROUPS_ENABLED or not spec.requires_groups)
+        and (ADMIN_TOKEN or not spec.requires_admin_token)
     ]
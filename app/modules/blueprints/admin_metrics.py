@@ -0,0 +1,39 @@
+import os
+from flask import jsonify, Response
+from modules.utils.logger import logger
+from modules.utils.database import db
+from modules.utils.request import client_ip, is_admin
+from modules.utils import route_metrics
+
+# needs "Bearer <ADMIN_TOKEN>" in the Authorization header.
+# the counters are per worker process (since it started), so with several workers each request
+# only shows the worker that answered it, `pid` says which one.
+
+# returns something like this:
+
+# {
+#     'pid': 4121,
+#     'routes': {
+#         '/update-status': {'requests': 5120, 'errors': 0, 'rate_limited': 3, 'total_ms': 9830.2, 'max_ms': 48.1, 'avg_ms': 1.92},
+#         ...
+#     },
+#     'caches': {
+#         'negative_cache': {'entries': 210, 'suppressed': 18233},  # unknown-ID lookups that skipped the DB
+#         'token_cache': {'entries': 940, 'hits': 51200}  # token checks that skipped the DB
+#     }
+# }
+
+
+def route() -> tuple[Response, int]:
+    try:
+        logger.info(f"Incoming /admin/metrics request from {client_ip()}")
+
+        if not is_admin():
+            logger.warning(f"Rejected /admin/metrics request from {client_ip()}")
+            return jsonify({'error': 'Authentication failed: Invalid admin token'}), 401
+
+        return jsonify({'pid': os.getpid(), 'routes': route_metrics.snapshot(), 'caches': db.cache_stats()}), 200
+
+    except Exception as e:
+        logger.error(f"Error in admin_metrics route: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
@@ -0,0 +1,65 @@
+import time
+from flask import request, jsonify, Response
+from modules.utils.logger import logger
+from modules.utils.request import client_ip, is_admin
+from modules.utils import telemetry_stats
+
+# needs "Bearer <ADMIN_TOKEN>" in the Authorization header. URL parameters (all optional):
+
+# from, to - unix seconds or ISO 8601 (UTC unless it has an offset), defaults to the last 24 hours
+# bucket   - "minute" or "hour" (default), the range is widened to whole buckets
+# top      - how many endpoints/IPs to list (default 10, max 100)
+
+# returns something like this (error_rate = share of 5xx responses):
+
+# {
+#     'from': '2025-08-21T12:00:00+00:00',
+#     'to': '2025-08-22T12:00:00+00:00',
+#     'bucket': 'hour',
+#     'totals': {'requests': 5210, 'client_errors': 41, 'server_errors': 2, 'error_rate': 0.0004},
+#     'series': [{'time': '2025-08-21T12:00:00+00:00', 'requests': 230, 'client_errors': 1, 'server_errors': 0, 'error_rate': 0.0}, ...],
+#     'top_endpoints': [{'endpoint': '/update-status', 'requests': 3120, 'client_errors': 12, 'server_errors': 2, 'error_rate': 0.0006}, ...],
+#     'top_ips': [{'ip': '203.0.113.7', 'requests': 820}, ...]
+# }
+
+DEFAULT_RANGE_S = 24 * 3600
+MAX_TOP = 100
+
+
+def route() -> tuple[Response, int]:
+    try:
+        logger.info(f"Incoming /admin/telemetry request from {client_ip()}")
+
+        if not is_admin():
+            logger.warning(f"Rejected /admin/telemetry request from {client_ip()}")
+            return jsonify({'error': 'Authentication failed: Invalid admin token'}), 401
+
+        now = int(time.time())
+        end = telemetry_stats.parse_time(request.args['to']) if 'to' in request.args else now
+        start = telemetry_stats.parse_time(request.args['from']) if 'from' in request.args else None
+        if end is None:
+            return jsonify({'error': '`to` must be unix seconds or an ISO 8601 date/time'}), 400
+        if start is None:
+            if 'from' in request.args:
+                return jsonify({'error': '`from` must be unix seconds or an ISO 8601 date/time'}), 400
+            start = end - DEFAULT_RANGE_S
+
+        bucket = request.args.get('bucket', 'hour')
+        if bucket not in telemetry_stats.PERIODS:
+            return jsonify({'error': f'`bucket` must be one of {", ".join(telemetry_stats.PERIODS)}'}), 400
+
+        top = request.args.get('top', 10, type=int)
+        if not 1 <= top <= MAX_TOP:
+            return jsonify({'error': f'`top` must be a number from 1 to {MAX_TOP}'}), 400
+
+        if start >= end:
+            return jsonify({'error': '`from` must be before `to`'}), 400
+
+        try:
+            return jsonify(telemetry_stats.query(start, end, bucket, top)), 200
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    except Exception as e:
+        logger.error(f"Error in admin_telemetry route: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
@@ -1,12 +1,12 @@
 from flask import request, jsonify, Response
 from modules.utils.logger import logger
 from modules.utils.database import db
-from modules.utils.request import remote_addr
+from modules.utils.request import client_ip
 from typing import Any
 
 def route() -> tuple[Response, int]:
     try:
-        logger.info(f"Incoming /check-if-user-exists request from {remote_addr}")
+        logger.info(f"Incoming /check-if-user-exists request from {client_ip()}")
 
         user_id = request.args.get('userId')
 
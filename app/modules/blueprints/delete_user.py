@@ -1,17 +1,20 @@
 from flask import request, jsonify, Response
 from modules.utils.logger import logger
 from modules.utils.database import db
-from modules.utils.request import remote_addr
-from typing import Any
+from modules.utils import group_presence, history_db, status_webhooks
+from modules.utils.gv import GROUPS_ENABLED, HISTORY_ENABLED, STATUS_BUS_ENABLED, WEBHOOKS_ENABLED
+from modules.utils.status_bus import publish_status
+from modules.utils.request import client_ip
+from modules.utils.validation import load_json_body, validate_auth_token, validate_user_id
 
 def route() -> tuple[Response, int]:
     try:
-        logger.info(f"Incoming /delete-user request from {remote_addr}")
+        logger.info(f"Incoming /delete-user request from {client_ip()}")
 
-        data: dict[str, Any] = request.get_json()
+        data, error_response = load_json_body()
 
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
+        if error_response:
+            return error_response
 
         user_id = data.get('userId')
         auth_token = request.headers.get('Authorization')
@@ -24,9 +27,21 @@ def route() -> tuple[Response, int]:
 
         auth_token = auth_token[7:] if auth_token.startswith('Bearer ') else auth_token
 
+        error = validate_user_id(user_id) or validate_auth_token(auth_token)
+        if error:
+            return jsonify({'error': error}), 400
+
         success, message = db.delete_user(user_id, auth_token)
 
         if success:
+            if HISTORY_ENABLED:
+                history_db.db.delete_user(user_id)
+            if STATUS_BUS_ENABLED:
+                publish_status(user_id, {})  # streams see the status disappear
+            if WEBHOOKS_ENABLED:
+                status_webhooks.get_queue().delete_user(user_id)
+            if GROUPS_ENABLED:
+                group_presence.get_presence().delete_user(user_id)
             logger.info(f"User {user_id} deleted successfully.")
             return jsonify({'message': message}), 200
         else:
@@ -0,0 +1,81 @@
+import re
+import time
+from datetime import datetime, timezone
+from flask import request, jsonify, Response
+from modules.utils.logger import logger
+from modules.utils.database import db
+from modules.utils import history_db
+from modules.utils.request import client_ip
+
+# ?range= -> number of days, ending today (UTC). "<n>d" works too, e.g. ?range=14d
+RANGES: dict[str, int] = {
+    "today": 1,
+    "week": 7,
+    "month": 30,
+    "year": 365,
+}
+MAX_RANGE_DAYS = 3660
+CUSTOM_RANGE = re.compile(r"^(\d{1,4})d$")
+
+# returns something like this (times in seconds, most used first):
+
+# {
+#     'user_id': '8551517423728874',
+#     'range': 'week',
+#     'from': '2025-08-16',
+#     'to': '2025-08-22',
+#     'total_seconds': 40210,
+#     'languages': [{'name': 'python', 'seconds': 30120}, {'name': 'markdown', 'seconds': 10090}],
+#     'workspaces': [{'name': 'vscode-status-api', 'seconds': 40210}],
+#     'git_branches': [{'name': 'master', 'seconds': 40210}]
+# }
+
+def _range_days(value: str) -> int | None:
+    if value in RANGES:
+        return RANGES[value]
+    match = CUSTOM_RANGE.match(value)
+    if match and 1 <= int(match.group(1)) <= MAX_RANGE_DAYS:
+        return int(match.group(1))
+    return None
+
+
+def _date(day: int) -> str:
+    return datetime.fromtimestamp(day * history_db.DAY_S, tz=timezone.utc).date().isoformat()
+
+
+def route() -> tuple[Response, int]:
+    try:
+        logger.info(f"Incoming /get-stats request from {client_ip()}")
+
+        user_id = request.args.get('userId')
+        range_name = request.args.get('range', 'week')
+
+        if not user_id:
+            return jsonify({'error': '`userId` URL parameter is required'}), 400
+
+        days = _range_days(range_name)
+        if days is None:
+            return jsonify({'error': f'`range` must be one of {", ".join(RANGES)} or a number of days like 14d (max {MAX_RANGE_DAYS})'}), 400
+
+        exists, _ = db.check_if_user_exists(user_id)
+        if not exists:
+            return jsonify({'error': 'User not found'}), 404
+
+        last_day = int(time.time()) // history_db.DAY_S
+        first_day = last_day - days + 1
+        stats = history_db.db.stats(user_id, first_day, last_day)
+
+        return jsonify({
+            'user_id': user_id,
+            'range': range_name,
+            'from': _date(first_day),
+            'to': _date(last_day),
+            'total_seconds': stats['total'],
+            'languages': stats['languages'],
+            'workspaces': stats['workspaces'],
+            'git_branches': stats['git_branches'],
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error in get_stats route: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
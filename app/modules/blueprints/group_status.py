@@ -0,0 +1,73 @@
+from flask import request, jsonify, Response
+from modules.utils.logger import logger
+from modules.utils.database import db
+from modules.utils.group_presence import get_presence
+from modules.utils.request import client_ip
+from modules.utils.validation import validate_auth_token, validate_group_name, validate_user_id
+
+# returns something like this (online = a heartbeat in the last 10 minutes, idle = the same but isIdling is set):
+
+# {
+#     'group': 'my-team',
+#     'members': 4,
+#     'counts': {'online': 1, 'idle': 1, 'offline': 2},
+#     'top_languages': [{'name': 'python', 'members': 2}]
+# }
+
+# top_languages counts the language of every online or idle member.
+# user IDs are all it takes to read someone's status, so who is online/idle/offline is only returned to members:
+# with ?userId=<a member> and "Bearer <their token>" in the Authorization header the response also has
+
+#     'online': ['8551517423728874'],
+#     'idle': ['1234567890123456'],
+#     'offline': ['1111222233334444', '5555666677778888'],
+
+def route() -> tuple[Response, int]:
+    try:
+        logger.info(f"Incoming /group-status request from {client_ip()}")
+
+        group = request.args.get('group')
+        user_id = request.args.get('userId')
+        auth_token = request.headers.get('Authorization')
+
+        if not group:
+            return jsonify({'error': '`group` URL parameter is required'}), 400
+
+        error = validate_group_name(group)
+        if error:
+            return jsonify({'error': error}), 400
+
+        member_ids = bool(user_id or auth_token)
+        if member_ids:
+            if not user_id:
+                return jsonify({'error': '`userId` URL parameter is required with an Authorization header'}), 400
+            if not auth_token:
+                return jsonify({'error': 'Authorization header is required with `userId`'}), 401
+
+            auth_token = auth_token[7:] if auth_token.startswith('Bearer ') else auth_token
+
+            error = validate_user_id(user_id) or validate_auth_token(auth_token)
+            if error:
+                return jsonify({'error': error}), 400
+
+            valid = db.check_token(user_id, auth_token)
+            if valid is None:
+                return jsonify({'error': 'User does not exist'}), 404
+            if not valid:
+                return jsonify({'error': 'Authentication failed: Invalid token'}), 401
+
+            if not get_presence().is_member(user_id, group):
+                return jsonify({'error': 'Not a member of this group'}), 403
+
+        summary = get_presence().summary(group, member_ids)
+        if summary is None:
+            return jsonify({'error': 'Group not found'}), 404
+
+        response = jsonify(summary)
+        if member_ids:
+            response.headers['Cache-Control'] = 'no-store'  # the public max-age would let shared caches keep the IDs
+        return response, 200
+
+    except Exception as e:
+        logger.error(f"Error in group_status route: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
@@ -0,0 +1,36 @@
+from flask import request, jsonify, Response
+from modules.utils import icon_store
+from modules.utils.icon_store import Icon
+
+# urls with ?v=<content hash> never change content, so they can be cached forever
+IMMUTABLE_CACHE: str = "public, max-age=31536000, immutable"
+# plain urls are revalidated now and then, the icon behind them can change when the icons are updated
+REVALIDATE_CACHE: str = "public, max-age=3600"
+
+def _send(icon: Icon, mimetype: str) -> tuple[Response, int]:
+    if icon.gzipped is not None and "gzip" in request.accept_encodings:
+        response = Response(icon.gzipped, mimetype=mimetype)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(icon.data, mimetype=mimetype)
+    response.vary.add("Accept-Encoding")
+    response.set_etag(icon.content_hash)
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE if request.args.get("v") == icon.content_hash else REVALIDATE_CACHE
+    response.make_conditional(request)  # 304 without a body when If-None-Match matches
+    return response, response.status_code
+
+def route(name: str, size: int | None = None) -> tuple[Response, int]:
+    icon = icon_store.get(name, size)
+
+    if icon is None:
+        return jsonify({'error': 'Icon not found'}), 404
+
+    return _send(icon, "image/png")
+
+def sprite_index_route() -> tuple[Response, int]:
+    index = icon_store.sprite_index()
+
+    if index is None:
+        return jsonify({'error': 'Sprite sheet has not been built (see tools/build_icon_sprite.py)'}), 404
+
+    return _send(index, "application/json")
@@ -0,0 +1,72 @@
+from flask import request, jsonify, Response
+from modules.utils.logger import logger
+from modules.utils.database import db
+from modules.utils.group_presence import get_presence
+from modules.utils.request import client_ip
+from modules.utils.validation import load_json_body, validate_auth_token, validate_group_name, validate_user_id
+
+# expects a json payload like this:
+
+# {
+#     'userId': '8551517423728874',
+#     'group': 'my-team',
+#     'inviteCode': 'cdGYdq6t0C3MaTRb1Ukb9A'
+# }
+
+# it also needs "Bearer <token>" in the Authorization header.
+# if the group doesn't exist yet it's created, inviteCode isn't needed then and the response has the new group's
+# `inviteCode` for the other members. groups are deleted when their last member leaves
+
+def route() -> tuple[Response, int]:
+    try:
+        logger.info(f"Incoming /join-group request from {client_ip()}")
+
+        data, error_response = load_json_body()
+
+        if error_response:
+            return error_response
+
+        user_id = data.get('userId')
+        group = data.get('group')
+        invite_code = data.get('inviteCode')
+        auth_token = request.headers.get('Authorization')
+
+        if not user_id:
+            return jsonify({'error': 'userId is required'}), 400
+
+        if not auth_token:
+            return jsonify({'error': 'Authorization header is required'}), 401
+
+        auth_token = auth_token[7:] if auth_token.startswith('Bearer ') else auth_token
+
+        error = validate_user_id(user_id) or validate_auth_token(auth_token) or validate_group_name(group)
+        if not error and invite_code is not None and not isinstance(invite_code, str):
+            error = "inviteCode must be a string"
+        if error:
+            return jsonify({'error': error}), 400
+
+        valid = db.check_token(user_id, auth_token)
+        if valid is None:
+            return jsonify({'error': 'User does not exist'}), 404
+        if not valid:
+            return jsonify({'error': 'Authentication failed: Invalid token'}), 401
+
+        success, message, created_code = get_presence().join(user_id, group, invite_code)
+
+        if success:
+            logger.info(f"User {user_id} joined group {group}.")
+            if created_code is not None:
+                return jsonify({'message': message, 'group': group, 'inviteCode': created_code}), 201
+            return jsonify({'message': message, 'group': group}), 200
+        else:
+            logger.warning(f"User {user_id} failed to join group {group}: {message}")
+            if "Invalid invite code" in message:
+                return jsonify({'error': message}), 403
+            elif "At most" in message or "full" in message:
+                return jsonify({'error': message}), 400
+            else:
+                return jsonify({'error': message}), 409
+
+    except Exception as e:
+        logger.error(f"Error in join-group endpoint: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
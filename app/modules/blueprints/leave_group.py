@@ -0,0 +1,49 @@
+from flask import request, jsonify, Response
+from modules.utils.logger import logger
+from modules.utils.database import db
+from modules.utils.group_presence import get_presence
+from modules.utils.request import client_ip
+from modules.utils.validation import load_json_body, validate_auth_token, validate_group_name, validate_user_id
+
+# same payload as /join-group, without inviteCode
+
+def route() -> tuple[Response, int]:
+    try:
+        logger.info(f"Incoming /leave-group request from {client_ip()}")
+
+        data, error_response = load_json_body()
+
+        if error_response:
+            return error_response
+
+        user_id = data.get('userId')
+        group = data.get('group')
+        auth_token = request.headers.get('Authorization')
+
+        if not user_id:
+            return jsonify({'error': 'userId is required'}), 400
+
+        if not auth_token:
+            return jsonify({'error': 'Authorization header is required'}), 401
+
+        auth_token = auth_token[7:] if auth_token.startswith('Bearer ') else auth_token
+
+        error = validate_user_id(user_id) or validate_auth_token(auth_token) or validate_group_name(group)
+        if error:
+            return jsonify({'error': error}), 400
+
+        valid = db.check_token(user_id, auth_token)
+        if valid is None:
+            return jsonify({'error': 'User does not exist'}), 404
+        if not valid:
+            return jsonify({'error': 'Authentication failed: Invalid token'}), 401
+
+        if not get_presence().leave(user_id, group):
+            return jsonify({'error': 'Not a member of this group'}), 404
+
+        logger.info(f"User {user_id} left group {group}.")
+        return jsonify({'message': 'Left group successfully'}), 200
+
+    except Exception as e:
+        logger.error(f"Error in leave-group endpoint: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
@@ -1,17 +1,17 @@
 from flask import request, jsonify, Response
 from modules.utils.logger import logger
 from modules.utils.database import db
-from modules.utils.request import remote_addr
-from typing import Any
+from modules.utils.request import client_ip
+from modules.utils.validation import load_json_body, validate_auth_token, validate_user_id
 
 def route() -> tuple[Response, int]:
     try:
-        logger.info(f"Incoming /register-user request from {remote_addr}")
+        logger.info(f"Incoming /register-user request from {client_ip()}")
 
-        data: dict[str, Any] = request.get_json()
+        data, error_response = load_json_body()
 
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
+        if error_response:
+            return error_response
 
         user_id = data.get('userId')
         auth_token = request.headers.get('Authorization')
@@ -24,6 +24,10 @@ def route() -> tuple[Response, int]:
 
         auth_token = auth_token[7:] if auth_token.startswith('Bearer ') else auth_token
 
+        error = validate_user_id(user_id) or validate_auth_token(auth_token)
+        if error:
+            return jsonify({'error': error}), 400
+
         success, message = db.register_user(user_id, auth_token)
 
         if success:
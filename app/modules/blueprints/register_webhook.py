@@ -0,0 +1,70 @@
+from flask import request, jsonify, Response
+from modules.utils.logger import logger
+from modules.utils.database import db
+from modules.utils.request import client_ip
+from modules.utils.status_webhooks import check_url, get_queue, resolve_url
+from modules.utils.validation import load_json_body, validate_auth_token, validate_user_id
+
+# expects a json payload like this:
+
+# {
+#     'userId': '8551517423728874',
+#     'url': 'https://example.com/vscode-status-hook'
+# }
+
+# it also needs "Bearer <token>" in the Authorization header.
+# the response has the webhook's `secret`, it's only shown once. every delivery is a POST like this:
+
+# {"events": [{"user_id": "8551517423728874", "status": {...as sent to /update-status...}, "changed_at": "2025-08-22T11:49:12.174000+00:00"}]}
+
+# with an X-Webhook-Signature: sha256=<hex HMAC-SHA256 of the body with the secret> header.
+# anything but a 2xx response is retried with backoff, 410 Gone removes the webhook
+
+def route() -> tuple[Response, int]:
+    try:
+        logger.info(f"Incoming /register-webhook request from {client_ip()}")
+
+        data, error_response = load_json_body()
+
+        if error_response:
+            return error_response
+
+        user_id = data.get('userId')
+        url = data.get('url')
+        auth_token = request.headers.get('Authorization')
+
+        if not user_id:
+            return jsonify({'error': 'userId is required'}), 400
+
+        if not auth_token:
+            return jsonify({'error': 'Authorization header is required'}), 401
+
+        auth_token = auth_token[7:] if auth_token.startswith('Bearer ') else auth_token
+
+        error = validate_user_id(user_id) or validate_auth_token(auth_token) or check_url(url)
+        if error:
+            return jsonify({'error': error}), 400
+
+        valid = db.check_token(user_id, auth_token)
+        if valid is None:
+            return jsonify({'error': 'User does not exist'}), 404
+        if not valid:
+            return jsonify({'error': 'Authentication failed: Invalid token'}), 401
+
+        #* resolving the host only after authenticating, so anonymous requests can't make the API do DNS lookups
+        _, error = resolve_url(url)
+        if error:
+            return jsonify({'error': error}), 400
+
+        success, message, webhook = get_queue().register(user_id, url)
+
+        if success:
+            logger.info(f"Webhook registered for user {user_id}.")
+            return jsonify({'message': message, **webhook}), 201
+        else:
+            logger.warning(f"Failed to register webhook for user {user_id}: {message}")
+            return jsonify({'error': message}), 409
+
+    except Exception as e:
+        logger.error(f"Error in register-webhook endpoint: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
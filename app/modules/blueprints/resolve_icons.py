@@ -0,0 +1,59 @@
+import json
+from flask import request, jsonify, Response, stream_with_context
+from modules.utils.logger import logger
+from modules.utils.request import client_ip
+from modules.utils.gv import RESOLVE_ICONS_MAX_BYTES, RESOLVE_ICONS_MAX_ITEMS
+from modules.utils.language_image import resolve_many
+from modules.utils.validation import load_json_body, validate_icon_queries
+from typing import Iterator
+
+# expects a json payload like this:
+
+# {
+#     'files': [
+#         {'language': 'python', 'fileName': 'main.py'},
+#         {'language': '', 'fileName': 'Dockerfile'}
+#     ],
+#     'iconSize': 32  # optional, see /get-status
+# }
+
+# and streams back one json object per line (application/x-ndjson), in the same order:
+# {"fileName":"main.py","icon":"https://...","language":"python"}
+
+LINES_PER_CHUNK = 500
+
+def route() -> tuple[Response, int]:
+    try:
+        logger.info(f"Incoming /resolve-icons request from {client_ip()}")
+
+        data, error_response = load_json_body(RESOLVE_ICONS_MAX_BYTES)
+
+        if error_response:
+            return error_response
+
+        files = data.get('files')
+        icon_size = data.get('iconSize')
+
+        error = validate_icon_queries(files, RESOLVE_ICONS_MAX_ITEMS)
+        if error is None and icon_size is not None and type(icon_size) is not int:
+            error = "iconSize must be of type int"
+        if error:
+            return jsonify({'error': error}), 400
+
+        queries = [(item.get('language', ''), item.get('fileName', '')) for item in files]
+
+        def generate() -> Iterator[str]:
+            lines: list[str] = []
+            for (language, file_name), icon in zip(queries, resolve_many(queries, icon_size)):
+                lines.append(json.dumps({"fileName": file_name, "icon": icon, "language": language}, separators=(",", ":")))
+                if len(lines) >= LINES_PER_CHUNK:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson"), 200
+
+    except Exception as e:
+        logger.error(f"Error in resolve-icons endpoint: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
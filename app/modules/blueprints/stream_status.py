@@ -0,0 +1,97 @@
+import json
+import time
+from datetime import datetime, timezone
+from flask import request, jsonify, Response, stream_with_context
+from modules.utils.logger import logger
+from modules.utils.database import db
+from modules.utils.gv import STREAM_MAX_S
+from modules.utils.request import client_ip
+from modules.utils.status_bus import StatusEvent, Subscription, get_bus
+from modules.blueprints.get_status import public_status
+from typing import Iterator
+
+# server-sent events (text/event-stream), one event per status change of the user, whichever worker received it:
+
+# id: 1532
+# data: {"user_id":"8551517423728874","status":{...same as /get-status...},"last_updated":"2025-08-22T11:49:12.174000+00:00"}
+
+# without Last-Event-ID, the stream starts with the current status. the stream is closed after STREAM_MAX_S,
+# EventSource reconnects by itself and sends Last-Event-ID, so no change in between is missed
+
+# served through asgi.py, the view only sends the start of the stream and leaves the rest to the event loop
+# (see asgi.stream_status), so open streams don't each hold one of the ASGI_THREADS pool threads
+
+KEEPALIVE_S = 15
+ASGI_HANDOFF = "vscode_status.stream_handoff"  # ASGI scope key asgi.py puts a list in to take streams over
+
+
+def _event(seq: int, user_id: str, status: dict, last_updated: str | None, icon_size: int | None) -> str:
+    data = {"user_id": user_id, "status": public_status(status, icon_size) if status else {}, "last_updated": last_updated or ""}
+    return f"id: {seq}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def changes(subscription: Subscription, events: list[StatusEvent], icon_size: int | None) -> str:
+    """The SSE text for new events (or a keepalive comment if there are none)."""
+    if not events:
+        return ": keepalive\n\n"
+
+    chunk = ""
+    for event in events:
+        published = datetime.fromtimestamp(event.published_at, tz=timezone.utc).isoformat()
+        chunk += _event(event.seq, subscription.user_id or "", event.status, published, icon_size)
+    return chunk
+
+
+def route() -> tuple[Response, int]:
+    try:
+        logger.info(f"Incoming /stream-status request from {client_ip()}")
+
+        user_id = request.args.get('userId')
+
+        if not user_id:
+            return jsonify({'error': '`userId` URL parameter is required'}), 400
+
+        icon_size = request.args.get('iconSize', type=int)
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+        after = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+        exists, _ = db.check_if_user_exists(user_id)
+        if not exists:
+            return jsonify({'error': 'User not found'}), 404
+
+        subscription = get_bus().subscribe(user_id, after)
+        current = db.get_status(user_id) if after is None else None
+
+        start = "retry: 3000\n\n"
+        if current is not None:
+            start += _event(subscription.cursor, user_id, current.get("status", {}), current.get("last_updated"), icon_size)
+
+        handoff = request.environ.get("asgi.scope", {}).get(ASGI_HANDOFF)
+        if handoff is not None:
+            handoff.append((subscription, icon_size))
+            body: Iterator[str] = iter([start])  # an iterator, so no Content-Length is set
+        else:
+            def generate() -> Iterator[str]:
+                try:
+                    yield start
+
+                    deadline = time.monotonic() + STREAM_MAX_S
+                    while (left := deadline - time.monotonic()) > 0:
+                        events = subscription.wait(min(KEEPALIVE_S, left))
+                        yield changes(subscription, events, icon_size)
+                        if events:
+                            subscription.advance(events[-1].seq)  # only once the server has taken the events
+                finally:
+                    subscription.close()
+
+            body = stream_with_context(generate())
+
+        return Response(
+            body,
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},  # nginx would otherwise buffer the stream
+        ), 200
+
+    except Exception as e:
+        logger.error(f"Error in stream-status endpoint: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
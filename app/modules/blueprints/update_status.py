@@ -1,8 +1,11 @@
 from flask import request, jsonify, Response
 from modules.utils.logger import logger
 from modules.utils.database import db
-from modules.utils.request import remote_addr
-from typing import Any
+from modules.utils import group_presence, history_db, status_webhooks
+from modules.utils.gv import GROUPS_ENABLED, HISTORY_ENABLED, STATUS_BUS_ENABLED, WEBHOOKS_ENABLED
+from modules.utils.status_bus import publish_status
+from modules.utils.request import client_ip
+from modules.utils.validation import load_json_body, validate_auth_token, validate_user_id, validate_status
 
 # expects a json payload like this:
 
@@ -24,13 +27,13 @@ from typing import Any
 
 def route() -> tuple[Response, int]:
     try:
-        logger.info(f"Incoming /update-status request from {remote_addr}")
+        logger.info(f"Incoming /update-status request from {client_ip()}")
 
-        data: dict[str, Any] = request.get_json()
+        data, error_response = load_json_body()
 
-        if not data:
-            logger.warning("No JSON data provided in request body.")
-            return jsonify({'error': 'No JSON data provided'}), 400
+        if error_response:
+            logger.warning("Rejected /update-status request body.")
+            return error_response
 
         user_id = data.get('userId')
         auth_token = request.headers.get('Authorization')
@@ -48,9 +51,22 @@ def route() -> tuple[Response, int]:
 
         status_data = {k: v for k, v in data.items() if k != 'userId'}
 
+        error = validate_user_id(user_id) or validate_auth_token(auth_token) or validate_status(status_data)
+        if error:
+            logger.warning(f"Invalid /update-status payload: {error}")
+            return jsonify({'error': error}), 400
+
         success, message, is_new_user = db.update_status(user_id, auth_token, status_data)
 
         if success:
+            if HISTORY_ENABLED:
+                history_db.db.record(user_id, status_data)  # only queued, written in the background
+            if STATUS_BUS_ENABLED:
+                publish_status(user_id, status_data)
+            if WEBHOOKS_ENABLED:
+                status_webhooks.status_changed(user_id, status_data)  # only queued, sent by the dispatcher
+            if GROUPS_ENABLED:
+                group_presence.record(user_id, status_data)
             logger.info(f"Status updated successfully for user {user_id}")
             return jsonify({'message': message, 'user_id': user_id}), 200
         else:
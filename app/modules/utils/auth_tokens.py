@@ -0,0 +1,103 @@
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+
+
+# stored format: sha256$<salt hex>$<HMAC-SHA256 of the token keyed with the salt, hex>, 104 chars.
+# tokens are long random secrets, not passwords, so a slow hash would only make every check (and every
+# request with a wrong token) expensive without making them harder to guess
+TOKEN_HASH_PREFIX: str = "sha256"
+SALT_BYTES: int = 16
+
+# hashes written before this format, still accepted and replaced on the next successful check
+LEGACY_HASH_PREFIX: str = "pbkdf2_sha256"
+
+
+def _digest(auth_token: str, salt: bytes) -> str:
+    return hmac.new(salt, auth_token.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def hash_token(auth_token: str) -> str:
+    salt = os.urandom(SALT_BYTES)
+    return f"{TOKEN_HASH_PREFIX}${salt.hex()}${_digest(auth_token, salt)}"
+
+
+def is_token_hash(stored: str) -> bool:
+    return stored.startswith((f"{TOKEN_HASH_PREFIX}$", f"{LEGACY_HASH_PREFIX}$"))
+
+
+def needs_rehash(stored: str) -> bool:
+    return not stored.startswith(f"{TOKEN_HASH_PREFIX}$")
+
+
+def verify_token(auth_token: str, stored: str) -> bool:
+    """Constant-time check of a token against a stored hash (or a plaintext token from before hashing existed)."""
+    try:
+        if stored.startswith(f"{TOKEN_HASH_PREFIX}$"):
+            _, salt, expected = stored.split("$")
+            return hmac.compare_digest(_digest(auth_token, bytes.fromhex(salt)), expected)
+
+        if stored.startswith(f"{LEGACY_HASH_PREFIX}$"):
+            _, iterations, salt, expected = stored.split("$")
+            digest = hashlib.pbkdf2_hmac("sha256", auth_token.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+            return hmac.compare_digest(digest.hex(), expected)
+    except ValueError:
+        return False
+
+    return hmac.compare_digest(auth_token.encode("utf-8"), stored.encode("utf-8"))
+
+
+def _fingerprint(auth_token: str) -> bytes:
+    return hashlib.sha256(auth_token.encode("utf-8")).digest()
+
+
+class VerifiedTokenCache:
+    """
+    Per-process memory of tokens that recently passed verify_token, so a burst of heartbeats
+    doesn't pay for a DB read on every request. Only a SHA-256 of the token is kept.
+
+    Entries expire after `ttl_s` seconds. delete_user drops the entry in the worker that handled it,
+    other workers keep accepting the old token until their entry expires, even if the ID was
+    registered again with a different token in the meantime.
+    """
+
+    def __init__(self, ttl_s: float, max_size: int = 100_000):
+        self.ttl_s: float = ttl_s
+        self.max_size: int = max_size
+        self.hits: int = 0
+
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()  # user_id -> (fingerprint, expiry)
+        self._lock = Lock()
+
+    def check(self, user_id: str, auth_token: str) -> bool:
+        fingerprint = _fingerprint(auth_token)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return False
+            if entry[1] <= time.monotonic():
+                del self._entries[user_id]
+                return False
+            if not hmac.compare_digest(entry[0], fingerprint):
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, user_id: str, auth_token: str) -> None:
+        fingerprint = _fingerprint(auth_token)
+        with self._lock:
+            self._entries[user_id] = (fingerprint, time.monotonic() + self.ttl_s)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits}
@@ -1,10 +1,31 @@
+import hashlib
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Dict, Any, Optional
-from sqlalchemy import String, JSON, create_engine, select
+import json
+from threading import Lock
+from sqlalchemy import BigInteger, Boolean, Integer, String, JSON, bindparam, create_engine, insert, inspect, select, text, type_coerce, update
 from sqlalchemy.orm import DeclarativeBase, sessionmaker, Mapped, MappedColumn, Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from werkzeug.local import LocalProxy
+from modules.utils.gv import (
+    DATABASE_BACKEND,
+    DATABASE_URL,
+    DATABASE_POOL_SIZE,
+    DATABASE_MAX_OVERFLOW,
+    DATABASE_POOL_RECYCLE,
+    STATUS_COALESCE_MS,
+    STATUS_COALESCE_MAX_PENDING,
+    STATUS_TOUCH_INTERVAL_S,
+    NEGATIVE_CACHE_TTL_S,
+    TOKEN_CACHE_TTL_S,
+)
+from modules.utils.auth_tokens import LEGACY_HASH_PREFIX, TOKEN_HASH_PREFIX, VerifiedTokenCache, hash_token, needs_rehash, verify_token
 from modules.utils.logger import logger
+from modules.utils.negative_cache import NegativeCache
+from modules.utils.request_cost import mark_cached
+from modules.utils.storage_backend import Presence, StorageBackend, DATETIME_NOW, STATUS_MAX_AGE_MINUTES
+from modules.utils.write_buffer import PendingStatus, StatusWriteBuffer
 
 
 #* notice to anyone reading this code:
@@ -14,10 +35,6 @@ from modules.utils.logger import logger
 #* and "core" and ORM stuff
 
 
-def DATETIME_NOW() -> str:
-    return datetime.now(tz=timezone.utc).isoformat()
-
-
 class Base(DeclarativeBase):
     pass
 
@@ -28,29 +45,237 @@ class User(Base):
     # user id and auth token can be changed by the user in the extension so i dont want to enforce a strict limit,
     # but i figured 32 chars for user id and 128 chars for token are reasonable limits regardless of what the user inputs
     user_id: Mapped[str] = MappedColumn(String(32), primary_key=True)
-    auth_token: Mapped[str] = MappedColumn(String(128), nullable=False)
+    auth_token: Mapped[str] = MappedColumn(String(128), nullable=False)  # salted hash, see auth_tokens.hash_token
 
     created_at: Mapped[str] = MappedColumn(String, default=DATETIME_NOW)
     last_updated: Mapped[str | None] = MappedColumn(String, nullable=True)
-    status_data: Mapped[dict[str, Any]] = MappedColumn(JSON, default="{}")
 
+    # the keys the extension sends on every update get their own typed columns (see STATUS_COLUMNS),
+    # status_data only keeps whatever is left over (unknown keys, or known keys with an unexpected type)
+    app_name: Mapped[str | None] = MappedColumn(String, nullable=True)
+    details: Mapped[str | None] = MappedColumn(String, nullable=True)
+    file_name: Mapped[str | None] = MappedColumn(String, nullable=True)
+    git_branch: Mapped[str | None] = MappedColumn(String, nullable=True)
+    git_repo: Mapped[str | None] = MappedColumn(String, nullable=True)
+    is_debugging: Mapped[bool | None] = MappedColumn(Boolean, nullable=True)
+    is_idling: Mapped[bool | None] = MappedColumn(Boolean, nullable=True)
+    language: Mapped[str | None] = MappedColumn(String, nullable=True)
+    status_timestamp: Mapped[int | None] = MappedColumn(BigInteger, nullable=True)
+    workspace: Mapped[str | None] = MappedColumn(String, nullable=True)
+    status_data: Mapped[dict[str, Any]] = MappedColumn(JSON, default=lambda: {})
+    status_hash: Mapped[str | None] = MappedColumn(String(16), nullable=True)
+
+
+class SchemaVersion(Base):
+    """Which version of a one-off data migration a database is at, so it isn't checked again on every start."""
+    __tablename__ = "schema_versions"
+
+    name: Mapped[str] = MappedColumn(String(64), primary_key=True)
+    version: Mapped[int] = MappedColumn(Integer, nullable=False)
+
+
+TOKEN_HASH_VERSION: int = 1  # every stored token is hashed
+
+
+# status key -> (User column, expected python type)
+STATUS_COLUMNS: dict[str, tuple[str, type]] = {
+    "appName": ("app_name", str),
+    "details": ("details", str),
+    "fileName": ("file_name", str),
+    "gitBranch": ("git_branch", str),
+    "gitRepo": ("git_repo", str),
+    "isDebugging": ("is_debugging", bool),
+    "isIdling": ("is_idling", bool),
+    "language": ("language", str),
+    "timestamp": ("status_timestamp", int),
+    "workspace": ("workspace", str),
+}
+
+
+def pack_status(status_data: Dict[str, Any]) -> tuple[Dict[str, Any], Dict[str, Any]]:
+    """Split a status payload into (column values, overflow dict for status_data)."""
+    columns: Dict[str, Any] = {column: None for column, _ in STATUS_COLUMNS.values()}
+    overflow: Dict[str, Any] = {}
+
+    for key, value in status_data.items():
+        spec = STATUS_COLUMNS.get(key)
+        # type() instead of isinstance() so True doesn't end up in an integer column and vice versa
+        if spec is not None and type(value) is spec[1]:
+            columns[spec[0]] = value
+        else:
+            overflow[key] = value
+
+    return columns, overflow
+
+
+# keys that change on every heartbeat without the status meaningfully changing
+VOLATILE_STATUS_KEYS: frozenset[str] = frozenset({"timestamp"})
+
+
+def status_digest(status_data: Dict[str, Any]) -> str:
+    """Hash of the canonicalized payload (sorted keys, volatile keys dropped), used to detect no-op updates."""
+    canonical = json.dumps(
+        {k: v for k, v in status_data.items() if k not in VOLATILE_STATUS_KEYS},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def touch_due(last_updated: str | None) -> bool:
+    """
+    Whether an unchanged status should still bump last_updated. It only has to move often enough
+    for cleanup_old_status, so it's done lazily every STATUS_TOUCH_INTERVAL_S seconds.
+    """
+    if last_updated is None:
+        return True
+    return datetime.fromisoformat(last_updated) <= datetime.now(tz=timezone.utc) - timedelta(seconds=STATUS_TOUCH_INTERVAL_S)
+
+
+# get_status reads these with a plain select instead of loading the ORM object, and skips the
+# Boolean/JSON result processors (bools are converted in unpack_status, JSON only parsed when non-empty)
+STATUS_SELECT = [
+    type_coerce(getattr(User, column), Integer) if kind is bool else getattr(User, column)
+    for column, kind in STATUS_COLUMNS.values()
+] + [type_coerce(User.status_data, String)]
+
+
+def unpack_status(row: tuple[Any, ...]) -> Dict[str, Any]:
+    """Inverse of pack_status, rebuilds the payload the client originally sent from a STATUS_SELECT row."""
+    status: Dict[str, Any] = {}
 
-class Database:
-    def __init__(self, db_file: str = "user_statuses.db"):
-        self.db_file = f"sqlite:///{Path(__file__).resolve().parent.parent.parent.parent / "data" / db_file}"
+    for (key, (_, kind)), value in zip(STATUS_COLUMNS.items(), row):
+        if value is not None:
+            status[key] = bool(value) if kind is bool else value
 
-        self.engine = create_engine(self.db_file, echo=False, future=True)
+    overflow = row[len(STATUS_COLUMNS)]
+    if isinstance(overflow, str) and overflow != "{}":
+        overflow = json.loads(overflow)
+
+    # rows written before the column layout existed may hold "{}" as a JSON string instead of an object
+    if isinstance(overflow, dict):
+        status.update(overflow)
+
+    return status
+
+
+DATA_DIR: Path = Path(__file__).resolve().parent.parent.parent.parent / "data"
+
+# database URLs whose schema was already created/migrated in this process. forked gunicorn workers
+# inherit it, so when the master initialized the schema before forking the workers don't redo it
+_initialized_urls: set[str] = set()
+
+
+class Database(StorageBackend):
+    name = "sqlite"
+
+    def __init__(
+        self,
+        db_file: str = "user_statuses.db",
+        url: str | None = None,
+        engine_kwargs: Dict[str, Any] | None = None,
+        coalesce_ms: int = 0,
+        negative_cache_ttl_s: float = 0,
+        token_cache_ttl_s: float = 0,
+    ):
+        if url is None:
+            DATA_DIR.mkdir(parents=True, exist_ok=True)
+            url = f"sqlite:///{DATA_DIR / db_file}"
+
+        self.db_file = url
+
+        self.engine = create_engine(self.db_file, echo=False, future=True, **(engine_kwargs or {}))
         self.SessionLocal = sessionmaker(bind=self.engine, autoflush=False, autocommit=False)
 
+        # coalescing mode: heartbeats only update an in-memory buffer that is written out every coalesce_ms
+        self._write_buffer: StatusWriteBuffer | None = None
+        if coalesce_ms > 0:
+            self._write_buffer = StatusWriteBuffer(self._flush_buffered_statuses, coalesce_ms, STATUS_COALESCE_MAX_PENDING)
+
+        # user IDs recently looked up and not found, /get-status and /check-if-user-exists skip the DB for them
+        self.negative_cache: NegativeCache | None = NegativeCache(negative_cache_ttl_s) if negative_cache_ttl_s > 0 else None
+
+        # tokens that recently passed verification, heartbeats skip the DB read + hash for them
+        self.token_cache: VerifiedTokenCache | None = VerifiedTokenCache(token_cache_ttl_s) if token_cache_ttl_s > 0 else None
+
         self._init_database()
 
     def _init_database(self):
+        if self.db_file in _initialized_urls:
+            return
+
         try:
             Base.metadata.create_all(bind=self.engine)
+            self._migrate_status_columns()
+            self._migrate_token_hashes()
+            _initialized_urls.add(self.db_file)
             logger.info("Main database initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize main database: {e}")
 
+    def _migrate_status_columns(self) -> None:
+        """
+        create_all() doesn't touch existing tables, so databases created before the typed status columns
+        (or status_hash) existed get them added here, and every row is rewritten through _write_status
+        so old JSON blobs are split into columns + overflow and get their hash.
+        """
+        existing = {column["name"] for column in inspect(self.engine).get_columns(User.__tablename__)}
+        missing = [column for column in User.__table__.columns if column.name not in existing]
+
+        if not missing:
+            return
+
+        with self.engine.begin() as conn:
+            for column in missing:
+                column_type = column.type.compile(dialect=self.engine.dialect)
+                conn.execute(text(f"ALTER TABLE {User.__tablename__} ADD COLUMN {column.name} {column_type}"))
+
+        with self.SessionLocal() as session:
+            migrated = 0
+            for user in session.scalars(select(User)):
+                if not isinstance(user.status_data, dict):
+                    user.status_data = {}
+                    continue
+
+                self._write_status(user, user.status_data)
+                migrated += 1
+
+            session.commit()
+
+        logger.info(f"Migrated users table to typed status columns ({len(missing)} columns added, {migrated} rows converted)")
+
+    def _migrate_token_hashes(self) -> None:
+        """Replaces plaintext tokens from before hashing existed with salted hashes, once per database."""
+        with self.engine.begin() as conn:
+            version = conn.execute(select(SchemaVersion.version).where(SchemaVersion.name == "token_hashes")).scalar_one_or_none()
+            if version is not None and version >= TOKEN_HASH_VERSION:
+                return
+
+            plaintext = conn.execute(
+                select(User.user_id, User.auth_token)
+                .where(User.auth_token.not_like(f"{TOKEN_HASH_PREFIX}$%"), User.auth_token.not_like(f"{LEGACY_HASH_PREFIX}$%"))
+            ).all()
+            if plaintext:
+                conn.execute(
+                    update(User).where(User.user_id == bindparam("b_user_id")),
+                    [{"b_user_id": row.user_id, "auth_token": hash_token(row.auth_token)} for row in plaintext],
+                )
+
+            if version is None:
+                conn.execute(insert(SchemaVersion).values(name="token_hashes", version=TOKEN_HASH_VERSION))
+            else:
+                conn.execute(update(SchemaVersion).where(SchemaVersion.name == "token_hashes").values(version=TOKEN_HASH_VERSION))
+
+        if plaintext:
+            logger.info(f"Hashed {len(plaintext)} plaintext auth tokens")
+
+    def _rehash_token(self, user_id: str, auth_token: str) -> None:
+        # older (PBKDF2) hashes can only be replaced once the token is known, i.e. after it passed a check
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(update(User).where(User.user_id == user_id).values(auth_token=hash_token(auth_token)))
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to rehash token for user {user_id}: {e}")
+
     def _select_user_by_user_id(self, session: Session, user_id: str) -> User | None:
         user = session.execute(select(User).where(User.user_id == user_id)).scalar_one_or_none()
         return user
@@ -60,10 +285,10 @@ class Database:
 
         user = User(
             user_id=user_id,
-            auth_token=auth_token,
+            auth_token=hash_token(auth_token),
             created_at=now,
-            status_data=status_data if status_data is not None else "{}"
         )
+        self._write_status(user, status_data or {})
 
         if set_last_updated and status_data is not None:
             user.last_updated = now
@@ -75,19 +300,84 @@ class Database:
             logger.error(f"Failed to create user {user_id}: {e}")
             raise
 
-    def _update_user_status(self, session: Session, user_id: str, status_data: Dict[str, Any]) -> None:
+    def _update_user_status(self, session: Session, user_id: str, status_data: Dict[str, Any]) -> bool:
+        """Returns False if the user doesn't exist (anymore)."""
         user = self._select_user_by_user_id(session, user_id)
-        if user:
-            user.status_data = status_data
-            user.last_updated = DATETIME_NOW()
-            session.commit()
+        if not user:
+            return False
+
+        if user.status_hash == status_digest(status_data) and user.last_updated is not None:
+            # nothing meaningful changed, skip the write entirely unless last_updated is getting old
+            if not touch_due(user.last_updated):
+                return True
+        else:
+            self._write_status(user, status_data)
+        user.last_updated = DATETIME_NOW()
+        session.commit()
+        return True
+
+    def _write_status(self, user: User, status_data: Dict[str, Any]) -> None:
+        columns, overflow = pack_status(status_data)
+        for column, value in columns.items():
+            setattr(user, column, value)
+        user.status_data = overflow
+        user.status_hash = status_digest(status_data) if status_data else None
+
+    def _flush_buffered_statuses(self, batch: Dict[str, PendingStatus]) -> None:
+        rows: list[Dict[str, Any]] = []
+        for user_id, pending in batch.items():
+            columns, overflow = pack_status(pending.status_data)
+            rows.append({
+                "b_user_id": user_id,
+                **columns,
+                "status_data": overflow,
+                "status_hash": status_digest(pending.status_data) if pending.status_data else None,
+                "last_updated": pending.last_updated,
+            })
+
+        # one executemany UPDATE in one transaction; users deleted in the meantime just match no row
+        with self.engine.begin() as conn:
+            updated = conn.execute(update(User).where(User.user_id == bindparam("b_user_id")), rows).rowcount
+            vanished: set[str] = set()
+            if 0 <= updated < len(rows):
+                user_ids = list(batch)
+                vanished.update(user_ids)
+                for i in range(0, len(user_ids), 500):  # stay below SQLite's bound parameter limit
+                    vanished.difference_update(conn.execute(select(User.user_id).where(User.user_id.in_(user_ids[i:i + 500]))).scalars())
+
+        for user_id in vanished:
+            self._forget_user(user_id)
+
+    def _check_token(self, session: Session, user_id: str, auth_token: str) -> bool | None:
+        """True/False for a valid/invalid token, None if the user doesn't exist."""
+        if self.token_cache is not None and self.token_cache.check(user_id, auth_token):
+            return True
+
+        stored = session.execute(select(User.auth_token).where(User.user_id == user_id)).scalar_one_or_none()
+        if stored is None:
+            return None
+
+        if not verify_token(auth_token, stored):
+            return False
+
+        if needs_rehash(stored):
+            self._rehash_token(user_id, auth_token)
+
+        if self.token_cache is not None:
+            self.token_cache.add(user_id, auth_token)
+        return True
+
+    def check_token(self, user_id: str, auth_token: str) -> bool | None:
+        try:
+            with self.SessionLocal() as session:
+                return self._check_token(session, user_id, auth_token)
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to check token for user {user_id}: {e}")
+            return False
 
     def authenticate_user(self, session: Session, user_id: str, auth_token: str) -> bool:
         try:
-            user = self._select_user_by_user_id(session, user_id)
-            if not user:
-                return False
-            return user.auth_token == auth_token
+            return bool(self._check_token(session, user_id, auth_token))
         except Exception as e:
             logger.error(f"Authentication error: {e}")
             return False
@@ -95,21 +385,51 @@ class Database:
     def update_status(self, user_id: str, auth_token: str, status_data: Dict[str, Any]) -> tuple[bool, str, bool]:
         try:
             with self.SessionLocal() as session:
-                if self._user_exists(session, user_id):
-                    if not self.authenticate_user(session, user_id, auth_token):
-                        return False, "Authentication failed: Invalid user ID or token", False
+                valid = self._check_token(session, user_id, auth_token)
 
-                    self._update_user_status(session, user_id, status_data)
-                    session.commit()
-                    return True, "Status updated successfully", False
-                else:
+                if valid is None:
                     # User doesn't exist - return error instead of creating new user
                     return False, "User not found: Please register first before updating status", False
 
+                if not valid:
+                    return False, "Authentication failed: Invalid user ID or token", False
+
+                if self._write_buffer is not None:
+                    # with a cached token and a pending status this doesn't touch the DB at all
+                    pending = self._write_buffer.get(user_id)
+                    if pending is not None:
+                        current_hash, current_last_updated, created_at = status_digest(pending.status_data), pending.last_updated, pending.created_at
+                    else:
+                        user = self._select_user_by_user_id(session, user_id)
+                        if user is None:
+                            return self._user_vanished(user_id)
+                        current_hash, current_last_updated, created_at = user.status_hash, user.last_updated, user.created_at
+
+                    if current_hash != status_digest(status_data) or touch_due(current_last_updated):
+                        self._write_buffer.put(user_id, PendingStatus(dict(status_data), DATETIME_NOW(), created_at))
+                    return True, "Status updated successfully", False
+
+                if not self._update_user_status(session, user_id, status_data):
+                    return self._user_vanished(user_id)
+                return True, "Status updated successfully", False
+
         except SQLAlchemyError as e:
             logger.error(f"Failed to update status for user {user_id}: {e}")
             return False, "Database error: Failed to save status", False
 
+    def _user_vanished(self, user_id: str) -> tuple[bool, str, bool]:
+        # the token was cached, but the user has since been deleted through another worker
+        self._forget_user(user_id)
+        return False, "User not found: Please register first before updating status", False
+
+    def _forget_user(self, user_id: str) -> None:
+        """Drops what this worker keeps in memory about a user that another worker deleted."""
+        if self.token_cache is not None:
+            self.token_cache.discard(user_id)
+        if self._write_buffer is not None:
+            self._write_buffer.discard(user_id)
+        self._remember_missing(user_id)
+
     def register_user(self, user_id: str, auth_token: str) -> tuple[bool, str]:
         try:
             with self.SessionLocal() as session:
@@ -122,6 +442,11 @@ class Database:
                     return False, "User already exists"
 
                 session.commit()
+
+                if self.negative_cache is not None:
+                    self.negative_cache.discard(user_id)
+                if self.token_cache is not None:
+                    self.token_cache.add(user_id, auth_token)  # saves a hash on the first heartbeat
                 return True, "User registered successfully"
         except SQLAlchemyError as e:
             logger.error(f"Failed to register user {user_id}: {e}")
@@ -134,60 +459,134 @@ class Database:
                 if not user:
                     return False, "User does not exist"
 
-                if user.auth_token != auth_token:
+                # always checked against the DB, not the token cache
+                if not verify_token(auth_token, user.auth_token):
                     return False, "Authentication failed: Invalid token"
 
+                if self.token_cache is not None:
+                    self.token_cache.discard(user_id)
+
+                if self._write_buffer is not None:
+                    self._write_buffer.discard(user_id)
+
                 session.delete(user)
                 session.commit()
+
+                if self.negative_cache is not None:
+                    self.negative_cache.add(user_id)
                 return True, "User deleted successfully"
         except SQLAlchemyError as e:
             logger.error(f"Failed to delete user {user_id}: {e}")
             return False, "Database error: Failed to delete user"
 
     def check_if_user_exists(self, user_id: str) -> tuple[bool, str]:
+        if self._known_missing(user_id):
+            return False, "User does not exist"
+
         try:
             with self.SessionLocal() as session:
-                user_exists = self._user_exists(session, user_id)
-                if user_exists:
+                if self._select_user_by_user_id(session, user_id) is not None:
                     return True, "User exists"
                 else:
+                    self._remember_missing(user_id)
                     return False, "User does not exist"
         except SQLAlchemyError as e:
             logger.error(f"Failed to check if user exists {user_id}: {e}")
             return False, "Database error: Failed to check user existence"
 
     def get_status(self, user_id: str) -> Optional[Dict[str, Any]]:
+        if self._write_buffer is not None:
+            pending = self._write_buffer.get(user_id)
+            if pending is not None:
+                # not flushed yet, so it's newer than whatever the DB has (and too recent to be stale).
+                # other workers only see it after the flush, which also drops it if the user was deleted meanwhile
+                if not pending.status_data:
+                    return {
+                        'user_id': user_id,
+                        'status': {}
+                    }
+
+                return {
+                    'user_id': user_id,
+                    'status': dict(pending.status_data),
+                    'last_updated': pending.last_updated,
+                    'created_at': pending.created_at
+                }
+
+        if self._known_missing(user_id):
+            return None
+
         try:
             self.cleanup_old_status(user_id)
 
             with self.SessionLocal() as session:
-                user = self._select_user_by_user_id(session, user_id)
+                row = session.execute(
+                    select(User.user_id, User.created_at, User.last_updated, *STATUS_SELECT)
+                    .where(User.user_id == user_id)
+                ).one_or_none()
 
-                if user is None:
+                if row is None:
+                    self._remember_missing(user_id)
                     return None
 
                 try:
-                    status = user.status_data
+                    status = unpack_status(row[3:])
                 except Exception:
                     status = {}
 
-                if not status or user.last_updated is None:
+                if not status or row.last_updated is None:
                     return {
-                        'user_id': user.user_id,
+                        'user_id': row.user_id,
                         'status': {}
                     }
 
                 return {
-                    'user_id': user.user_id,
+                    'user_id': row.user_id,
                     'status': status,
-                    'last_updated': user.last_updated,
-                    'created_at': user.created_at
+                    'last_updated': row.last_updated,
+                    'created_at': row.created_at
                 }
 
         except SQLAlchemyError as e:
             logger.error(f"Failed to get status for user {user_id}: {e}")
             return None
 
+    def get_presence(self, user_ids: list[str]) -> Dict[str, Presence]:
+        presence: Dict[str, Presence] = {}
+        try:
+            with self.SessionLocal() as session:
+                for i in range(0, len(user_ids), 500):  # stay below SQLite's bound parameter limit
+                    rows = session.execute(
+                        select(User.user_id, User.last_updated, User.is_idling, User.language)
+                        .where(User.user_id.in_(user_ids[i:i + 500]))
+                    )
+                    for row in rows:
+                        presence[row.user_id] = Presence(row.last_updated, bool(row.is_idling), row.language)
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get presence of {len(user_ids)} users: {e}")
+
+        if self._write_buffer is not None:
+            for user_id in presence:
+                pending = self._write_buffer.get(user_id)
+                if pending is not None:
+                    language = pending.status_data.get("language")
+                    presence[user_id] = Presence(
+                        pending.last_updated if pending.status_data else None,
+                        pending.status_data.get("isIdling") is True,
+                        language if isinstance(language, str) else None,
+                    )
+        return presence
+
+    def _known_missing(self, user_id: str) -> bool:
+        if self.negative_cache is not None and user_id in self.negative_cache:
+            mark_cached()
+            return True
+        return False
+
+    def _remember_missing(self, user_id: str) -> None:
+        if self.negative_cache is not None:
+            self.negative_cache.add(user_id)
+
     def _user_exists(self, session: Session, user_id: str) -> bool:
         try:
             return self._select_user_by_user_id(session, user_id) is not None
@@ -195,7 +594,7 @@ class Database:
             logger.error(f"Failed to check if user exists {user_id}: {e}")
             return False
 
-    def cleanup_old_status(self, user_id: str, max_age_minutes: int = 10) -> bool:
+    def cleanup_old_status(self, user_id: str, max_age_minutes: int = STATUS_MAX_AGE_MINUTES) -> bool:
         try:
             with self.SessionLocal() as session:
                 user = self._select_user_by_user_id(session, user_id)
@@ -206,7 +605,7 @@ class Database:
                 last_updated = user.last_updated
 
                 if last_updated is None:
-                    user.status_data = {}
+                    self._write_status(user, {})
                     user.last_updated = None
 
                     session.commit()
@@ -218,7 +617,7 @@ class Database:
                 cutoff_time = datetime.now(tz=timezone.utc) - timedelta(minutes=max_age_minutes)
 
                 if last_updated_time < cutoff_time:
-                    user.status_data = {}
+                    self._write_status(user, {})
                     user.last_updated = None
 
                     session.commit()
@@ -231,5 +630,105 @@ class Database:
             logger.error(f"Failed to cleanup old status for user {user_id}: {e}")
             return False
 
-
-db = Database()
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        stats: Dict[str, Dict[str, int]] = {}
+        if self.negative_cache is not None:
+            stats["negative_cache"] = self.negative_cache.stats()  # suppressed = unknown-ID lookups that skipped the DB
+        if self.token_cache is not None:
+            stats["token_cache"] = self.token_cache.stats()  # hits = token checks that skipped the DB and the hash
+        return stats
+
+    def close(self) -> None:
+        if self._write_buffer is not None:
+            self._write_buffer.close()
+        self.engine.dispose()
+
+
+class PostgresDatabase(Database):
+    """
+    Same ORM code as the SQLite backend, but pointed at a server database (anything
+    SQLAlchemy has a dialect + driver for, e.g. postgresql+psycopg://...) with a tuned
+    connection pool so multiple hosts/workers can share one store.
+    """
+
+    name = "postgresql"
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_recycle: int = 1800,
+        coalesce_ms: int = 0,
+        negative_cache_ttl_s: float = 0,
+        token_cache_ttl_s: float = 0,
+    ):
+        super().__init__(url=url, coalesce_ms=coalesce_ms, negative_cache_ttl_s=negative_cache_ttl_s, token_cache_ttl_s=token_cache_ttl_s, engine_kwargs={
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_recycle": pool_recycle,  # drop connections before the server/proxy idles them out
+            "pool_pre_ping": True,  # cheap SELECT 1 on checkout so a restarted server doesn't 500 the first request
+            "pool_use_lifo": True,  # reuse warm connections so the extras can actually be recycled when idle
+        })
+
+
+def create_database(backend: str = DATABASE_BACKEND, url: str | None = DATABASE_URL) -> StorageBackend:
+    match backend:
+        case "sqlite":
+            return Database(
+                url=url,
+                coalesce_ms=STATUS_COALESCE_MS,
+                negative_cache_ttl_s=NEGATIVE_CACHE_TTL_S,
+                token_cache_ttl_s=TOKEN_CACHE_TTL_S,
+            )
+        case "postgresql" | "postgres":
+            if not url:
+                raise ValueError("DATABASE_URL must be set when DATABASE_BACKEND is \"postgresql\"")
+            return PostgresDatabase(
+                url,
+                pool_size=DATABASE_POOL_SIZE,
+                max_overflow=DATABASE_MAX_OVERFLOW,
+                pool_recycle=DATABASE_POOL_RECYCLE,
+                coalesce_ms=STATUS_COALESCE_MS,
+                negative_cache_ttl_s=NEGATIVE_CACHE_TTL_S,
+                token_cache_ttl_s=TOKEN_CACHE_TTL_S,
+            )
+        case "memory":
+            from modules.utils.memory_database import MemoryDatabase
+            return MemoryDatabase(token_cache_ttl_s=TOKEN_CACHE_TTL_S)
+        case _:
+            raise ValueError(f"Unknown DATABASE_BACKEND \"{backend}\" (expected sqlite, postgresql or memory)")
+
+
+_db: StorageBackend | None = None
+_db_lock = Lock()
+
+
+def get_db() -> StorageBackend:
+    """The configured backend, created on first use instead of at import time."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = create_database()
+    return _db
+
+
+def reset_db() -> None:
+    """Forget the current backend so the next get_db() creates a new one (its engine isn't closed)."""
+    global _db
+    with _db_lock:
+        _db = None
+
+
+def close_db() -> None:
+    """Flushes and closes the backend if it was created, the next get_db() creates a new one."""
+    global _db
+    with _db_lock:
+        if _db is not None:
+            _db.close()
+            _db = None
+
+
+# importable as before (`from modules.utils.database import db`), but nothing is created until it's used
+db: StorageBackend = LocalProxy(get_db)  # type: ignore[assignment]
@@ -0,0 +1,486 @@
+import heapq
+import hmac
+import os
+import secrets
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Dict, Iterable
+from sqlalchemy import Integer, String, create_engine, delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import DeclarativeBase, Mapped, MappedColumn
+from modules.utils.database import db
+from modules.utils.gv import GROUP_MAX_MEMBERS, GROUP_REFRESH_S, GROUPS_MAX_PER_USER
+from modules.utils.logger import logger
+from modules.utils.storage_backend import DATETIME_NOW, STATUS_MAX_AGE_MINUTES, Presence, StorageBackend
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Group(Base):
+    __tablename__ = "groups"
+
+    name: Mapped[str] = MappedColumn(String(64), primary_key=True)
+    invite_code: Mapped[str] = MappedColumn(String(32), nullable=False)  # needed to join
+    created_at: Mapped[str] = MappedColumn(String, default=DATETIME_NOW)
+    version: Mapped[int] = MappedColumn(Integer, nullable=False, default=1)  # bumped on every membership change
+
+
+class GroupMember(Base):
+    __tablename__ = "group_members"
+
+    group_name: Mapped[str] = MappedColumn(String(64), primary_key=True)
+    user_id: Mapped[str] = MappedColumn(String(32), primary_key=True, index=True)
+    joined_at: Mapped[str] = MappedColumn(String, default=DATETIME_NOW)
+
+
+DATA_DIR: Path = Path(__file__).resolve().parent.parent.parent.parent / "data"
+
+EVICT_AFTER_S = 600  # rollups of groups nobody asked about for this long are dropped
+TOP_LANGUAGES = 5
+
+# like in database.py, forked workers inherit this and skip create_all when the master already ran it
+_initialized_urls: set[str] = set()
+
+
+def _seen_at(presence: Presence) -> float | None:
+    return datetime.fromisoformat(presence.last_updated).timestamp() if presence.last_updated else None
+
+
+class GroupRollup:
+    """
+    Presence of one group's members, updated as heartbeats come in so reading it doesn't look at every
+    member. Only members seen in the last `max_age_s` are tracked (with running counts of idle ones and
+    of their languages), everyone else is offline. A heap of expiry times drops members that went quiet.
+    """
+
+    def __init__(self, name: str, members: Iterable[str], version: int, max_age_s: float):
+        self.name = name
+        self.members: set[str] = set(members)
+        self.version = version
+        self.max_age_s = max_age_s
+        self.last_read = time.monotonic()
+
+        self.present: dict[str, tuple[float, bool, str | None]] = {}  # user -> (seen at, idling, language)
+        self.idle = 0
+        self.languages: Counter[str] = Counter()
+        self._expiry: list[tuple[float, str]] = []
+        self._queued: set[str] = set()  # members with an entry in _expiry, so it never holds more than one each
+
+    def update(self, user_id: str, seen_at: float, idling: bool, language: str | None) -> None:
+        if user_id not in self.members:
+            return
+
+        old = self.present.get(user_id)
+        if old is not None:
+            if seen_at < old[0]:
+                return  # older than what we have, e.g. a refresh racing a heartbeat
+            self._count(old, -1)
+
+        entry = (seen_at, idling, language)
+        self.present[user_id] = entry
+        self._count(entry, 1)
+        if user_id not in self._queued:
+            self._queued.add(user_id)
+            heapq.heappush(self._expiry, (seen_at + self.max_age_s, user_id))
+
+    def remove(self, user_id: str) -> None:
+        old = self.present.pop(user_id, None)
+        if old is not None:
+            self._count(old, -1)
+
+    def _count(self, entry: tuple[float, bool, str | None], sign: int) -> None:
+        if entry[1]:
+            self.idle += sign
+        if entry[2]:
+            self.languages[entry[2]] += sign
+            if self.languages[entry[2]] <= 0:
+                del self.languages[entry[2]]
+
+    def expire(self, now: float) -> None:
+        while self._expiry and self._expiry[0][0] <= now:
+            _, user_id = heapq.heappop(self._expiry)
+            entry = self.present.get(user_id)
+            if entry is not None and entry[0] + self.max_age_s > now:
+                heapq.heappush(self._expiry, (entry[0] + self.max_age_s, user_id))  # seen again since
+                continue
+            self._queued.discard(user_id)
+            self.remove(user_id)
+
+    def summary(self, now: float, member_ids: bool = False) -> Dict[str, Any]:
+        """Counts and top languages, plus who is online/idle/offline when `member_ids` is set (only for members)."""
+        self.expire(now)
+        summary: Dict[str, Any] = {
+            'group': self.name,
+            'members': len(self.members),
+            'counts': {'online': len(self.present) - self.idle, 'idle': self.idle, 'offline': len(self.members) - len(self.present)},
+            'top_languages': [{'name': name, 'members': count} for name, count in self.languages.most_common(TOP_LANGUAGES)],
+        }
+
+        if member_ids:
+            online: list[str] = []
+            idle: list[str] = []
+            for user_id, (_, idling, _) in self.present.items():
+                (idle if idling else online).append(user_id)
+            summary['online'] = online
+            summary['idle'] = idle
+            summary['offline'] = list(self.members.difference(self.present))
+        return summary
+
+
+class GroupPresence:
+    """
+    Named groups of users (data/groups.db) and an in-memory GroupRollup per group.
+
+    A group's rollup is built the first time it's asked for, from one bulk read of its members'
+    statuses. After that record() keeps it current with every /update-status this process handles,
+    and a background thread catches up every `refresh_s` with heartbeats handled by other workers.
+    Membership changes made by other workers are applied before the next summary, as soon as
+    `PRAGMA data_version` shows groups.db changed.
+    """
+
+    def __init__(
+        self,
+        db_file: str = "groups.db",
+        refresh_s: float = 30,
+        max_members: int = 1000,
+        max_groups_per_user: int = 10,
+        max_age_s: float = STATUS_MAX_AGE_MINUTES * 60,
+        storage: StorageBackend | None = None,
+    ):
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self.path: str = str(DATA_DIR / db_file)
+        self.db_file = f"sqlite:///{self.path}"
+        self.engine = create_engine(self.db_file, echo=False, future=True, connect_args={"timeout": 10})
+
+        self.refresh_s = refresh_s
+        self.max_members = max_members
+        self.max_groups_per_user = max_groups_per_user
+        self.max_age_s = max_age_s
+        self._storage = storage  # None = the configured backend
+
+        self._rollups: dict[str, GroupRollup] = {}
+        self._user_groups: dict[str, set[str]] = {}  # member -> names of their loaded groups
+        self._lock = Lock()
+        self._version_conn: sqlite3.Connection | None = None
+        self._seen_version: int | None = None  # data_version the loaded memberships were last checked at
+        self._refresher_pid: int | None = None
+        self._stopped = Event()
+
+        self._init_database()
+
+    def _init_database(self):
+        if self.db_file in _initialized_urls:
+            return
+
+        try:
+            with self.engine.begin() as conn:
+                conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+            Base.metadata.create_all(bind=self.engine, checkfirst=True)
+            _initialized_urls.add(self.db_file)
+            logger.info("Group database initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize group database: {e}")
+
+    @property
+    def storage(self) -> StorageBackend:
+        return self._storage if self._storage is not None else db
+
+    #* membership
+
+    def join(self, user_id: str, group: str, invite_code: str | None) -> tuple[bool, str, str | None]:
+        """Joins the group, creating it if it doesn't exist. Returns (success, message, invite code if created)."""
+        created_code = None
+        try:
+            with self.engine.begin() as conn:
+                row = conn.execute(select(Group.invite_code).where(Group.name == group)).one_or_none()
+                groups = conn.execute(select(func.count()).select_from(GroupMember).where(GroupMember.user_id == user_id)).scalar_one()
+
+                if row is not None:
+                    if not hmac.compare_digest(row.invite_code.encode(), (invite_code or "").encode()):
+                        return False, "Invalid invite code", None
+                    members = conn.execute(select(GroupMember.user_id).where(GroupMember.group_name == group)).scalars().all()
+                    if user_id in members:
+                        return False, "Already a member of this group", None
+                    if len(members) >= self.max_members:
+                        return False, f"Group is full (at most {self.max_members} members)", None
+
+                if groups >= self.max_groups_per_user:
+                    return False, f"At most {self.max_groups_per_user} groups per user", None
+
+                if row is None:
+                    created_code = secrets.token_urlsafe(16)
+                    conn.execute(insert(Group).values(name=group, invite_code=created_code, created_at=DATETIME_NOW(), version=1))
+                else:
+                    conn.execute(update(Group).where(Group.name == group).values(version=Group.version + 1))
+                conn.execute(insert(GroupMember).values(group_name=group, user_id=user_id, joined_at=DATETIME_NOW()))
+        except IntegrityError:
+            return False, "Group was just created by someone else, join it with its invite code", None
+
+        self._member_added(group, user_id)
+        if created_code is not None:
+            return True, "Group created successfully", created_code
+        return True, "Joined group successfully", None
+
+    def leave(self, user_id: str, group: str) -> bool:
+        with self.engine.begin() as conn:
+            left = self._leave(conn, user_id, group)
+
+        if left:
+            self._member_removed(group, user_id)
+        return left
+
+    def is_member(self, user_id: str, group: str) -> bool:
+        # from the database, the rollup only learns about other workers' joins on the next refresh
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(GroupMember.user_id).where(GroupMember.group_name == group, GroupMember.user_id == user_id)
+            ).first() is not None
+
+    def delete_user(self, user_id: str) -> None:
+        with self.engine.begin() as conn:
+            groups = conn.execute(select(GroupMember.group_name).where(GroupMember.user_id == user_id)).scalars().all()
+            for group in groups:
+                self._leave(conn, user_id, group)
+
+        for group in groups:
+            self._member_removed(group, user_id)
+
+    def _leave(self, conn, user_id: str, group: str) -> bool:
+        deleted = conn.execute(delete(GroupMember).where(GroupMember.group_name == group, GroupMember.user_id == user_id)).rowcount
+        if not deleted:
+            return False
+
+        remaining = conn.execute(select(func.count()).select_from(GroupMember).where(GroupMember.group_name == group)).scalar_one()
+        if remaining:
+            conn.execute(update(Group).where(Group.name == group).values(version=Group.version + 1))
+        else:
+            conn.execute(delete(Group).where(Group.name == group))  # the last member took it with them
+        return True
+
+    def _member_added(self, group: str, user_id: str) -> None:
+        with self._lock:
+            rollup = self._rollups.get(group)
+            if rollup is None:
+                return
+            rollup.members.add(user_id)
+            self._user_groups.setdefault(user_id, set()).add(group)
+        self._seed(rollup, [user_id])
+
+    def _member_removed(self, group: str, user_id: str) -> None:
+        with self._lock:
+            rollup = self._rollups.get(group)
+            if rollup is None:
+                return
+            rollup.remove(user_id)
+            rollup.members.discard(user_id)
+            self._unindex(group, [user_id])
+            if not rollup.members:
+                del self._rollups[group]  # _leave deleted the group
+
+    def _unindex(self, group: str, user_ids: Iterable[str]) -> None:
+        for user_id in user_ids:
+            groups = self._user_groups.get(user_id)
+            if groups is not None:
+                groups.discard(group)
+                if not groups:
+                    del self._user_groups[user_id]
+
+    #* rollups
+
+    def record(self, user_id: str, status: Dict[str, Any], seen_at: float | None = None) -> None:
+        """A heartbeat this process just stored. Costs one dict lookup for users in no loaded group."""
+        groups = self._user_groups.get(user_id)
+        if not groups:
+            return
+
+        seen_at = time.time() if seen_at is None else seen_at
+        language = status.get("language")
+        language = language if isinstance(language, str) and language else None
+        with self._lock:
+            for group in groups:
+                rollup = self._rollups.get(group)
+                if rollup is None:
+                    continue
+                if status:
+                    rollup.update(user_id, seen_at, status.get("isIdling") is True, language)
+                else:
+                    rollup.remove(user_id)
+
+    def summary(self, group: str, member_ids: bool = False) -> Dict[str, Any] | None:
+        """How many are online, idle and offline in the group (and who, with `member_ids`), and their top languages. None if it doesn't exist."""
+        if self._rollups and self._groups_changed():
+            self._sync_members()  # another worker may have changed or deleted this group
+        rollup = self._rollups.get(group) or self._load(group)
+        if rollup is None:
+            return None
+
+        with self._lock:
+            rollup.last_read = time.monotonic()
+            return rollup.summary(time.time(), member_ids)
+
+    def _groups_changed(self) -> bool:
+        # a connection of its own, like the status bus poller: data_version changes whenever any other
+        # connection (another worker, or this one's pool) commits to groups.db, i.e. on every join/leave
+        with self._lock:
+            if self._version_conn is None:
+                self._version_conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+            changed, self._seen_version = version != self._seen_version, version
+        return changed
+
+    def _load(self, group: str) -> GroupRollup | None:
+        with self.engine.connect() as conn:
+            version = conn.execute(select(Group.version).where(Group.name == group)).scalar_one_or_none()
+            if version is None:
+                return None
+            members = conn.execute(select(GroupMember.user_id).where(GroupMember.group_name == group)).scalars().all()
+
+        rollup = GroupRollup(group, members, version, self.max_age_s)
+        self._seed(rollup, members)
+
+        with self._lock:
+            if group in self._rollups:
+                return self._rollups[group]  # another thread was faster
+            self._rollups[group] = rollup
+            for user_id in rollup.members:
+                self._user_groups.setdefault(user_id, set()).add(group)
+
+        self._ensure_refresher()
+        return rollup
+
+    def _seed(self, rollup: GroupRollup, user_ids: list[str]) -> None:
+        # heartbeats recorded meanwhile are newer, update() keeps those
+        presence = self.storage.get_presence(list(user_ids))
+        with self._lock:
+            for user_id, p in presence.items():
+                seen_at = _seen_at(p)
+                if seen_at is not None:
+                    rollup.update(user_id, seen_at, p.is_idling, p.language)
+
+    def _ensure_refresher(self) -> None:
+        # the thread doesn't survive a fork, so each process with rollups starts its own
+        if self._refresher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._refresher_pid != os.getpid():
+                self._refresher_pid = os.getpid()
+                Thread(target=self._run, name="group-presence-refresher", daemon=True).start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.refresh_s):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Group presence refresh failed: {e}")
+
+    def refresh(self) -> None:
+        """Drops unused rollups, reloads changed memberships and catches up with other workers' heartbeats."""
+        self._sync_members()
+
+        with self._lock:
+            user_ids = list(self._user_groups)
+        if not user_ids:
+            return
+
+        presence = self.storage.get_presence(user_ids)
+        with self._lock:
+            for user_id, p in presence.items():
+                seen_at = _seen_at(p)
+                if seen_at is None:
+                    continue
+                for group in self._user_groups.get(user_id, ()):
+                    rollup = self._rollups.get(group)
+                    if rollup is not None:
+                        rollup.update(user_id, seen_at, p.is_idling, p.language)
+
+    def _sync_members(self) -> None:
+        """Drops unused rollups and those of deleted groups, and reloads the members of groups whose version changed."""
+        now = time.monotonic()
+        with self._lock:
+            for group in [g for g, r in self._rollups.items() if now - r.last_read > EVICT_AFTER_S]:
+                self._unindex(group, self._rollups.pop(group).members)
+            loaded = dict(self._rollups)
+        if not loaded:
+            return
+
+        with self.engine.connect() as conn:
+            versions = dict(conn.execute(select(Group.name, Group.version).where(Group.name.in_(list(loaded)))).all())
+            changed = [group for group, rollup in loaded.items() if versions.get(group) != rollup.version]
+            members = {
+                group: set(conn.execute(select(GroupMember.user_id).where(GroupMember.group_name == group)).scalars())
+                for group in changed if group in versions
+            }
+
+        added: dict[str, list[str]] = {}
+        with self._lock:
+            for group in changed:
+                rollup = loaded[group]
+                if group not in versions:
+                    self._rollups.pop(group, None)
+                    self._unindex(group, rollup.members)
+                    continue
+                for user_id in rollup.members - members[group]:
+                    rollup.remove(user_id)
+                self._unindex(group, rollup.members - members[group])
+                added[group] = list(members[group] - rollup.members)
+                for user_id in added[group]:
+                    self._user_groups.setdefault(user_id, set()).add(group)
+                rollup.members, rollup.version = members[group], versions[group]
+
+        # new members' presence right away, not only on the next refresh
+        for group, user_ids in added.items():
+            if user_ids:
+                self._seed(loaded[group], user_ids)
+
+    def close(self) -> None:
+        self._stopped.set()
+        with self._lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+        self.engine.dispose()
+
+
+_presence: GroupPresence | None = None
+_presence_lock = Lock()
+
+
+def get_presence() -> GroupPresence:
+    """The group presence rollups, created on first use instead of at import time."""
+    global _presence
+    if _presence is None:
+        with _presence_lock:
+            if _presence is None:
+                _presence = GroupPresence(refresh_s=GROUP_REFRESH_S, max_members=GROUP_MAX_MEMBERS, max_groups_per_user=GROUPS_MAX_PER_USER)
+    return _presence
+
+
+def record(user_id: str, status: Dict[str, Any]) -> None:
+    """record() for the routes: only touches groups this process has loaded, and never raises."""
+    if _presence is None:
+        return  # no group was asked for yet, so there's nothing to keep up to date
+    try:
+        _presence.record(user_id, status)
+    except Exception as e:
+        logger.error(f"Failed to update group presence of {user_id}: {e}")
+
+
+def reset_presence() -> None:
+    global _presence
+    with _presence_lock:
+        _presence = None
+
+
+def close_presence() -> None:
+    global _presence
+    with _presence_lock:
+        if _presence is not None:
+            _presence.close()
+            _presence = None
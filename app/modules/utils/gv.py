@@ -8,3 +8,53 @@ LOGGER_DISCORD_WEBHOOK_URL: str | None = os.getenv("LOGGER_DISCORD_WEBHOOK_URL",
 TELEMETRY_DISCORD_WEBHOOK_URL: str | None = os.getenv("TELEMETRY_DISCORD_WEBHOOK_URL", None)
 CLOUDFLARE_TUNNEL: bool = (os.getenv("CLOUDFLARE_TUNNEL", "false").lower()) == "true"
 RATE_LIMITING: bool = (os.getenv("RATE_LIMITING", "true").lower()) == "true"
+RATE_LIMIT_STORAGE: str = os.getenv("RATE_LIMIT_STORAGE", "memcached").lower()
+RATE_LIMIT_STORAGE_URI: str | None = os.getenv("RATE_LIMIT_STORAGE_URI", None) or None
+RATE_LIMIT_STRATEGY: str | None = os.getenv("RATE_LIMIT_STRATEGY", None) or None
+
+
+def route_limit_override(route_name: str) -> str | None:
+    """Per-route limit from .env, e.g. RATE_LIMIT_GET_STATUS="90 per minute" for the get_status route."""
+    return os.getenv(f"RATE_LIMIT_{route_name.upper()}", None) or None
+
+
+DATABASE_BACKEND: str = os.getenv("DATABASE_BACKEND", "sqlite").lower()
+DATABASE_URL: str | None = os.getenv("DATABASE_URL", None) or None
+DATABASE_POOL_SIZE: int = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+DATABASE_MAX_OVERFLOW: int = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+DATABASE_POOL_RECYCLE: int = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+STATUS_COALESCE_MS: int = int(os.getenv("STATUS_COALESCE_MS", "0"))
+STATUS_COALESCE_MAX_PENDING: int = int(os.getenv("STATUS_COALESCE_MAX_PENDING", "1000"))
+STATUS_TOUCH_INTERVAL_S: int = int(os.getenv("STATUS_TOUCH_INTERVAL_S", "60"))
+NEGATIVE_CACHE_TTL_S: float = float(os.getenv("NEGATIVE_CACHE_TTL_S", "0"))
+MAX_REQUEST_BYTES: int = int(os.getenv("MAX_REQUEST_BYTES", "16384"))
+TOKEN_CACHE_TTL_S: float = float(os.getenv("TOKEN_CACHE_TTL_S", "0"))
+ASGI_THREADS: int = int(os.getenv("ASGI_THREADS", "32"))
+GUNICORN_PROFILE: str = os.getenv("GUNICORN_PROFILE", "gthread").lower()
+GUNICORN_BIND: str = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+GUNICORN_WORKERS: int | None = int(os.getenv("GUNICORN_WORKERS", "0")) or None
+GUNICORN_THREADS: int | None = int(os.getenv("GUNICORN_THREADS", "0")) or None
+TRUSTED_PROXY_HOPS: int = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+ICON_BASE_URL: str | None = os.getenv("ICON_BASE_URL", "").rstrip("/") or None
+ICON_MAP_RELOAD_S: float = float(os.getenv("ICON_MAP_RELOAD_S", "5"))
+RESOLVE_ICONS_MAX_ITEMS: int = int(os.getenv("RESOLVE_ICONS_MAX_ITEMS", "10000"))
+RESOLVE_ICONS_MAX_BYTES: int = int(os.getenv("RESOLVE_ICONS_MAX_BYTES", "1048576"))
+HISTORY_ENABLED: bool = (os.getenv("HISTORY_ENABLED", "false").lower()) == "true"
+HISTORY_FLUSH_MS: int = int(os.getenv("HISTORY_FLUSH_MS", "1000"))
+HISTORY_MAX_PENDING: int = int(os.getenv("HISTORY_MAX_PENDING", "10000"))
+HISTORY_RETENTION_DAYS: int = int(os.getenv("HISTORY_RETENTION_DAYS", "90"))
+STATUS_BUS_ENABLED: bool = (os.getenv("STATUS_BUS_ENABLED", "false").lower()) == "true"
+STATUS_BUS_POLL_MS: int = int(os.getenv("STATUS_BUS_POLL_MS", "50"))
+STATUS_BUS_RETENTION_S: float = float(os.getenv("STATUS_BUS_RETENTION_S", "3600"))
+STREAM_MAX_S: float = float(os.getenv("STREAM_MAX_S", "300"))
+WEBHOOKS_ENABLED: bool = (os.getenv("WEBHOOKS_ENABLED", "false").lower()) == "true"
+WEBHOOK_MAX_PER_USER: int = int(os.getenv("WEBHOOK_MAX_PER_USER", "5"))
+WEBHOOK_MAX_ATTEMPTS: int = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+WEBHOOK_CONCURRENCY_PER_TARGET: int = int(os.getenv("WEBHOOK_CONCURRENCY_PER_TARGET", "2"))
+WEBHOOK_POLL_MS: int = int(os.getenv("WEBHOOK_POLL_MS", "500"))
+WEBHOOK_ALLOW_PRIVATE: bool = (os.getenv("WEBHOOK_ALLOW_PRIVATE", "false").lower()) == "true"
+GROUPS_ENABLED: bool = (os.getenv("GROUPS_ENABLED", "false").lower()) == "true"
+GROUP_MAX_MEMBERS: int = int(os.getenv("GROUP_MAX_MEMBERS", "1000"))
+GROUPS_MAX_PER_USER: int = int(os.getenv("GROUPS_MAX_PER_USER", "10"))
+GROUP_REFRESH_S: float = float(os.getenv("GROUP_REFRESH_S", "30"))
+ADMIN_TOKEN: str | None = os.getenv("ADMIN_TOKEN", None) or None
@@ -0,0 +1,453 @@
+import atexit
+import time
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Dict
+from sqlalchemy import Boolean, Integer, String, create_engine, delete, func, inspect, select, union
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import DeclarativeBase, Mapped, MappedColumn, aliased
+from werkzeug.local import LocalProxy
+from modules.utils.gv import HISTORY_FLUSH_MS, HISTORY_MAX_PENDING, HISTORY_RETENTION_DAYS
+from modules.utils.logger import logger
+from modules.utils.storage_backend import STATUS_MAX_AGE_MINUTES
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class HistoryString(Base):
+    """Every distinct user ID / language / workspace / repo / branch / file name, stored once."""
+    __tablename__ = "history_strings"
+
+    id: Mapped[int] = MappedColumn(Integer, primary_key=True, autoincrement=True)
+    value: Mapped[str] = MappedColumn(String, nullable=False, unique=True)
+
+
+class Heartbeat(Base):
+    """
+    One row per /update-status. The primary key starts with the day, and the table has no rowid,
+    so each day's rows sit together at the end of the b-tree (appends only touch the last pages)
+    and dropping old days is a range delete, like dropping a partition.
+    """
+    __tablename__ = "heartbeats"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    day: Mapped[int] = MappedColumn(Integer, primary_key=True)  # days since the epoch (UTC)
+    user_ref: Mapped[int] = MappedColumn(Integer, primary_key=True)  # history_strings.id of the user ID
+    second: Mapped[int] = MappedColumn(Integer, primary_key=True)  # seconds since midnight (UTC)
+
+    # history_strings ids, NULL when the status didn't have the key
+    language: Mapped[int | None] = MappedColumn(Integer, nullable=True)
+    workspace: Mapped[int | None] = MappedColumn(Integer, nullable=True)
+    git_repo: Mapped[int | None] = MappedColumn(Integer, nullable=True)
+    git_branch: Mapped[int | None] = MappedColumn(Integer, nullable=True)
+    file_name: Mapped[int | None] = MappedColumn(Integer, nullable=True)
+    is_idling: Mapped[bool] = MappedColumn(Boolean, nullable=False, default=False)
+
+
+class DailyStat(Base):
+    """
+    Seconds spent per user, day and language/workspace/branch, updated in the same transaction that
+    writes the heartbeats, so /get-stats sums at most a few rows per day instead of replaying history.
+    Kept after the heartbeats themselves are deleted by the retention policy.
+    """
+    __tablename__ = "daily_stats"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    user_ref: Mapped[int] = MappedColumn(Integer, primary_key=True)
+    day: Mapped[int] = MappedColumn(Integer, primary_key=True)
+    dimension: Mapped[int] = MappedColumn(Integer, primary_key=True)  # see STAT_DIMENSIONS
+    value_ref: Mapped[int] = MappedColumn(Integer, primary_key=True)  # history_strings id, 0 if the status didn't have it
+    seconds: Mapped[int] = MappedColumn(Integer, nullable=False, default=0)
+
+
+class StatsCursor(Base):
+    """The last heartbeat counted into daily_stats for each user, the time until the next one is credited to it."""
+    __tablename__ = "stats_cursors"
+
+    user_ref: Mapped[int] = MappedColumn(Integer, primary_key=True)
+    ts: Mapped[int] = MappedColumn(Integer, nullable=False)
+    language: Mapped[int] = MappedColumn(Integer, nullable=False, default=0)
+    workspace: Mapped[int] = MappedColumn(Integer, nullable=False, default=0)
+    git_branch: Mapped[int] = MappedColumn(Integer, nullable=False, default=0)
+    is_idling: Mapped[bool] = MappedColumn(Boolean, nullable=False, default=False)
+
+
+# status key -> Heartbeat column, all of them interned through history_strings
+HISTORY_KEYS: dict[str, str] = {
+    "language": "language",
+    "workspace": "workspace",
+    "gitRepo": "git_repo",
+    "gitBranch": "git_branch",
+    "fileName": "file_name",
+}
+
+# daily_stats.dimension -> (Heartbeat/StatsCursor column the time is grouped by, key in stats()), 0 is the total
+STAT_DIMENSIONS: dict[int, tuple[str | None, str]] = {
+    0: (None, "total"),
+    1: ("language", "languages"),
+    2: ("workspace", "workspaces"),
+    3: ("git_branch", "git_branches"),
+}
+
+DAY_S = 86400
+RETENTION_CHECK_S = 3600
+
+# a gap longer than this between two heartbeats counts as time away, the same window after which
+# cleanup_old_status considers a status stale
+IDLE_AFTER_S = STATUS_MAX_AGE_MINUTES * 60
+
+# (ts, language, workspace, git_branch, is_idling) of a heartbeat, as string ids (0 = none)
+StatsPoint = tuple[int, int, int, int, bool]
+
+# (user_id, unix time, language, workspace, git_repo, git_branch, file_name, is_idling)
+PendingHeartbeat = tuple[str, int, str | None, str | None, str | None, str | None, str | None, bool]
+
+# like in database.py, forked workers inherit this and skip create_all when the master already ran it
+_initialized_urls: set[str] = set()
+
+
+class HistoryDatabase:
+    """
+    Append-only heartbeat history in its own SQLite file (data/history.db).
+
+    record() only appends to an in-memory list; a background thread writes everything collected
+    every `flush_ms` in one transaction (sooner once `max_pending` rows are waiting, and on shutdown),
+    so the heartbeat path never waits on this database. Days older than `retention_days` are
+    deleted by the same thread.
+    """
+
+    def __init__(self, db_file: str = "history.db", flush_ms: int = 1000, retention_days: int = 90, max_pending: int = 10000):
+        self.db_file = f"sqlite:///{Path(__file__).resolve().parent.parent.parent.parent / 'data' / db_file}"
+        self.engine = create_engine(self.db_file, echo=False, future=True)
+
+        self._interval: float = flush_ms / 1000
+        self._retention_days = retention_days
+        self._max_pending = max_pending
+        self._last_retention: float = 0
+        self._strings_dirty = False  # delete_user left strings that may now be unused
+
+        self._pending: list[PendingHeartbeat] = []
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._wake = Event()
+        self._stopped = Event()
+        self._thread: Thread | None = None
+
+        self._init_database()
+        atexit.register(self.close)
+
+    def _init_database(self):
+        if self.db_file in _initialized_urls:
+            return
+
+        try:
+            had_stats = inspect(self.engine).has_table(DailyStat.__tablename__)
+            Base.metadata.create_all(bind=self.engine, checkfirst=True)
+            if not had_stats:
+                self.rebuild_stats()  # history written before daily_stats existed
+            _initialized_urls.add(self.db_file)
+            logger.info("History database initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize history database: {e}")
+
+    def record(self, user_id: str, status_data: Dict[str, Any], now: float | None = None) -> None:
+        """Queues a heartbeat, timestamped with the server's clock (not the client's `timestamp`)."""
+        values = [status_data.get(key) for key in HISTORY_KEYS]
+        row: PendingHeartbeat = (
+            user_id,
+            int(time.time() if now is None else now),
+            *(value if type(value) is str and value else None for value in values),
+            status_data.get("isIdling") is True,
+        )  # type: ignore[assignment]
+
+        with self._lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self._max_pending
+
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(batch)} heartbeats to history: {e}")
+                    with self._lock:
+                        # keep them for the next try, but don't grow without bound while the DB is broken
+                        if len(self._pending) + len(batch) <= self._max_pending * 10:
+                            self._pending[:0] = batch
+
+            if (self._retention_days > 0 or self._strings_dirty) and time.monotonic() - self._last_retention >= RETENTION_CHECK_S:
+                self._last_retention = time.monotonic()
+                try:
+                    self.apply_retention()
+                except Exception as e:
+                    logger.error(f"Failed to apply history retention: {e}")
+
+    def _write(self, batch: list[PendingHeartbeat]) -> None:
+        # everything in one transaction that starts with a write, so a concurrent string cleanup
+        # (another worker's apply_retention) can't remove ids between lookup and insert
+        with self.engine.begin() as conn:
+            ids = self._intern(conn, {value for row in batch for value in row[:1] + row[2:7] if value is not None})
+
+            rows = []
+            for user_id, ts, *strings, is_idling in batch:
+                row: Dict[str, Any] = {"day": ts // DAY_S, "user_ref": ids[user_id], "second": ts % DAY_S, "is_idling": is_idling}
+                for column, value in zip(HISTORY_KEYS.values(), strings):
+                    row[column] = ids[value] if value is not None else None
+                rows.append(row)
+
+            # two heartbeats from one user in the same second keep the first one
+            conn.execute(insert(Heartbeat).on_conflict_do_nothing(), rows)
+            self._update_stats(conn, rows)
+
+    def _update_stats(self, conn, rows: list[Dict[str, Any]]) -> None:
+        """Adds the time between each user's heartbeats in `rows` (Heartbeat column dicts) to daily_stats."""
+        points: dict[int, list[StatsPoint]] = {}
+        for row in rows:
+            points.setdefault(row["user_ref"], []).append((
+                row["day"] * DAY_S + row["second"],
+                row["language"] or 0, row["workspace"] or 0, row["git_branch"] or 0,
+                bool(row["is_idling"]),
+            ))
+
+        cursors: dict[int, StatsPoint] = {}
+        user_refs = list(points)
+        for i in range(0, len(user_refs), 500):
+            for user_ref, *point in conn.execute(
+                select(StatsCursor.user_ref, StatsCursor.ts, StatsCursor.language, StatsCursor.workspace, StatsCursor.git_branch, StatsCursor.is_idling)
+                .where(StatsCursor.user_ref.in_(user_refs[i:i + 500]))
+            ):
+                cursors[user_ref] = tuple(point)  # type: ignore[assignment]
+
+        seconds: dict[tuple[int, int, int, int], int] = {}
+        for user_ref, user_points in points.items():
+            last = cursors.get(user_ref)
+            for point in sorted(user_points):
+                if last is not None:
+                    if point[0] <= last[0]:
+                        continue  # not newer than what was already counted (e.g. written late by another worker)
+                    _credit(seconds, user_ref, last, point[0])
+                last = point
+            cursors[user_ref] = last  # type: ignore[assignment]
+
+        if seconds:
+            stmt = insert(DailyStat)
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[DailyStat.user_ref, DailyStat.day, DailyStat.dimension, DailyStat.value_ref],
+                    set_={"seconds": DailyStat.seconds + stmt.excluded.seconds},
+                ),
+                [{"user_ref": key[0], "day": key[1], "dimension": key[2], "value_ref": key[3], "seconds": value} for key, value in seconds.items()],
+            )
+
+        stmt = insert(StatsCursor)
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[StatsCursor.user_ref],
+                set_={column: getattr(stmt.excluded, column) for column in ("ts", "language", "workspace", "git_branch", "is_idling")},
+            ),
+            [
+                {"user_ref": user_ref, "ts": ts, "language": language, "workspace": workspace, "git_branch": git_branch, "is_idling": is_idling}
+                for user_ref, (ts, language, workspace, git_branch, is_idling) in cursors.items()
+                if user_ref in points
+            ],
+        )
+
+    def rebuild_stats(self) -> None:
+        """Recomputes daily_stats from the stored heartbeats (only as far back as retention kept them)."""
+        columns = [Heartbeat.day, Heartbeat.user_ref, Heartbeat.second, Heartbeat.language, Heartbeat.workspace, Heartbeat.git_branch, Heartbeat.is_idling]
+        with self.engine.begin() as conn:
+            conn.execute(delete(DailyStat))
+            conn.execute(delete(StatsCursor))
+
+            # day by day, so each batch only continues where the previous one stopped
+            days = conn.execute(select(Heartbeat.day).distinct().order_by(Heartbeat.day)).scalars().all()
+            for day in days:
+                rows = conn.execute(select(*columns).where(Heartbeat.day == day)).mappings().all()
+                self._update_stats(conn, [dict(row) for row in rows])
+
+        if days:
+            logger.info(f"Rebuilt coding time stats from {len(days)} days of history")
+
+    def _intern(self, conn, values: set[str]) -> dict[str, int]:
+        """history_strings ids for `values`, inserting the ones that are new."""
+        if not values:
+            return {}
+
+        ordered = sorted(values)
+        conn.execute(insert(HistoryString).on_conflict_do_nothing(), [{"value": value} for value in ordered])
+
+        ids: dict[str, int] = {}
+        for i in range(0, len(ordered), 500):  # stays well below SQLite's bound parameter limit
+            chunk = ordered[i:i + 500]
+            ids.update(conn.execute(select(HistoryString.value, HistoryString.id).where(HistoryString.value.in_(chunk))).all())
+        return ids
+
+    def apply_retention(self, now: float | None = None) -> int:
+        """
+        Deletes whole days older than the retention period, returns the number of heartbeats deleted.
+        Also drops the strings nothing refers to anymore, after that or after delete_user.
+        """
+        cutoff = int(time.time() if now is None else now) // DAY_S - self._retention_days
+        with self.engine.begin() as conn:
+            deleted = conn.execute(delete(Heartbeat).where(Heartbeat.day <= cutoff)).rowcount if self._retention_days > 0 else 0
+            if deleted or self._strings_dirty:
+                self._strings_dirty = False
+                self._drop_unused_strings(conn)
+
+        if deleted:
+            logger.info(f"Deleted {deleted} heartbeats older than {self._retention_days} days from history")
+        return deleted
+
+    def _drop_unused_strings(self, conn) -> None:
+        columns = [Heartbeat.user_ref] + [getattr(Heartbeat, column) for column in HISTORY_KEYS.values()]
+        columns += [DailyStat.user_ref, DailyStat.value_ref, StatsCursor.language, StatsCursor.workspace, StatsCursor.git_branch]
+        used = union(*(select(column).where(column.is_not(None)) for column in columns))
+        conn.execute(delete(HistoryString).where(HistoryString.id.not_in(used)))
+
+    def delete_user(self, user_id: str) -> None:
+        """
+        Forgets a user's history, including heartbeats still waiting to be written. Strings only the user
+        used are dropped later by the background retention pass, the scan for them is too slow for a request.
+        """
+        with self._lock:
+            self._pending = [row for row in self._pending if row[0] != user_id]
+
+        with self._flush_lock, self.engine.begin() as conn:
+            user_ref = conn.execute(select(HistoryString.id).where(HistoryString.value == user_id)).scalar_one_or_none()
+            if user_ref is None:
+                return
+            conn.execute(delete(Heartbeat).where(Heartbeat.user_ref == user_ref))
+            conn.execute(delete(DailyStat).where(DailyStat.user_ref == user_ref))
+            conn.execute(delete(StatsCursor).where(StatsCursor.user_ref == user_ref))
+        self._strings_dirty = True
+
+    def heartbeats(self, user_id: str, since: int, until: int) -> list[Dict[str, Any]]:
+        """A user's heartbeats with since <= timestamp < until (unix seconds), oldest first."""
+        strings = {column: aliased(HistoryString) for column in HISTORY_KEYS.values()}
+        user = aliased(HistoryString)
+
+        query = select(Heartbeat.day, Heartbeat.second, Heartbeat.is_idling, *(alias.value for alias in strings.values()))
+        query = query.join(user, user.id == Heartbeat.user_ref)
+        for column, alias in strings.items():
+            query = query.outerjoin(alias, alias.id == getattr(Heartbeat, column))
+
+        # the day bounds let SQLite seek into the primary key instead of scanning every day
+        query = query.where(
+            user.value == user_id,
+            Heartbeat.day >= since // DAY_S,
+            Heartbeat.day <= (until - 1) // DAY_S,
+        ).order_by(Heartbeat.day, Heartbeat.second)
+
+        with self.engine.connect() as conn:
+            result = []
+            for day, second, is_idling, *values in conn.execute(query):
+                ts = day * DAY_S + second
+                if since <= ts < until:
+                    result.append({"timestamp": ts, "isIdling": bool(is_idling), **dict(zip(HISTORY_KEYS, values))})
+            return result
+
+    def stats(self, user_id: str, first_day: int, last_day: int) -> Dict[str, Any]:
+        """
+        Seconds spent between two days (inclusive, days since the epoch): the total and per language,
+        workspace and git branch, most used first. Heartbeats still queued in memory aren't included yet.
+        """
+        result: Dict[str, Any] = {key: [] for _, key in STAT_DIMENSIONS.values()}
+        result["total"] = 0
+
+        user_ref = select(HistoryString.id).where(HistoryString.value == user_id).scalar_subquery()
+        query = (
+            select(DailyStat.dimension, HistoryString.value, func.sum(DailyStat.seconds).label("seconds"))
+            .outerjoin(HistoryString, HistoryString.id == DailyStat.value_ref)
+            .where(DailyStat.user_ref == user_ref, DailyStat.day >= first_day, DailyStat.day <= last_day)
+            .group_by(DailyStat.dimension, DailyStat.value_ref)
+            .order_by(DailyStat.dimension, func.sum(DailyStat.seconds).desc())
+        )
+
+        with self.engine.connect() as conn:
+            for dimension, value, seconds in conn.execute(query):
+                key = STAT_DIMENSIONS[dimension][1]
+                if dimension == 0:
+                    result[key] = seconds
+                elif value is not None:  # time with no language/workspace/branch only counts towards the total
+                    result[key].append({"name": value, "seconds": seconds})
+        return result
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        self.flush()
+        self.engine.dispose()
+
+    def _ensure_thread(self) -> None:
+        # started lazily so it lives in the process that actually serves requests (i.e. after a fork)
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            self.flush()
+
+
+def _credit(seconds: dict[tuple[int, int, int, int], int], user_ref: int, last: StatsPoint, until: int) -> None:
+    """Credits the time from heartbeat `last` to `until` to what `last` was doing, split at midnight."""
+    start, language, workspace, git_branch, is_idling = last
+    if is_idling or until - start > IDLE_AFTER_S:
+        return
+
+    values = (0, language, workspace, git_branch)  # in STAT_DIMENSIONS order
+    while start < until:
+        day = start // DAY_S
+        end = min(until, (day + 1) * DAY_S)
+        for dimension, value in enumerate(values):
+            key = (user_ref, day, dimension, value)
+            seconds[key] = seconds.get(key, 0) + end - start
+        start = end
+
+
+_db: HistoryDatabase | None = None
+_db_lock = Lock()
+
+
+def get_db() -> HistoryDatabase:
+    """The history database, created on first use instead of at import time."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = HistoryDatabase(flush_ms=HISTORY_FLUSH_MS, retention_days=HISTORY_RETENTION_DAYS, max_pending=HISTORY_MAX_PENDING)
+    return _db
+
+
+def reset_db() -> None:
+    global _db
+    with _db_lock:
+        _db = None
+
+
+def close_db() -> None:
+    """Writes out queued heartbeats and closes the database if it was created."""
+    global _db
+    with _db_lock:
+        if _db is not None:
+            _db.close()
+            _db = None
+
+
+# global instance
+db: HistoryDatabase = LocalProxy(get_db)  # type: ignore[assignment]
@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+
+
+ICONS_DIR: Path = Path(__file__).resolve().parent.parent.parent.parent / "assets" / "icons"
+BUILD_DIR: Path = ICONS_DIR.parent / "build"  # output of the tools/ build steps, not committed
+
+SPRITE_NAME: str = "sprite"  # tools/build_icon_sprite.py writes BUILD_DIR/sprite.png + sprite.json
+
+# tools/optimize_icons.py writes optimized icons to OPTIMIZED_DIR/<name>.png, size variants
+# to OPTIMIZED_DIR/<size>/<name>.png and a manifest listing them
+OPTIMIZED_DIR: Path = BUILD_DIR / "icons"
+MANIFEST_FILE: Path = OPTIMIZED_DIR / "manifest.json"
+
+
+@dataclass(frozen=True)
+class Icon:
+    data: bytes
+    content_hash: str  # also used as the ETag and as ?v= in icon URLs
+    gzipped: bytes | None = None  # precompressed copy, only for text files (PNGs are already compressed)
+
+
+# only files that exist end up here, so its size is bounded by what's on disk
+_icons: dict[str, Icon] = {}
+# lookups that found nothing, kept apart so a flood of made-up names can't push real icons out.
+# the oldest are dropped past MAX_MISSING
+_missing: OrderedDict[str, None] = OrderedDict()
+MAX_MISSING: int = 1024
+_lock = Lock()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _load(path: Path) -> Icon | None:
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    gzipped = gzip.compress(data, compresslevel=9, mtime=0) if path.suffix == ".json" else None
+    return Icon(data, content_hash(data), gzipped)
+
+
+def _cached(key: str, path: Path) -> Icon | None:
+    icon = _icons.get(key)
+    if icon is None:
+        icon = _load(path)
+        if icon is not None:
+            with _lock:
+                _icons[key] = icon
+    return icon
+
+
+def _known_missing(key: str) -> bool:
+    with _lock:
+        return key in _missing
+
+
+def _remember_missing(key: str) -> None:
+    with _lock:
+        _missing[key] = None
+        _missing.move_to_end(key)
+        while len(_missing) > MAX_MISSING:
+            _missing.popitem(last=False)
+
+
+_variant_sizes: list[int] | None = None
+
+
+def variant_sizes() -> list[int]:
+    """Sizes tools/optimize_icons.py built variants for (ascending), empty if it wasn't run."""
+    global _variant_sizes
+    if _variant_sizes is None:
+        try:
+            _variant_sizes = sorted(json.loads(MANIFEST_FILE.read_text(encoding="utf-8"))["sizes"])
+        except (OSError, ValueError, KeyError):
+            _variant_sizes = []
+    return _variant_sizes
+
+
+def variant_size_for(size: int) -> int | None:
+    """Smallest built variant at least `size` px, so icons are never scaled up on the client."""
+    return next((variant for variant in variant_sizes() if variant >= size), None)
+
+
+def get(name: str, size: int | None = None) -> Icon | None:
+    """Icon bytes + hash, read from disk once and then kept in memory. `size` must be one of variant_sizes()."""
+    # names come from the URL, only plain file names are looked up
+    if not name or any(c in name for c in "/\\."):
+        return None
+    if size is not None and size not in variant_sizes():
+        return None
+
+    key = name if size is None else f"{size}/{name}"
+    if _known_missing(key):
+        return None
+
+    if name == SPRITE_NAME:
+        icon = _cached(name, BUILD_DIR / f"{SPRITE_NAME}.png")
+    elif size is not None:
+        icon = _cached(key, OPTIMIZED_DIR / str(size) / f"{name}.png")
+    else:
+        # the optimized copy if it was built, the committed file otherwise
+        icon = _cached(f"optimized/{name}", OPTIMIZED_DIR / f"{name}.png") or _cached(name, ICONS_DIR / f"{name}.png")
+
+    if icon is None:
+        _remember_missing(key)
+    return icon
+
+
+def sprite_index() -> Icon | None:
+    """The JSON offset index of the sprite sheet, if it was built."""
+    key = f"{SPRITE_NAME}.json"
+    if _known_missing(key):
+        return None
+    icon = _cached(key, BUILD_DIR / key)
+    if icon is None:
+        _remember_missing(key)
+    return icon
+
+
+def clear() -> None:
+    """Forget everything loaded so far, e.g. after the icons or the sprite were rebuilt."""
+    global _variant_sizes
+    with _lock:
+        _icons.clear()
+        _missing.clear()
+        _variant_sizes = None
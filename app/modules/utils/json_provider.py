@@ -0,0 +1,69 @@
+import typing as t
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib json module
+    orjson = None
+
+
+def _contains_float(obj: t.Any) -> bool:
+    # orjson formats some floats differently from repr() (0.00007 vs 7e-05, null vs NaN)
+    kind = type(obj)
+    if kind is float:
+        return True
+    if kind is dict:
+        return any(_contains_float(value) for value in obj.values())
+    if kind is list or kind is tuple:
+        return any(_contains_float(value) for value in obj)
+    return False
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that encodes responses with orjson when it's installed.
+
+    The output is byte-for-byte what the default provider produces (sorted keys, compact separators,
+    ASCII-only, trailing newline): anything orjson would render differently (floats, non-ASCII text,
+    ints over 64 bits, non-string keys) is encoded with the stdlib instead.
+    """
+
+    fast: bool = orjson is not None
+
+    def response(self, *args: t.Any, **kwargs: t.Any) -> Response:
+        if not self.fast or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self._dumps_fast(obj)
+
+        if body is None:
+            return self._app.response_class(f"{self.dumps(obj, separators=(',', ':'))}\n", mimetype=self.mimetype)
+
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    def _dumps_fast(self, obj: t.Any) -> bytes | None:
+        if _contains_float(obj):
+            return None
+
+        try:
+            body: bytes = orjson.dumps(
+                obj,
+                default=self.default,
+                option=(
+                    orjson.OPT_SORT_KEYS
+                    | orjson.OPT_APPEND_NEWLINE
+                    # let Flask's default() handle these so dates stay in the HTTP date format
+                    | orjson.OPT_PASSTHROUGH_DATETIME
+                    | orjson.OPT_PASSTHROUGH_DATACLASS
+                    | orjson.OPT_PASSTHROUGH_SUBCLASS
+                ),
+            )
+        except TypeError:  # orjson.JSONEncodeError is a TypeError
+            return None
+
+        if not body.isascii():
+            return None
+
+        return body
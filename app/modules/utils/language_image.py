@@ -1,54 +1,160 @@
 import re as regexp
 import json
+import os
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from threading import Lock, Thread
+from typing import Any, Iterable, Iterator
+from modules.utils import icon_store
+from modules.utils.gv import ICON_BASE_URL, ICON_MAP_RELOAD_S
+from modules.utils.logger import logger
 
 
 map_file: Path = Path(__file__).parent.parent.parent.parent / "assets" / "icons" / ".map.json"
 
 
-with open(file=map_file, mode="r", encoding='utf-8') as file:
-    imgmap: dict[str, Any] = json.load(file)
+@dataclass(frozen=True)
+class IconResolver:
+    """
+    .map.json parsed and indexed once: languages and exact file names/extensions become dict lookups
+    and the /regex/i patterns are compiled, instead of scanning the raw map on every request.
+    The order of KNOWN_EXTENSIONS still decides which rule wins when several match.
+    """
+    languages: dict[str, str]  # language -> image
+    exact: dict[str, tuple[int, str]]  # file name (lowercase) or extension -> (rule index, image)
+    regexes: list[tuple[int, regexp.Pattern[str], str]]  # (rule index, pattern, image), in map order
 
+    @classmethod
+    def from_map(cls, imgmap: dict[str, Any]) -> "IconResolver":
+        languages: dict[str, str] = {}
+        for lang_obj in imgmap["KNOWN_LANGUAGES"]:
+            languages.setdefault(lang_obj["language"], lang_obj["image"])  # first entry wins, like the old linear scan
 
-known_languages: list[dict[str, str]] = imgmap["KNOWN_LANGUAGES"]
-known_extensions: dict[str, dict[str, str]] = imgmap["KNOWN_EXTENSIONS"]
+        exact: dict[str, tuple[int, str]] = {}
+        regexes: list[tuple[int, regexp.Pattern[str], str]] = []
+        for index, (pattern, ext_info) in enumerate(imgmap["KNOWN_EXTENSIONS"].items()):
+            if pattern.startswith('/') and pattern.endswith('/i'):
+                #? regex
+                try:
+                    regexes.append((index, regexp.compile(pattern[1:-2], regexp.IGNORECASE), ext_info["image"]))
+                except regexp.error as e:
+                    logger.warning(f"Skipping invalid regex {pattern} in {map_file.name}: {e}")
+            else:
+                #? exact match
+                exact.setdefault(pattern, (index, ext_info["image"]))
 
+        return cls(languages, exact, regexes)
+
+    def resolve(self, language: str, filename: str) -> str:
+        """Image name for a language/file name, "vscode" if nothing matches."""
+        #* preferred method: known languages
+        image_name = self.languages.get(language)
+        if image_name is not None:
+            return image_name
+
+        #* alternative method: file extension
+        # the exact rule that comes first in the map (by file name or by extension)...
+        best = min(
+            (self.exact[key] for key in (filename.lower(), Path(filename).suffix) if key in self.exact),
+            default=None,
+        )
+
+        # ...unless a regex earlier in the map matches too
+        for index, pattern, image_name in self.regexes:
+            if best is not None and index > best[0]:
+                break
+            if pattern.search(filename):
+                return image_name
+
+        #* fallback: vscode logo
+        return best[1] if best is not None else "vscode"
+
+
+def _load_resolver() -> IconResolver:
+    with open(file=map_file, mode="r", encoding='utf-8') as file:
+        imgmap: dict[str, Any] = json.load(file)
+    resolver = IconResolver.from_map(imgmap)
+    logger.info(f"Loaded icon map: {len(resolver.languages)} languages, {len(resolver.exact)} file names/extensions, {len(resolver.regexes)} patterns")
+    return resolver
+
+
+_resolver: IconResolver | None = None
+_resolver_lock = Lock()
+_watcher_pid: int | None = None  # the watcher thread doesn't survive a fork, so each process starts its own
+
+
+def _watch(interval_s: float, mtime: float) -> None:
+    #* polls the file's mtime off the request path, requests only ever read _resolver
+    global _resolver
+    while True:
+        time.sleep(interval_s)
+        try:
+            current = map_file.stat().st_mtime
+            if current == mtime:
+                continue
+            mtime = current
+            _resolver = _load_resolver()  # swapping the reference is atomic, requests see the old or the new map
+        except Exception as e:
+            logger.error(f"Failed to reload {map_file.name}, keeping the previous icon map: {e}")
+
+
+def _get_resolver() -> IconResolver:
+    """Loads .map.json on first use (not at import time) and starts watching it for changes."""
+    global _resolver, _watcher_pid
+    resolver = _resolver
+    if resolver is not None and (_watcher_pid == os.getpid() or ICON_MAP_RELOAD_S <= 0):
+        return resolver
+
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = _load_resolver()
+        if ICON_MAP_RELOAD_S > 0 and _watcher_pid != os.getpid():
+            _watcher_pid = os.getpid()
+            Thread(target=_watch, args=(ICON_MAP_RELOAD_S, map_file.stat().st_mtime), name="icon-map-watcher", daemon=True).start()
+        return _resolver
+
+
+def _get_imgurl(image_name: str, size: int | None = None) -> str:
+    #* self-hosted icons (/icons route), the hash in the url lets clients cache them forever
+    if ICON_BASE_URL:
+        variant = icon_store.variant_size_for(size) if size else None
+        if variant is not None:
+            icon = icon_store.get(image_name, variant)
+            if icon is not None:
+                return f"{ICON_BASE_URL}/icons/{variant}/{image_name}.png?v={icon.content_hash}"
+
+        icon = icon_store.get(image_name)
+        if icon is not None:
+            return f"{ICON_BASE_URL}/icons/{image_name}.png?v={icon.content_hash}"
 
-def _get_imgurl(image_name: str) -> str:
     return f"https://raw.githubusercontent.com/PowerPCFan/vscode-status-api/refs/heads/master/assets/icons/{image_name}.png"
 
 
-def get(language: str, filename: str, idling: bool) -> str:
+def get(language: str, filename: str, idling: bool, size: int | None = None) -> str:
+    """
+    URL of the icon for a language/file. With `size` (px) and self-hosted icons, it points at the
+    smallest optimized variant that's at least that big (see tools/optimize_icons.py).
+    """
     #* handle idle state
     if idling:
-        return _get_imgurl("idle")
-
-    #* preferred method: known languages
-    for lang_obj in known_languages:
-        if lang_obj["language"] == language:
-            image_name: str = lang_obj["image"]
-            return _get_imgurl(image_name)
-
-    #* alternative method: file extension
-    extension: str = Path(filename).suffix
-    filename_lower: str = filename.lower()
-
-    for pattern, ext_info in known_extensions.items():
-        if pattern.startswith('/') and pattern.endswith('/i'):
-            #? regex
-            regex_pattern: str = pattern[1:-2]
-            try:
-                if regexp.search(regex_pattern, filename, regexp.IGNORECASE):
-                    image_name: str = ext_info["image"]
-                    return _get_imgurl(image_name)
-            except regexp.error:
-                continue
-        else:
-            #? exact match
-            if pattern == filename_lower or pattern == extension:
-                image_name: str = ext_info["image"]
-                return _get_imgurl(image_name)
-
-    #* fallback: return vscode logo
-    return _get_imgurl("vscode")
+        return _get_imgurl("idle", size)
+
+    return _get_imgurl(_get_resolver().resolve(language, filename), size)
+
+
+def resolve_many(queries: Iterable[tuple[str, str]], size: int | None = None) -> Iterator[str]:
+    """Icon URL for each (language, fileName) pair, in order. Repeated pairs and repeated icons are only resolved once."""
+    resolver = _get_resolver()  # the whole batch uses the same map, even if it's reloaded meanwhile
+    urls: dict[tuple[str, str], str] = {}
+    image_urls: dict[str, str] = {}
+
+    for query in queries:
+        url = urls.get(query)
+        if url is None:
+            image_name = resolver.resolve(*query)
+            url = image_urls.get(image_name)
+            if url is None:
+                url = image_urls[image_name] = _get_imgurl(image_name, size)
+            urls[query] = url
+        yield url
@@ -0,0 +1,175 @@
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+from pathlib import Path
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+from modules.utils.gv import RATE_LIMIT_STORAGE, RATE_LIMIT_STORAGE_URI, RATE_LIMIT_STRATEGY
+
+
+DATA_DIR: Path = Path(__file__).resolve().parent.parent.parent.parent / "data"
+
+# storage name -> (default storage uri, default strategy)
+LIMITER_STORAGES: dict[str, tuple[str, str]] = {
+    # shared between hosts, but every limited request is a network round trip
+    "memcached": ("memcached://localhost:11211", "fixed-window"),
+    # in-process, exact sliding window, but each gunicorn worker counts separately
+    "memory": ("memory://", "moving-window"),
+    # one file shared by all workers on this host, no extra service needed
+    "sqlite": (f"sqlite:///{DATA_DIR / 'rate_limits.db'}", "sliding-window-counter"),
+}
+
+
+def limiter_settings() -> tuple[str, str]:
+    """(storage_uri, strategy) for Flask-Limiter based on RATE_LIMIT_STORAGE and the optional overrides."""
+    if RATE_LIMIT_STORAGE not in LIMITER_STORAGES:
+        raise ValueError(f"Unknown RATE_LIMIT_STORAGE \"{RATE_LIMIT_STORAGE}\" (expected {', '.join(LIMITER_STORAGES)})")
+
+    storage_uri, strategy = LIMITER_STORAGES[RATE_LIMIT_STORAGE]
+    return RATE_LIMIT_STORAGE_URI or storage_uri, RATE_LIMIT_STRATEGY or strategy
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    `limits` storage backed by a SQLite file (WAL mode), so every worker process on the host
+    shares the same counters without running memcached. Registered for ``sqlite:///path/to/file.db``.
+
+    Supports the fixed window and sliding window counter strategies. Each counter update is a
+    single UPSERT, and sliding window hits run in one IMMEDIATE transaction so they stay exact
+    across processes.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    # purge expired counters every this many writes
+    PURGE_EVERY: int = 1000
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options: float | str | bool):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path: str = uri[len("sqlite:///"):]
+        self.timeout: float = float(options.get("timeout", 5))
+        self._local = threading.local()
+        self._writes = itertools.count(1)  # next() on it is atomic, += 1 from several threads can lose counts
+
+        # the file and table are created on first use, so building the app doesn't touch disk
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _create_schema(self) -> None:
+        with self._ready_lock:
+            if self._ready:
+                return
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS counters ("
+                    " key TEXT PRIMARY KEY,"
+                    " count INTEGER NOT NULL,"
+                    " expires_at REAL NOT NULL"
+                    ") WITHOUT ROWID"
+                )
+            finally:
+                conn.close()
+            self._ready = True
+
+    @property
+    def base_exceptions(self) -> type[Exception] | tuple[type[Exception], ...]:
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread, and never reuse one inherited through a fork
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            if not self._ready:
+                self._create_schema()
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _incr(self, conn: sqlite3.Connection, key: str, expiry: float, amount: int, now: float) -> int:
+        if next(self._writes) % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+
+        return conn.execute(
+            "INSERT INTO counters (key, count, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            " count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END,"
+            " expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END "
+            "RETURNING count",
+            (key, amount, now + expiry, now, now),
+        ).fetchone()[0]
+
+    def _get(self, conn: sqlite3.Connection, key: str, now: float) -> int:
+        row = conn.execute("SELECT count FROM counters WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        return self._incr(self._connection(), key, expiry, amount, time.time())
+
+    def get(self, key: str) -> int:
+        return self._get(self._connection(), key, time.time())
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._connection().execute("SELECT expires_at FROM counters WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+        return row[0] if row else now
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int | None:
+        return self._connection().execute("DELETE FROM counters").rowcount
+
+    def clear(self, key: str) -> None:
+        self._connection().execute("DELETE FROM counters WHERE key = ?", (key,))
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            previous_count, previous_ttl, current_count, _ = self._sliding_window_info(conn, key, expiry, now)
+            weighted_count = previous_count * previous_ttl / expiry + current_count
+
+            acquired = floor(weighted_count) + amount <= limit
+            if acquired:
+                # same as the other storages: the current window key lives for two windows
+                _, current_key = self.sliding_window_keys(key, expiry, now)
+                self._incr(conn, current_key, 2 * expiry, amount, now)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        conn.execute("COMMIT")
+        return acquired
+
+    def _sliding_window_info(self, conn: sqlite3.Connection, key: str, expiry: int, now: float) -> tuple[int, float, int, float]:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(conn, previous_key, now)
+        current_count = self._get(conn, current_key, now)
+
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        return self._sliding_window_info(self._connection(), key, expiry, time.time())
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
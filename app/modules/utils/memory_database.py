@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, Any, Optional
+from modules.utils.auth_tokens import VerifiedTokenCache, hash_token, verify_token
+from modules.utils.database import status_digest, touch_due
+from modules.utils.storage_backend import Presence, StorageBackend, DATETIME_NOW, STATUS_MAX_AGE_MINUTES
+from modules.utils.logger import logger
+
+
+class MemoryDatabase(StorageBackend):
+    """
+    Pure in-memory backend. Nothing touches disk, so it's handy for tests and
+    benchmarks, but everything is lost on restart and every worker gets its own copy.
+    """
+
+    name = "memory"
+
+    def __init__(self, token_cache_ttl_s: float = 0):
+        # user_id -> {"auth_token" (hashed), "created_at", "last_updated", "status_data"}
+        self._users: dict[str, dict[str, Any]] = {}
+        self._lock = Lock()
+        self.token_cache: VerifiedTokenCache | None = VerifiedTokenCache(token_cache_ttl_s) if token_cache_ttl_s > 0 else None
+        logger.info("In-memory database initialized successfully")
+
+    def _token_valid(self, user_id: str, stored: str, auth_token: str) -> bool:
+        if self.token_cache is not None and self.token_cache.check(user_id, auth_token):
+            return True
+        if not verify_token(auth_token, stored):
+            return False
+        if self.token_cache is not None:
+            self.token_cache.add(user_id, auth_token)
+        return True
+
+    def update_status(self, user_id: str, auth_token: str, status_data: Dict[str, Any]) -> tuple[bool, str, bool]:
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return False, "User not found: Please register first before updating status", False
+
+            if not self._token_valid(user_id, user["auth_token"], auth_token):
+                return False, "Authentication failed: Invalid user ID or token", False
+
+            if user["last_updated"] is not None and user["status_data"] and status_digest(user["status_data"]) == status_digest(status_data):
+                # same rule as the SQL backends: an unchanged status only moves last_updated every STATUS_TOUCH_INTERVAL_S
+                if not touch_due(user["last_updated"]):
+                    return True, "Status updated successfully", False
+            else:
+                user["status_data"] = dict(status_data)
+            user["last_updated"] = DATETIME_NOW()
+            return True, "Status updated successfully", False
+
+    def register_user(self, user_id: str, auth_token: str) -> tuple[bool, str]:
+        hashed = hash_token(auth_token)  # outside the lock, it's the slow part
+
+        with self._lock:
+            if user_id in self._users:
+                return False, "User already exists"
+
+            if self.token_cache is not None:
+                self.token_cache.add(user_id, auth_token)
+            self._users[user_id] = {
+                "auth_token": hashed,
+                "created_at": DATETIME_NOW(),
+                "last_updated": None,
+                "status_data": {},
+            }
+            return True, "User registered successfully"
+
+    def delete_user(self, user_id: str, auth_token: str) -> tuple[bool, str]:
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return False, "User does not exist"
+
+            if not verify_token(auth_token, user["auth_token"]):
+                return False, "Authentication failed: Invalid token"
+
+            if self.token_cache is not None:
+                self.token_cache.discard(user_id)
+            del self._users[user_id]
+            return True, "User deleted successfully"
+
+    def check_if_user_exists(self, user_id: str) -> tuple[bool, str]:
+        with self._lock:
+            if user_id in self._users:
+                return True, "User exists"
+            return False, "User does not exist"
+
+    def check_token(self, user_id: str, auth_token: str) -> bool | None:
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return None
+            return self._token_valid(user_id, user["auth_token"], auth_token)
+
+    def get_status(self, user_id: str) -> Optional[Dict[str, Any]]:
+        self.cleanup_old_status(user_id)
+
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return None
+
+            if not user["status_data"] or user["last_updated"] is None:
+                return {
+                    'user_id': user_id,
+                    'status': {}
+                }
+
+            return {
+                'user_id': user_id,
+                'status': dict(user["status_data"]),
+                'last_updated': user["last_updated"],
+                'created_at': user["created_at"]
+            }
+
+    def get_presence(self, user_ids: list[str]) -> Dict[str, Presence]:
+        presence: Dict[str, Presence] = {}
+        with self._lock:
+            for user_id in user_ids:
+                user = self._users.get(user_id)
+                if user is None:
+                    continue
+                status = user["status_data"]
+                language = status.get("language")
+                presence[user_id] = Presence(
+                    user["last_updated"] if status else None,
+                    status.get("isIdling") is True,
+                    language if isinstance(language, str) else None,
+                )
+        return presence
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return {"token_cache": self.token_cache.stats()} if self.token_cache is not None else {}
+
+    def cleanup_old_status(self, user_id: str, max_age_minutes: int = STATUS_MAX_AGE_MINUTES) -> bool:
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return False
+
+            last_updated = user["last_updated"]
+            cutoff_time = datetime.now(tz=timezone.utc) - timedelta(minutes=max_age_minutes)
+
+            if last_updated is None or datetime.fromisoformat(last_updated) < cutoff_time:
+                user["status_data"] = {}
+                user["last_updated"] = None
+                return True
+            return False
@@ -0,0 +1,48 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+
+class NegativeCache:
+    """
+    Short-lived set of user IDs known not to exist, so repeated lookups of unknown IDs
+    (scrapers, misconfigured widgets) don't hit the database every time.
+
+    Entries expire after `ttl_s` seconds and the oldest ones are evicted past `max_size`,
+    so an enumeration flood can't grow it without bound. It's per process: a user registered
+    through another worker is only seen here once the entry expires.
+    """
+
+    def __init__(self, ttl_s: float, max_size: int = 100_000):
+        self.ttl_s: float = ttl_s
+        self.max_size: int = max_size
+        self.suppressed: int = 0  # lookups answered from the cache instead of the DB
+
+        self._entries: OrderedDict[str, float] = OrderedDict()  # user_id -> expiry (monotonic)
+        self._lock = Lock()
+
+    def __contains__(self, user_id: str) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(user_id)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return False
+            self.suppressed += 1
+            return True
+
+    def add(self, user_id: str) -> None:
+        with self._lock:
+            self._entries[user_id] = time.monotonic() + self.ttl_s
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "suppressed": self.suppressed}
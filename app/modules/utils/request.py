@@ -1,14 +1,26 @@
-from flask import request
-from werkzeug.local import LocalProxy
-from modules.utils.gv import CLOUDFLARE_TUNNEL
+import hmac
+from flask import g, request
+from modules.utils.gv import ADMIN_TOKEN, CLOUDFLARE_TUNNEL
 from modules.utils.logger import logger
 
-def _get_client_ip() -> str:
+def _resolve_client_ip() -> str:
     if CLOUDFLARE_TUNNEL:
         if "CF-Connecting-IP" in request.headers:
             return request.headers["CF-Connecting-IP"]
         else:
             logger.warning("Header 'CF-Connecting-IP' not found in request, but CLOUDFLARE_TUNNEL is enabled. This may lead to excessive rate limiting due to IP proxying.")
+    #* with TRUSTED_PROXY_HOPS set, ProxyFix (see main.create_app) has already replaced remote_addr with the X-Forwarded-For address
     return request.remote_addr or "127.0.0.1"
 
-remote_addr = LocalProxy(_get_client_ip)
+def client_ip() -> str:
+    """IP of the client that made the current request. Resolved once per request and kept on flask.g."""
+    ip = g.get("client_ip")
+    if ip is None:
+        ip = g.client_ip = _resolve_client_ip()
+    return ip
+
+def is_admin() -> bool:
+    """Whether the request has "Bearer <ADMIN_TOKEN>" in the Authorization header (compared in constant time)."""
+    auth_token = request.headers.get('Authorization', '')
+    auth_token = auth_token[7:] if auth_token.startswith('Bearer ') else auth_token
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(auth_token.encode(), ADMIN_TOKEN.encode())  # type: ignore[union-attr]
@@ -0,0 +1,34 @@
+from flask import Response, g, has_request_context
+
+
+# rate limit cost of one request, in units of half a "normal" request so a cache hit can be cheaper than one.
+# route limits are scaled by COST_NORMAL (plus LIMIT_HEADROOM), so "45 per minute" still means 45 normal requests.
+COST_CACHED: int = 1  # answered from memory without touching the DB
+COST_NORMAL: int = 2
+COST_MISS: int = 6  # unknown user / bad token, the kind of request scrapers and token guessers make
+COST_MAX: int = COST_MISS
+
+# a request is only let through if its highest possible cost still fits, because the moving and sliding
+# window storages drop a deduction that doesn't fit instead of counting it, and the misses would stay free.
+# the headroom keeps the last normal requests of a window from being refused for that
+LIMIT_HEADROOM: int = COST_MAX - COST_NORMAL
+
+
+def mark_cached() -> None:
+    """Called by the storage layer when a lookup was served from an in-memory cache."""
+    if has_request_context():
+        g.served_from_cache = True
+
+
+def response_cost(response: Response) -> int:
+    if response.status_code in (401, 404):
+        return COST_MISS
+    if g.get("served_from_cache", False):
+        return COST_CACHED
+    return COST_NORMAL
+
+
+def current_cost() -> int:
+    # Flask-Limiter calls this once before the view (to test the limit) and once after it (to deduct),
+    # by then the blueprint's after_request has stored the real cost of the response
+    return g.get("limit_cost", COST_MAX)
@@ -0,0 +1,37 @@
+from dataclasses import dataclass, asdict
+from threading import Lock
+from typing import Any
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    errors: int = 0  # 5xx
+    rate_limited: int = 0  # 429
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+_stats: dict[str, RouteStats] = {}
+_lock = Lock()
+
+
+def record(route: str, status: int, elapsed_ms: float) -> None:
+    with _lock:
+        stats = _stats.setdefault(route, RouteStats())
+        stats.requests += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        if status >= 500:
+            stats.errors += 1
+        elif status == 429:
+            stats.rate_limited += 1
+
+
+def snapshot() -> dict[str, dict[str, Any]]:
+    """Per-route counters for this worker process since it started."""
+    with _lock:
+        return {
+            route: {**asdict(stats), "avg_ms": round(stats.total_ms / stats.requests, 3) if stats.requests else 0.0}
+            for route, stats in _stats.items()
+        }
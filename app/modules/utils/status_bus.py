@@ -0,0 +1,291 @@
+import asyncio
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict
+from modules.utils.database import status_digest
+from modules.utils.gv import STATUS_BUS_POLL_MS, STATUS_BUS_RETENTION_S
+from modules.utils.logger import logger
+
+DATA_DIR: Path = Path(__file__).resolve().parent.parent.parent.parent / "data"
+
+
+@dataclass(frozen=True)
+class StatusEvent:
+    seq: int  # increases with every event on the host, subscribers resume from it (SSE Last-Event-ID)
+    user_id: str
+    status: Dict[str, Any]  # the status as the client sent it, {} once the user is deleted
+    published_at: float
+
+
+class Subscription:
+    """One listener's position in the event log. Only moves forward when the listener calls advance()."""
+
+    def __init__(self, bus: "StatusBus", user_id: str | None, cursor: int):
+        self.bus = bus
+        self.user_id = user_id  # None = every user
+        self.cursor = cursor
+        self._wake = threading.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None  # set by wait_async
+        self._async_wake: asyncio.Event | None = None
+
+    def wait(self, timeout: float) -> list[StatusEvent]:
+        """Events after the cursor, waiting up to `timeout` seconds for one if there are none yet."""
+        self._wake.clear()
+        events = self.bus.events_after(self.cursor, self.user_id)
+        if not events and self._wake.wait(timeout):
+            events = self.bus.events_after(self.cursor, self.user_id)
+        return events
+
+    async def wait_async(self, timeout: float) -> list[StatusEvent]:
+        """wait() for code running on an event loop (asgi.py), it doesn't hold a thread while waiting."""
+        if self._async_wake is None:
+            self._async_wake = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+        self._async_wake.clear()
+        events = self.bus.events_after(self.cursor, self.user_id)
+        if not events:
+            try:
+                await asyncio.wait_for(self._async_wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+            events = self.bus.events_after(self.cursor, self.user_id)
+        return events
+
+    def notify(self) -> None:
+        """Wakes wait()/wait_async(), called by the bus from its poller thread."""
+        self._wake.set()
+        if self._loop is not None and self._async_wake is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._async_wake.set)
+            except RuntimeError:
+                pass  # the loop is closed, nobody is waiting anymore
+
+    def advance(self, seq: int) -> None:
+        """Marks everything up to `seq` as delivered; until then the same events are returned again."""
+        self.cursor = max(self.cursor, seq)
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+
+class StatusBus:
+    """
+    Fans status changes out to every worker process on the host through a shared SQLite file
+    (data/status_bus.db, WAL mode).
+
+    publish() appends the status to an event log when it differs from the last one published for that
+    user (by any worker). In each process that has subscribers, one thread watches `PRAGMA data_version`,
+    which changes whenever another connection commits, every `poll_ms`; only then does it read the new
+    events, keep them in memory and wake the subscribers they concern. Subscribers track their own
+    position in the log (the event seq), so they get every event at least once, also after reconnecting
+    (as long as the event is younger than `retention_s`).
+    """
+
+    MAX_RECENT: int = 10000  # events kept in memory per process, older ones are read from the file
+    PRUNE_EVERY_S: float = 60
+
+    def __init__(self, db_file: str = "status_bus.db", poll_ms: int = 50, retention_s: float = 3600, timeout: float = 5):
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self.path: str = str(DATA_DIR / db_file)
+        self.timeout = timeout
+        self._poll_s: float = poll_ms / 1000
+        self._retention_s = retention_s
+        self._local = threading.local()
+        self._last_prune: float = 0
+
+        self._recent: list[StatusEvent] = []
+        self._recent_seqs: list[int] = []
+        self._head: int = 0  # highest seq read from the log
+        self._lock = threading.Lock()
+        self._subscriptions: set[Subscription] = set()
+        self._poller_pid: int | None = None
+        self._stopped = threading.Event()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS status_events ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " user_id TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " published_at REAL NOT NULL"
+            ")"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_status_events_user_seq ON status_events (user_id, seq)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS status_digests ("
+            " user_id TEXT PRIMARY KEY,"
+            " digest TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per thread, and never reuse one inherited through a fork
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def publish(self, user_id: str, status: Dict[str, Any]) -> int | None:
+        """Appends the status to the log if it changed, returns its seq (None if nothing changed)."""
+        digest = status_digest(status) if status else ""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # decided from the shared digest only: a per-process copy would miss A -> B -> A when B
+            # was published by another worker. An unchanged status writes nothing, so this stays cheap
+            changed = conn.execute(
+                "INSERT INTO status_digests (user_id, digest) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET digest = excluded.digest WHERE digest != excluded.digest",
+                (user_id, digest),
+            ).rowcount
+            seq = None
+            if changed:
+                seq = conn.execute(
+                    "INSERT INTO status_events (user_id, status, published_at) VALUES (?, ?, ?)",
+                    (user_id, json.dumps(status, separators=(",", ":")), now),
+                ).lastrowid
+            if not status:
+                conn.execute("DELETE FROM status_digests WHERE user_id = ?", (user_id,))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+        if now - self._last_prune >= self.PRUNE_EVERY_S:
+            self._last_prune = now
+            conn.execute("DELETE FROM status_events WHERE published_at < ?", (now - self._retention_s,))
+        return seq
+
+    def subscribe(self, user_id: str | None = None, after: int | None = None) -> Subscription:
+        """Listens for one user's events (every user's with None), starting after seq `after` or from now."""
+        self._ensure_poller()
+        with self._lock:
+            subscription = Subscription(self, user_id, self.head() if after is None else after)
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def head(self) -> int:
+        """seq of the newest event in the log (as of the last poll, in a process that polls)."""
+        if self._poller_pid == os.getpid():
+            return self._head
+        return self._db_head()
+
+    def _db_head(self) -> int:
+        row = self._connection().execute("SELECT MAX(seq) FROM status_events").fetchone()
+        return row[0] or 0
+
+    def events_after(self, seq: int, user_id: str | None = None, limit: int = 500) -> list[StatusEvent]:
+        with self._lock:
+            covered = self._recent_seqs and self._recent_seqs[0] <= seq + 1
+            if covered:
+                start = bisect.bisect_right(self._recent_seqs, seq)
+                events = [event for event in self._recent[start:] if user_id is None or event.user_id == user_id]
+                return events[:limit]
+
+        # older than what this process keeps in memory (e.g. a client resuming after a while)
+        query = "SELECT seq, user_id, status, published_at FROM status_events WHERE seq > ?"
+        params: tuple[Any, ...] = (seq,)
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params += (user_id,)
+        rows = self._connection().execute(query + " ORDER BY seq LIMIT ?", params + (limit,)).fetchall()
+        return [StatusEvent(row[0], row[1], json.loads(row[2]), row[3]) for row in rows]
+
+    def _ensure_poller(self) -> None:
+        # the thread doesn't survive a fork, so each process that has subscribers starts its own
+        if self._poller_pid == os.getpid():
+            return
+        with self._lock:
+            if self._poller_pid != os.getpid():
+                self._poller_pid = os.getpid()
+                self._recent, self._recent_seqs = [], []
+                self._head = self._db_head()
+                threading.Thread(target=self._poll, name="status-bus-poller", daemon=True).start()
+
+    def _poll(self) -> None:
+        # a connection of its own: data_version only changes for commits made by *other* connections
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        version = None
+        while not self._stopped.is_set():
+            try:
+                current = conn.execute("PRAGMA data_version").fetchone()[0]
+                if current != version:
+                    version = current
+                    self._read_new(conn)
+            except sqlite3.Error as e:
+                logger.error(f"Status bus poll failed: {e}")
+            self._stopped.wait(self._poll_s)
+        conn.close()
+
+    def _read_new(self, conn: sqlite3.Connection) -> None:
+        rows = conn.execute(
+            "SELECT seq, user_id, status, published_at FROM status_events WHERE seq > ? ORDER BY seq",
+            (self._head,),
+        ).fetchall()
+        if not rows:
+            return
+
+        events = [StatusEvent(row[0], row[1], json.loads(row[2]), row[3]) for row in rows]
+        users = {event.user_id for event in events}
+        with self._lock:
+            self._recent.extend(events)
+            self._recent_seqs.extend(event.seq for event in events)
+            if len(self._recent) > 2 * self.MAX_RECENT:
+                self._recent = self._recent[-self.MAX_RECENT:]
+                self._recent_seqs = self._recent_seqs[-self.MAX_RECENT:]
+            self._head = events[-1].seq
+            woken = [s for s in self._subscriptions if s.user_id is None or s.user_id in users]
+
+        for subscription in woken:
+            subscription.notify()
+
+    def close(self) -> None:
+        self._stopped.set()
+        with self._lock:
+            for subscription in self._subscriptions:
+                subscription.notify()
+
+
+_bus: StatusBus | None = None
+_bus_lock = threading.Lock()
+
+
+def get_bus() -> StatusBus:
+    """The status bus, created on first use instead of at import time."""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = StatusBus(poll_ms=STATUS_BUS_POLL_MS, retention_s=STATUS_BUS_RETENTION_S)
+    return _bus
+
+
+def publish_status(user_id: str, status: Dict[str, Any]) -> None:
+    """publish() for the routes: the status is already saved, so a bus error is only logged."""
+    try:
+        get_bus().publish(user_id, status)
+    except sqlite3.Error as e:
+        logger.error(f"Failed to publish status change of {user_id}: {e}")
+
+
+def close_bus() -> None:
+    global _bus
+    with _bus_lock:
+        if _bus is not None:
+            _bus.close()
+            _bus = None
@@ -0,0 +1,464 @@
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import random
+import secrets
+import socket
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Dict
+from urllib.parse import urlsplit
+from sqlalchemy import Float, Integer, String, create_engine, delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import DeclarativeBase, Mapped, MappedColumn
+from modules.utils.database import status_digest
+from modules.utils.gv import (
+    WEBHOOK_ALLOW_PRIVATE,
+    WEBHOOK_CONCURRENCY_PER_TARGET,
+    WEBHOOK_MAX_ATTEMPTS,
+    WEBHOOK_MAX_PER_USER,
+    WEBHOOK_POLL_MS,
+)
+from modules.utils.logger import logger
+from modules.utils.storage_backend import DATETIME_NOW
+from modules.utils import webhook_sender
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Webhook(Base):
+    __tablename__ = "webhooks"
+
+    id: Mapped[int] = MappedColumn(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[str] = MappedColumn(String(32), nullable=False, index=True)
+    url: Mapped[str] = MappedColumn(String(2048), nullable=False)
+    secret: Mapped[str] = MappedColumn(String(64), nullable=False)  # signs the body, see _signature
+    created_at: Mapped[str] = MappedColumn(String, default=DATETIME_NOW)
+
+
+class WebhookState(Base):
+    """Digest of the last status deliveries were queued for, per user, shared by all workers."""
+    __tablename__ = "webhook_state"
+
+    user_id: Mapped[str] = MappedColumn(String(32), primary_key=True)
+    digest: Mapped[str] = MappedColumn(String(16), nullable=False)
+
+
+class Delivery(Base):
+    """One status change waiting to be sent to one webhook. Deleted once delivered or given up on."""
+    __tablename__ = "webhook_deliveries"
+
+    id: Mapped[int] = MappedColumn(Integer, primary_key=True, autoincrement=True)
+    webhook_id: Mapped[int] = MappedColumn(Integer, nullable=False, index=True)
+    payload: Mapped[str] = MappedColumn(String, nullable=False)  # JSON event
+    attempts: Mapped[int] = MappedColumn(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[float] = MappedColumn(Float, nullable=False, index=True)
+    locked_until: Mapped[float] = MappedColumn(Float, nullable=False, default=0)  # claimed by a send in progress
+
+
+class DispatcherLease(Base):
+    """Only the worker holding this row sends, so per-target limits hold for the whole host."""
+    __tablename__ = "webhook_dispatcher"
+
+    id: Mapped[int] = MappedColumn(Integer, primary_key=True)
+    owner: Mapped[str] = MappedColumn(String, nullable=False)
+    expires_at: Mapped[float] = MappedColumn(Float, nullable=False)
+
+
+DATA_DIR: Path = Path(__file__).resolve().parent.parent.parent.parent / "data"
+
+BATCH_SIZE = 20  # status changes per POST to one webhook
+CLAIM_LIMIT = 200  # deliveries looked at per dispatcher round
+SEND_TIMEOUT_S = 10
+LEASE_S = 15
+BACKOFF_BASE_S = 5
+BACKOFF_MAX_S = 3600
+
+# like in database.py, forked workers inherit this and skip create_all when the master already ran it
+_initialized_urls: set[str] = set()
+
+
+def check_url(url: Any) -> str | None:
+    """Error message if `url` isn't an http(s) URL a webhook can use, None if it's fine. Doesn't resolve the host."""
+    if not isinstance(url, str) or len(url) > 2048:
+        return "url must be a string of at most 2048 characters"
+
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return "url must be an http(s) URL"
+    return None
+
+
+def resolve_url(url: str, allow_private: bool = WEBHOOK_ALLOW_PRIVATE) -> tuple[str | None, str | None]:
+    """
+    (address, error): the IP to connect to for `url`, after checking that every address its host resolves
+    to is public. Requests are sent to exactly this address, so DNS can't point somewhere else in between.
+    The address is None when private addresses are allowed (the host is resolved as usual then).
+    """
+    if allow_private:
+        return None, None
+
+    #* don't let users make the API send requests into the network it runs in
+    parts = urlsplit(url)
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80), proto=socket.IPPROTO_TCP)]
+    except (socket.gaierror, UnicodeError, ValueError):
+        return None, "url host could not be resolved"
+    if not addresses:
+        return None, "url host could not be resolved"
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if not ip.is_global:
+            return None, "url must point to a public address"
+    return addresses[0], None
+
+
+def _signature(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _backoff(attempts: int) -> float:
+    return min(BACKOFF_BASE_S * 2 ** (attempts - 1), BACKOFF_MAX_S) * random.uniform(0.8, 1.2)
+
+
+class WebhookQueue:
+    """
+    Status-change webhooks with a persistent delivery queue in data/webhooks.db.
+
+    status_changed() queues one delivery per webhook of the user when the status differs from the last
+    one queued (checked across workers through webhook_state). One worker at a time (DispatcherLease)
+    sends the queue: every `poll_ms` it claims due deliveries, sends up to BATCH_SIZE changes per
+    webhook in one POST, with at most `per_target` requests in flight per host, and retries failures
+    with exponential backoff until `max_attempts`.
+    """
+
+    def __init__(self, db_file: str = "webhooks.db", poll_ms: int = 500, max_attempts: int = 8, per_target: int = 2, max_per_user: int = 5, allow_private: bool = False, senders: int = 8):
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        self.path: str = str(DATA_DIR / db_file)
+        self.db_file = f"sqlite:///{self.path}"
+        self.engine = create_engine(self.db_file, echo=False, future=True, connect_args={"timeout": 10})
+
+        self._poll_s: float = poll_ms / 1000
+        self.max_attempts = max_attempts
+        self.per_target = per_target
+        self.max_per_user = max_per_user
+        self.allow_private = allow_private
+        self._senders = senders
+
+        self._targets: dict[str, list[int]] = {}  # user -> webhook ids, valid while _targets_version holds
+        self._targets_version: int | None = None
+        self._version_conn: sqlite3.Connection | None = None
+        self._inflight: dict[str, int] = {}  # host -> requests being sent
+        self._lock = Lock()
+        self._stopped = Event()
+        self._wake = Event()
+        self._owner = ""
+        self._dispatcher_pid: int | None = None
+        self._pool: ThreadPoolExecutor | None = None
+
+        self._init_database()
+
+    def _init_database(self):
+        if self.db_file in _initialized_urls:
+            return
+
+        try:
+            with self.engine.begin() as conn:
+                conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+            Base.metadata.create_all(bind=self.engine, checkfirst=True)
+            _initialized_urls.add(self.db_file)
+            logger.info("Webhook database initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize webhook database: {e}")
+
+    #* registration
+
+    def register(self, user_id: str, url: str) -> tuple[bool, str, Dict[str, Any] | None]:
+        """Returns (success, message, {"id", "secret"})."""
+        with self.engine.begin() as conn:
+            existing = conn.execute(select(Webhook.url).where(Webhook.user_id == user_id)).scalars().all()
+            if url in existing:
+                return False, "Webhook already registered", None
+            if len(existing) >= self.max_per_user:
+                return False, f"At most {self.max_per_user} webhooks per user", None
+
+            secret = secrets.token_hex(32)
+            webhook_id = conn.execute(insert(Webhook).values(user_id=user_id, url=url, secret=secret, created_at=DATETIME_NOW())).inserted_primary_key[0]
+
+        return True, "Webhook registered successfully", {"id": webhook_id, "secret": secret}
+
+    def delete(self, user_id: str, url: str) -> bool:
+        with self.engine.begin() as conn:
+            ids = conn.execute(select(Webhook.id).where(Webhook.user_id == user_id, Webhook.url == url)).scalars().all()
+            self._delete_webhooks(conn, ids)
+
+        return bool(ids)
+
+    def delete_user(self, user_id: str) -> None:
+        with self.engine.begin() as conn:
+            self._delete_webhooks(conn, conn.execute(select(Webhook.id).where(Webhook.user_id == user_id)).scalars().all())
+            conn.execute(delete(WebhookState).where(WebhookState.user_id == user_id))
+
+    def _delete_webhooks(self, conn, ids: list[int]) -> None:
+        if ids:
+            conn.execute(delete(Delivery).where(Delivery.webhook_id.in_(ids)))
+            conn.execute(delete(Webhook).where(Webhook.id.in_(ids)))
+
+    #* queueing
+
+    def _data_version(self) -> int:
+        # a connection of its own, like the status bus poller: data_version changes whenever any other
+        # connection (another worker, or one from this worker's pool) commits to webhooks.db
+        if self._version_conn is None:
+            self._version_conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _webhook_ids(self, user_id: str) -> list[int]:
+        # cached webhook lists (mostly empty ones) are only used until the file changes, so a webhook
+        # registered or deleted through any worker counts for the very next status change
+        with self._lock:
+            version = self._data_version()
+            if version != self._targets_version:
+                self._targets.clear()
+                self._targets_version = version
+            cached = self._targets.get(user_id)
+        if cached is not None:
+            return cached
+
+        with self.engine.connect() as conn:
+            ids = list(conn.execute(select(Webhook.id).where(Webhook.user_id == user_id)).scalars())
+        with self._lock:
+            if self._targets_version == version:
+                if len(self._targets) >= 100_000:
+                    self._targets.clear()
+                self._targets[user_id] = ids
+        return ids
+
+    def status_changed(self, user_id: str, status: Dict[str, Any]) -> int:
+        """Queues deliveries if the user has webhooks and the status changed, returns how many."""
+        webhook_ids = self._webhook_ids(user_id)
+        if not webhook_ids:
+            return 0
+
+        digest = status_digest(status) if status else ""
+        with self.engine.begin() as conn:
+            # decided from the shared digest only: a per-process copy would miss A -> B -> A when B
+            # was queued by another worker. An unchanged status writes nothing
+            changed = conn.execute(
+                insert(WebhookState).values(user_id=user_id, digest=digest).on_conflict_do_update(
+                    index_elements=[WebhookState.user_id],
+                    set_={"digest": digest},
+                    where=WebhookState.digest != digest,
+                )
+            ).rowcount
+            if not changed:
+                return 0
+
+            payload = json.dumps({
+                "user_id": user_id,
+                "status": status,
+                "changed_at": datetime.now(tz=timezone.utc).isoformat(),
+            }, separators=(",", ":"))
+            now = time.time()
+            conn.execute(insert(Delivery), [
+                {"webhook_id": webhook_id, "payload": payload, "attempts": 0, "next_attempt_at": now, "locked_until": 0}
+                for webhook_id in webhook_ids
+            ])
+        return len(webhook_ids)
+
+    #* dispatching
+
+    def start(self) -> None:
+        """Starts this process' dispatcher thread (it only sends while it holds the lease)."""
+        if self._dispatcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._dispatcher_pid == os.getpid():
+                return
+            self._dispatcher_pid = os.getpid()
+            self._owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+            self._inflight = {}
+            self._pool = ThreadPoolExecutor(max_workers=self._senders, thread_name_prefix="webhook-sender")
+        Thread(target=self._run, name="webhook-dispatcher", daemon=True).start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                if self._hold_lease():
+                    self.dispatch()
+            except Exception as e:
+                logger.error(f"Webhook dispatcher failed: {e}")
+            self._wake.wait(self._poll_s)
+            self._wake.clear()
+
+    def _hold_lease(self) -> bool:
+        now = time.time()
+        with self.engine.begin() as conn:
+            conn.execute(
+                insert(DispatcherLease).values(id=1, owner=self._owner, expires_at=now + LEASE_S).on_conflict_do_update(
+                    index_elements=[DispatcherLease.id],
+                    set_={"owner": self._owner, "expires_at": now + LEASE_S},
+                    where=(DispatcherLease.owner == self._owner) | (DispatcherLease.expires_at < now),
+                )
+            )
+            return conn.execute(select(DispatcherLease.owner).where(DispatcherLease.id == 1)).scalar_one() == self._owner
+
+    def dispatch(self) -> int:
+        """Claims due deliveries and hands them to the sender threads, returns how many requests were started."""
+        now = time.time()
+        with self.engine.begin() as conn:
+            # webhooks with something due, the one waiting longest first
+            due = (Delivery.next_attempt_at <= now) & (Delivery.locked_until <= now)
+            targets = conn.execute(
+                select(Webhook.id, Webhook.url, Webhook.secret)
+                .join(Delivery, Delivery.webhook_id == Webhook.id)
+                .where(due)
+                .group_by(Webhook.id)
+                .order_by(func.min(Delivery.id))
+                .limit(CLAIM_LIMIT)
+            ).all()
+
+            # hosts that already have per_target requests in flight wait for the next round. Only counted
+            # here, _inflight is raised once the claim is committed so a failed round can't leak it
+            claimed = []
+            planned: dict[str, int] = {}
+            with self._lock:
+                for target in targets:
+                    host = urlsplit(target.url).netloc
+                    if self._inflight.get(host, 0) + planned.get(host, 0) >= self.per_target:
+                        continue
+                    planned[host] = planned.get(host, 0) + 1
+                    claimed.append(target)
+
+            batches: list[tuple[Any, list]] = []
+            for target in claimed:
+                rows = conn.execute(
+                    select(Delivery.id, Delivery.payload, Delivery.attempts)
+                    .where(Delivery.webhook_id == target.id, due)
+                    .order_by(Delivery.id)
+                    .limit(BATCH_SIZE)
+                ).all()
+                batches.append((target, rows))
+
+            ids = [row.id for _, rows in batches for row in rows]
+            if ids:
+                conn.execute(update(Delivery).where(Delivery.id.in_(ids)).values(locked_until=now + SEND_TIMEOUT_S * 3))
+
+        with self._lock:
+            for host, count in planned.items():
+                self._inflight[host] = self._inflight.get(host, 0) + count
+        for target, rows in batches:
+            self._pool.submit(self._deliver, target, rows)  # type: ignore[union-attr]
+        return len(batches)
+
+    def _deliver(self, target: Any, batch: list) -> None:
+        webhook_id, url, secret = target.id, target.url, target.secret
+        host = urlsplit(url).netloc
+        try:
+            body = json.dumps({"events": [json.loads(row.payload) for row in batch]}, separators=(",", ":")).encode()
+            status = None
+            address, error = resolve_url(url, self.allow_private)  # DNS may point somewhere else by now
+            if error is None:
+                status = webhook_sender.post(url, body, {
+                    "Content-Type": "application/json",
+                    "User-Agent": "vscode-status-api-webhooks",
+                    "X-Webhook-Signature": _signature(secret, body),
+                }, timeout=SEND_TIMEOUT_S, address=address)
+            self._finish(webhook_id, batch, status)
+        except Exception as e:
+            logger.error(f"Failed to deliver webhook {webhook_id}: {e}")
+        finally:
+            with self._lock:
+                self._inflight[host] -= 1
+            self._wake.set()  # the host may take the next batch now
+
+    def _finish(self, webhook_id: int, batch: list, status: int | None) -> None:
+        ids = [row.id for row in batch]
+        with self.engine.begin() as conn:
+            if status is not None and 200 <= status < 300:
+                conn.execute(delete(Delivery).where(Delivery.id.in_(ids)))
+                return
+
+            if status == 410:
+                #* the receiver says it's gone for good
+                logger.info(f"Webhook {webhook_id} returned 410 Gone, removing it")
+                self._delete_webhooks(conn, [webhook_id])
+                return
+
+            now = time.time()
+            expired = [row.id for row in batch if row.attempts + 1 >= self.max_attempts]
+            retry = [row for row in batch if row.attempts + 1 < self.max_attempts]
+            if expired:
+                conn.execute(delete(Delivery).where(Delivery.id.in_(expired)))
+                logger.warning(f"Gave up on {len(expired)} deliveries to webhook {webhook_id} after {self.max_attempts} attempts (last status {status})")
+            if retry:
+                conn.execute(update(Delivery).where(Delivery.id.in_([row.id for row in retry])).values(
+                    attempts=Delivery.attempts + 1,
+                    next_attempt_at=now + _backoff(max(row.attempts for row in retry) + 1),
+                    locked_until=0,
+                ))
+
+    def pending(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(Delivery)).scalar_one()
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=False)
+        with self._lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+        self.engine.dispose()
+
+
+_queue: WebhookQueue | None = None
+_queue_lock = Lock()
+
+
+def get_queue() -> WebhookQueue:
+    """The webhook queue, created on first use instead of at import time."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = WebhookQueue(
+                    poll_ms=WEBHOOK_POLL_MS,
+                    max_attempts=WEBHOOK_MAX_ATTEMPTS,
+                    per_target=WEBHOOK_CONCURRENCY_PER_TARGET,
+                    max_per_user=WEBHOOK_MAX_PER_USER,
+                    allow_private=WEBHOOK_ALLOW_PRIVATE,
+                )
+    return _queue
+
+
+def status_changed(user_id: str, status: Dict[str, Any]) -> None:
+    """status_changed() for the routes: the status is already saved, so a queue error is only logged."""
+    try:
+        get_queue().status_changed(user_id, status)
+    except Exception as e:
+        logger.error(f"Failed to queue webhooks for {user_id}: {e}")
+
+
+def reset_queue() -> None:
+    global _queue
+    with _queue_lock:
+        _queue = None
+
+
+def close_queue() -> None:
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.close()
+            _queue = None
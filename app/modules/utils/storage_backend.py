@@ -0,0 +1,70 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+
+# statuses not updated for this long are cleared by cleanup_old_status
+STATUS_MAX_AGE_MINUTES: int = 10
+
+
+def DATETIME_NOW() -> str:
+    return datetime.now(tz=timezone.utc).isoformat()
+
+
+@dataclass(frozen=True)
+class Presence:
+    """The parts of a user's status that presence (online/idle/offline) is derived from."""
+    last_updated: str | None  # None once the status was cleared
+    is_idling: bool
+    language: str | None
+
+
+class StorageBackend(ABC):
+    """
+    Interface every user/status store has to implement.
+
+    These are the methods the blueprints call, and they all return the same
+    (success, message) style tuples so the routes can map them to status codes
+    without caring which backend is configured in .env.
+    """
+
+    name: str = "base"
+
+    @abstractmethod
+    def update_status(self, user_id: str, auth_token: str, status_data: Dict[str, Any]) -> tuple[bool, str, bool]:
+        ...
+
+    @abstractmethod
+    def get_status(self, user_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def register_user(self, user_id: str, auth_token: str) -> tuple[bool, str]:
+        ...
+
+    @abstractmethod
+    def delete_user(self, user_id: str, auth_token: str) -> tuple[bool, str]:
+        ...
+
+    @abstractmethod
+    def check_if_user_exists(self, user_id: str) -> tuple[bool, str]:
+        ...
+
+    @abstractmethod
+    def check_token(self, user_id: str, auth_token: str) -> bool | None:
+        """True/False for a valid/invalid token, None if the user doesn't exist. For routes that only need to authenticate."""
+        ...
+
+    @abstractmethod
+    def get_presence(self, user_ids: list[str]) -> Dict[str, Presence]:
+        """Presence of each of the users that exists, read in bulk for group rollups."""
+        ...
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Sizes and hit counts of this process' lookup caches (see /admin/metrics), by cache name."""
+        return {}
+
+    def close(self) -> None:
+        """Release connections/threads held by the backend. No-op by default."""
+        pass
@@ -1,7 +1,9 @@
 from datetime import datetime, timezone
 from pathlib import Path
-from sqlalchemy import Integer, String, create_engine
+from threading import Lock
+from sqlalchemy import Index, Integer, String, create_engine, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, MappedColumn, sessionmaker
+from werkzeug.local import LocalProxy
 from .logger import logger
 
 
@@ -11,13 +13,14 @@ class Base(DeclarativeBase):
 
 class Telemetry(Base):
     __tablename__ = "telemetry"
+    __table_args__ = (Index("ix_telemetry_timestamp_endpoint", "timestamp", "endpoint"),)
 
     id: Mapped[int] = MappedColumn(Integer, primary_key=True, autoincrement=True)
     ip: Mapped[str] = MappedColumn(String(45), nullable=False)
     endpoint: Mapped[str] = MappedColumn(String(255), nullable=False)
     method: Mapped[str] = MappedColumn(String(10), nullable=False)
     status: Mapped[int] = MappedColumn(Integer, nullable=False)
-    timestamp: Mapped[int] = MappedColumn(Integer, default=lambda: int(datetime.now(timezone.utc).timestamp()), index=True)
+    timestamp: Mapped[int] = MappedColumn(Integer, default=lambda: int(datetime.now(timezone.utc).timestamp()))
 
 
 class WebhookTracker(Base):
@@ -29,6 +32,41 @@ class WebhookTracker(Base):
     last_sent: Mapped[int] = MappedColumn(Integer, default=0, index=True)
 
 
+class TelemetryBucket(Base):
+    """Requests per endpoint per minute or hour, rolled up from telemetry (see telemetry_stats.rollup)."""
+    __tablename__ = "telemetry_buckets"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    period: Mapped[int] = MappedColumn(Integer, primary_key=True)  # 60 or 3600 seconds
+    bucket: Mapped[int] = MappedColumn(Integer, primary_key=True)  # start of the minute/hour, unix seconds
+    endpoint: Mapped[str] = MappedColumn(String(255), primary_key=True)
+    requests: Mapped[int] = MappedColumn(Integer, nullable=False, default=0)
+    client_errors: Mapped[int] = MappedColumn(Integer, nullable=False, default=0)  # 4xx
+    server_errors: Mapped[int] = MappedColumn(Integer, nullable=False, default=0)  # 5xx
+
+
+class TelemetryIpBucket(Base):
+    """Requests per IP per hour, rolled up from telemetry."""
+    __tablename__ = "telemetry_ip_buckets"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    bucket: Mapped[int] = MappedColumn(Integer, primary_key=True)
+    ip: Mapped[str] = MappedColumn(String(45), primary_key=True)
+    requests: Mapped[int] = MappedColumn(Integer, nullable=False, default=0)
+
+
+class TelemetryRollup(Base):
+    """How far the rollup got: telemetry rows up to last_id are counted in the bucket tables."""
+    __tablename__ = "telemetry_rollup"
+
+    id: Mapped[int] = MappedColumn(Integer, primary_key=True)  # always 1
+    last_id: Mapped[int] = MappedColumn(Integer, nullable=False, default=0)
+
+
+# like in database.py, forked workers inherit this and skip create_all when the master already ran it
+_initialized_urls: set[str] = set()
+
+
 class Database:
     def __init__(self, db_file: str = "telemetry.db"):
         self.db_file = f"sqlite:///{Path(__file__).resolve().parent.parent.parent.parent / 'data' / db_file}"
@@ -37,8 +75,18 @@ class Database:
         self._init_database()
 
     def _init_database(self):
+        if self.db_file in _initialized_urls:
+            return
+
         try:
             Base.metadata.create_all(bind=self.engine, checkfirst=True)
+            # create_all skips tables that already exist, so indexes added later are created here
+            for index in Telemetry.__table__.indexes:
+                index.create(bind=self.engine, checkfirst=True)
+            # the composite index starts with timestamp, so the old single-column one only costs inserts
+            with self.engine.begin() as conn:
+                conn.execute(text("DROP INDEX IF EXISTS ix_telemetry_timestamp"))
+            _initialized_urls.add(self.db_file)
             logger.info("Telemetry database initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize telemetry database: {e}")
@@ -62,5 +110,33 @@ class Database:
                 logger.error(f"Failed to log telemetry: {e}")
 
 
+_db: Database | None = None
+_db_lock = Lock()
+
+
+def get_db() -> Database:
+    """The telemetry database, created on first use instead of at import time."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = Database()
+    return _db
+
+
+def reset_db() -> None:
+    global _db
+    with _db_lock:
+        _db = None
+
+
+def close_db() -> None:
+    global _db
+    with _db_lock:
+        if _db is not None:
+            _db.engine.dispose()
+            _db = None
+
+
 # global instance
-db = Database()
+db: Database = LocalProxy(get_db)  # type: ignore[assignment]
@@ -0,0 +1,187 @@
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict
+from sqlalchemy import case, desc, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from .telemetry_db import Database, Telemetry, TelemetryBucket, TelemetryIpBucket, TelemetryRollup, db
+
+
+MINUTE = 60
+HOUR = 3600
+PERIODS: dict[str, int] = {"minute": MINUTE, "hour": HOUR}
+MAX_POINTS = 10_080  # a week of minutes, or more than a year of hours
+ROLLUP_CHUNK = 50_000  # telemetry rows per rollup transaction, so request logging isn't blocked for long
+
+
+def parse_time(value: str) -> int | None:
+    """Unix seconds or an ISO 8601 date/time (UTC unless it has an offset), None if it's neither."""
+    if value.isdigit():
+        return int(value)
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _iso(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def _rate(errors: int, requests: int) -> float:
+    return round(errors / requests, 4) if requests else 0.0
+
+
+def rollup(database: Database = db) -> int:
+    """Counts telemetry rows logged since the last rollup into the bucket tables, returns how many rows were read."""
+    rolled = 0
+    while True:
+        with database.engine.begin() as conn:
+            # a write first, so rollups running at the same time (other workers, the CLI) wait for each other
+            # instead of reading the same last_id and counting rows twice
+            conn.execute(insert(TelemetryRollup).values(id=1, last_id=0).on_conflict_do_update(
+                index_elements=[TelemetryRollup.id], set_={"last_id": TelemetryRollup.last_id},
+            ))
+            last_id = conn.execute(select(TelemetryRollup.last_id).where(TelemetryRollup.id == 1)).scalar_one()
+            head = conn.execute(select(func.max(Telemetry.id))).scalar() or 0
+            if head <= last_id:
+                return rolled
+
+            upto = min(head, last_id + ROLLUP_CHUNK)
+            rows = Telemetry.id.between(last_id + 1, upto)
+            client_errors = func.sum(case((Telemetry.status.between(400, 499), 1), else_=0))
+            server_errors = func.sum(case((Telemetry.status >= 500, 1), else_=0))
+
+            for period in PERIODS.values():
+                bucket = Telemetry.timestamp - Telemetry.timestamp % period
+                counts = conn.execute(
+                    select(bucket, Telemetry.endpoint, func.count(), client_errors, server_errors)
+                    .where(rows)
+                    .group_by(bucket, Telemetry.endpoint)
+                ).all()
+                if counts:
+                    stmt = insert(TelemetryBucket)
+                    conn.execute(stmt.on_conflict_do_update(
+                        index_elements=[TelemetryBucket.period, TelemetryBucket.bucket, TelemetryBucket.endpoint],
+                        set_={
+                            "requests": TelemetryBucket.requests + stmt.excluded.requests,
+                            "client_errors": TelemetryBucket.client_errors + stmt.excluded.client_errors,
+                            "server_errors": TelemetryBucket.server_errors + stmt.excluded.server_errors,
+                        },
+                    ), [
+                        {"period": period, "bucket": b, "endpoint": e, "requests": r, "client_errors": c, "server_errors": s}
+                        for b, e, r, c, s in counts
+                    ])
+
+            bucket = Telemetry.timestamp - Telemetry.timestamp % HOUR
+            counts = conn.execute(select(bucket, Telemetry.ip, func.count()).where(rows).group_by(bucket, Telemetry.ip)).all()
+            if counts:
+                stmt = insert(TelemetryIpBucket)
+                conn.execute(stmt.on_conflict_do_update(
+                    index_elements=[TelemetryIpBucket.bucket, TelemetryIpBucket.ip],
+                    set_={"requests": TelemetryIpBucket.requests + stmt.excluded.requests},
+                ), [{"bucket": b, "ip": ip, "requests": r} for b, ip, r in counts])
+
+            conn.execute(update(TelemetryRollup).where(TelemetryRollup.id == 1).values(last_id=upto))
+            rolled += upto - last_id
+
+
+def _top_ips(conn, start: int, end: int, top: int) -> list[Dict[str, Any]]:
+    # whole hours come from telemetry_ip_buckets, the partial hours at the edges (minute buckets only) from telemetry
+    first_hour = -(-start // HOUR) * HOUR
+    last_hour = max(end - end % HOUR, first_hour)
+
+    edges: Counter[str] = Counter()
+    for edge_start, edge_end in ((start, min(first_hour, end)), (max(last_hour, start), end)):
+        if edge_start < edge_end:
+            edges.update(dict(conn.execute(
+                select(Telemetry.ip, func.count())
+                .where(Telemetry.timestamp >= edge_start, Telemetry.timestamp < edge_end)
+                .group_by(Telemetry.ip)
+            ).all()))
+
+    hours = TelemetryIpBucket.bucket.between(first_hour, last_hour - 1)
+    totals: Counter[str] = Counter(dict(conn.execute(
+        select(TelemetryIpBucket.ip, func.sum(TelemetryIpBucket.requests))
+        .where(hours)
+        .group_by(TelemetryIpBucket.ip)
+        .order_by(desc(func.sum(TelemetryIpBucket.requests)))
+        .limit(top)
+    ).all()))
+
+    # an IP outside the whole-hour top list can only make it with its edge requests, so those are the only other candidates
+    others = [ip for ip in edges if ip not in totals]
+    for i in range(0, len(others), 500):
+        totals.update(dict(conn.execute(
+            select(TelemetryIpBucket.ip, func.sum(TelemetryIpBucket.requests))
+            .where(hours, TelemetryIpBucket.ip.in_(others[i:i + 500]))
+            .group_by(TelemetryIpBucket.ip)
+        ).all()))
+    totals.update(edges)
+
+    return [{"ip": ip, "requests": requests} for ip, requests in totals.most_common(top)]
+
+
+def query(start_ts: int, end_ts: int, bucket: str = "hour", top: int = 10, database: Database = db) -> Dict[str, Any]:
+    """
+    Request counts and error rates between start_ts and end_ts (widened to whole minutes/hours), per
+    `bucket`, plus the busiest endpoints and IPs. Raises ValueError for ranges with too many buckets.
+    """
+    period = PERIODS[bucket]
+    start = start_ts - start_ts % period
+    end = -(-end_ts // period) * period
+    if end <= start:
+        end = start + period
+    if (end - start) // period > MAX_POINTS:
+        raise ValueError(f"Range has more than {MAX_POINTS} {bucket}s, use a shorter range or a bigger bucket")
+
+    rollup(database)
+
+    in_range = (TelemetryBucket.period == period) & TelemetryBucket.bucket.between(start, end - 1)
+    requests = func.sum(TelemetryBucket.requests)
+    client_errors = func.sum(TelemetryBucket.client_errors)
+    server_errors = func.sum(TelemetryBucket.server_errors)
+
+    with database.engine.connect() as conn:
+        counts = {
+            row[0]: row[1:] for row in conn.execute(
+                select(TelemetryBucket.bucket, requests, client_errors, server_errors).where(in_range).group_by(TelemetryBucket.bucket)
+            ).all()
+        }
+        endpoints = conn.execute(
+            select(TelemetryBucket.endpoint, requests, client_errors, server_errors)
+            .where(in_range)
+            .group_by(TelemetryBucket.endpoint)
+            .order_by(desc(requests))
+            .limit(top)
+        ).all()
+        top_ips = _top_ips(conn, start, end, top)
+
+    series = []
+    for ts in range(start, end, period):
+        r, c, s = counts.get(ts, (0, 0, 0))
+        series.append({"time": _iso(ts), "requests": r, "client_errors": c, "server_errors": s, "error_rate": _rate(s, r)})
+
+    total_requests = sum(point["requests"] for point in series)
+    total_client = sum(point["client_errors"] for point in series)
+    total_server = sum(point["server_errors"] for point in series)
+
+    return {
+        "from": _iso(start),
+        "to": _iso(end),
+        "bucket": bucket,
+        "totals": {
+            "requests": total_requests,
+            "client_errors": total_client,
+            "server_errors": total_server,
+            "error_rate": _rate(total_server, total_requests),
+        },
+        "series": series,
+        "top_endpoints": [
+            {"endpoint": e, "requests": r, "client_errors": c, "server_errors": s, "error_rate": _rate(s, r)}
+            for e, r, c, s in endpoints
+        ],
+        "top_ips": top_ips,
+    }
@@ -0,0 +1,138 @@
+import re
+from dataclasses import dataclass
+from typing import Any
+from flask import Response, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+from modules.utils.gv import MAX_REQUEST_BYTES
+
+
+# these match the column sizes in database.User
+MAX_USER_ID_LENGTH: int = 32
+MAX_AUTH_TOKEN_LENGTH: int = 128
+GROUP_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")  # matches the column size in group_presence.Group
+
+
+@dataclass(frozen=True)
+class Field:
+    types: tuple[type, ...]
+    max_length: int | None = None  # for strings
+
+
+# what the extension sends to /update-status (besides userId)
+STATUS_SCHEMA: dict[str, Field] = {
+    "appName": Field((str,), 128),
+    "details": Field((str,), 256),
+    "fileName": Field((str,), 256),
+    "gitBranch": Field((str,), 256),
+    "gitRepo": Field((str,), 256),
+    "isDebugging": Field((bool,)),
+    "isIdling": Field((bool,)),
+    "language": Field((str,), 64),
+    "languageIcon": Field((str,), 512),
+    "timestamp": Field((int, float)),
+    "workspace": Field((str,), 256),
+}
+
+# unknown keys are still accepted (and kept in status_data) so newer extension versions keep working,
+# but only a few, and only small scalar values
+MAX_EXTRA_KEYS: int = 16
+MAX_EXTRA_KEY_LENGTH: int = 64
+MAX_EXTRA_VALUE_LENGTH: int = 256
+EXTRA_VALUE_TYPES: tuple[type, ...] = (str, int, float, bool, type(None))
+
+
+def _too_large(max_bytes: int) -> tuple[Response, int]:
+    return jsonify({'error': f'Request body too large (max {max_bytes} bytes)'}), 413
+
+
+def load_json_body(max_bytes: int = MAX_REQUEST_BYTES) -> tuple[dict[str, Any] | None, tuple[Response, int] | None]:
+    """
+    Returns (data, None) for a JSON object body, or (None, error response).
+    Oversized bodies are rejected from the Content-Length header before anything is read, and bodies
+    without one (chunked) stop being read at `max_bytes` instead of being buffered whole.
+    """
+    if max_bytes != MAX_REQUEST_BYTES:
+        request.max_content_length = max_bytes  # routes with bigger bodies raise the app-wide MAX_CONTENT_LENGTH
+
+    if request.content_length is not None and request.content_length > max_bytes:
+        return None, _too_large(max_bytes)
+
+    try:
+        if request.content_length is None and len(request.get_data()) >= max_bytes:
+            return None, _too_large(max_bytes)  # chunked, reading stopped at the limit (get_json reuses the cached data)
+        data = request.get_json(silent=True)
+    except RequestEntityTooLarge:
+        return None, _too_large(max_bytes)
+
+    if not data or not isinstance(data, dict):
+        return None, (jsonify({'error': 'No JSON data provided'}), 400)
+    return data, None
+
+
+def validate_user_id(user_id: Any) -> str | None:
+    if not isinstance(user_id, str):
+        return "userId must be a string"
+    if len(user_id) > MAX_USER_ID_LENGTH:
+        return f"userId must be at most {MAX_USER_ID_LENGTH} characters"
+    return None
+
+
+def validate_auth_token(auth_token: str) -> str | None:
+    if len(auth_token) > MAX_AUTH_TOKEN_LENGTH:
+        return f"Authorization token must be at most {MAX_AUTH_TOKEN_LENGTH} characters"
+    return None
+
+
+def _check_value(key: str, value: Any, field: Field) -> str | None:
+    # type() instead of isinstance() so booleans don't pass as numbers
+    if type(value) not in field.types:
+        return f"{key} must be of type {' or '.join(t.__name__ for t in field.types)}"
+    if field.max_length is not None and len(value) > field.max_length:
+        return f"{key} must be at most {field.max_length} characters"
+    return None
+
+
+def validate_status(status_data: dict[str, Any]) -> str | None:
+    """Returns an error message for the first problem found in a status payload, or None if it's valid."""
+    extra_keys = 0
+
+    for key, value in status_data.items():
+        field = STATUS_SCHEMA.get(key)
+
+        if field is None:
+            extra_keys += 1
+            if extra_keys > MAX_EXTRA_KEYS:
+                return f"Too many unknown fields (max {MAX_EXTRA_KEYS})"
+            if len(key) > MAX_EXTRA_KEY_LENGTH:
+                return f"Field names must be at most {MAX_EXTRA_KEY_LENGTH} characters"
+            field = Field(EXTRA_VALUE_TYPES, MAX_EXTRA_VALUE_LENGTH if isinstance(value, str) else None)
+
+        error = _check_value(key, value, field)
+        if error:
+            return error
+
+    return None
+
+
+def validate_group_name(group: Any) -> str | None:
+    if not isinstance(group, str) or not GROUP_NAME.match(group):
+        return "group must be 1-64 letters, digits, '_', '.' or '-'"
+    return None
+
+
+def validate_icon_queries(files: Any, max_items: int) -> str | None:
+    """Checks the `files` list of a /resolve-icons request."""
+    if not isinstance(files, list):
+        return "files must be a list"
+    if len(files) > max_items:
+        return f"At most {max_items} files per request"
+
+    for i, item in enumerate(files):
+        if not isinstance(item, dict):
+            return f"files[{i}] must be an object"
+        for key in ("language", "fileName"):
+            error = _check_value(f"files[{i}].{key}", item.get(key, ""), Field((str,), 256))
+            if error:
+                return error
+
+    return None
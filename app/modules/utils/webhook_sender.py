@@ -1,5 +1,36 @@
+import certifi
 import requests
 import threading
+import urllib3
+from urllib.parse import urlsplit
+
+def post(url: str, body: bytes, headers: dict[str, str], timeout: float = 10, address: str | None = None) -> int | None:
+    """
+    POSTs `body` and returns the response status code, None if the request itself failed. With `address`,
+    connects to that IP instead of resolving the URL's host (which is still used for Host, SNI and the certificate).
+    """
+    if address is None:
+        try:
+            return requests.post(url, data=body, headers=headers, timeout=timeout, allow_redirects=False).status_code
+        except requests.RequestException:
+            return None
+
+    parts = urlsplit(url)
+    options = {"timeout": urllib3.Timeout(connect=timeout, read=timeout), "retries": False}
+    if parts.scheme == "https":
+        pool = urllib3.HTTPSConnectionPool(
+            address, parts.port or 443, server_hostname=parts.hostname, assert_hostname=parts.hostname,
+            cert_reqs="CERT_REQUIRED", ca_certs=certifi.where(), **options,
+        )
+    else:
+        pool = urllib3.HTTPConnectionPool(address, parts.port or 80, **options)
+
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    try:
+        with pool:
+            return pool.urlopen("POST", path, body=body, headers={**headers, "Host": parts.netloc.rpartition("@")[2]}, redirect=False).status
+    except urllib3.exceptions.HTTPError:
+        return None
 
 def _send(webhook_url: str, content: str):
     try:
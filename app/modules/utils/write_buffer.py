@@ -0,0 +1,95 @@
+import atexit
+from dataclasses import dataclass
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, Optional
+from modules.utils.logger import logger
+
+
+@dataclass
+class PendingStatus:
+    status_data: Dict[str, Any]
+    last_updated: str
+    created_at: str
+
+
+class StatusWriteBuffer:
+    """
+    Keeps the latest status per user in memory and writes all dirty users in one
+    transaction every `interval_ms`, so a burst of heartbeats from the same user only
+    costs one DB write. At most `interval_ms` worth of updates can be lost on a crash;
+    the buffer is flushed early once `max_pending` users are dirty, and on shutdown.
+    """
+
+    def __init__(self, flush: Callable[[Dict[str, PendingStatus]], None], interval_ms: int, max_pending: int = 1000):
+        self._flush_fn = flush
+        self._interval: float = interval_ms / 1000
+        self._max_pending: int = max_pending
+
+        self._pending: Dict[str, PendingStatus] = {}
+        self._inflight: Dict[str, PendingStatus] = {}  # swapped out of _pending, not committed yet
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._wake = Event()
+        self._stopped = Event()
+        self._thread: Thread | None = None
+
+        atexit.register(self.close)
+
+    def put(self, user_id: str, status: PendingStatus) -> None:
+        with self._lock:
+            self._pending[user_id] = status
+            full = len(self._pending) >= self._max_pending
+
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def get(self, user_id: str) -> Optional[PendingStatus]:
+        with self._lock:
+            return self._pending.get(user_id) or self._inflight.get(user_id)
+
+    def discard(self, user_id: str) -> None:
+        with self._lock:
+            self._pending.pop(user_id, None)
+            self._inflight.pop(user_id, None)
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+
+            try:
+                self._flush_fn(batch)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} buffered statuses: {e}")
+                # put them back unless a newer status (or a delete) arrived in the meantime
+                with self._lock:
+                    for user_id, status in batch.items():
+                        if user_id in self._inflight:
+                            self._pending.setdefault(user_id, status)
+            finally:
+                with self._lock:
+                    self._inflight = {}
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        self.flush()
+
+    def _ensure_thread(self) -> None:
+        # started lazily so it lives in the process that actually serves requests (i.e. after a fork)
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="status-write-buffer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            self.flush()
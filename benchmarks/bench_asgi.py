@@ -0,0 +1,161 @@
+"""
+Compares `gunicorn main:app` (sync workers) with `uvicorn asgi:app`: /get-status throughput with
+concurrent pollers, and whether a normal request still gets through while slow clients
+(connections that never finish sending their headers) or open /stream-status connections
+are connected. Use more streams than workers * ASGI_THREADS to see that streams don't hold threads.
+
+Usage (from the repo root, needs gunicorn, uvicorn and a2wsgi):
+  python benchmarks/bench_asgi.py --workers 4 --clients 32 --slow-clients 200 --streams 200
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+
+def start_server(command: list[str], port: int, database_url: str, extra_env: dict[str, str] | None = None) -> subprocess.Popen:
+    with socket.socket() as sock:
+        if sock.connect_ex(("127.0.0.1", port)) == 0:
+            raise RuntimeError(f"port {port} is already in use")
+
+    env = {**os.environ, "RATE_LIMITING": "false", "DATABASE_URL": database_url, "TELEMETRY_DISCORD_WEBHOOK_URL": "", **(extra_env or {})}
+    process = subprocess.Popen(command, cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return process
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            time.sleep(0.1)
+
+    process.kill()
+    raise RuntimeError(f"server didn't start: {' '.join(command)}")
+
+
+def request(url: str, data: dict | None = None, token: str | None = None, method: str = "GET") -> int:
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, method=method, headers={"Content-Type": "application/json"})
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=10) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return 0
+
+
+def throughput(base: str, user_id: str, clients: int, seconds: float) -> tuple[float, float, int]:
+    latencies: list[float] = []
+    failed = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def poll() -> None:
+        nonlocal failed
+        local: list[float] = []
+        errors = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if request(f"{base}/get-status?userId={user_id}") == 200:
+                local.append(time.perf_counter() - start)
+            else:
+                errors += 1
+        with lock:
+            latencies.extend(local)
+            failed += errors
+
+    threads = [threading.Thread(target=poll) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else float("nan")
+    return len(latencies) / seconds, p99, failed
+
+
+def with_slow_clients(port: int, user_id: str, slow_clients: int) -> str:
+    sockets = []
+    for _ in range(slow_clients):
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.sendall(b"GET /get-status?userId=" + user_id.encode() + b" HTTP/1.1\r\nHost: localhost\r\n")  # never finished
+        sockets.append(sock)
+
+    try:
+        start = time.perf_counter()
+        if request(f"http://127.0.0.1:{port}/get-status?userId={user_id}") != 200:
+            return "blocked (timed out after 10 s)"
+        return f"{(time.perf_counter() - start) * 1000:.1f} ms"
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+def with_streams(port: int, user_id: str, streams: int) -> str:
+    sockets = []
+    try:
+        for _ in range(streams):
+            sock = socket.create_connection(("127.0.0.1", port))
+            sock.sendall(b"GET /stream-status?userId=" + user_id.encode() + b" HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            sockets.append(sock)
+
+        start = time.perf_counter()
+        if request(f"http://127.0.0.1:{port}/get-status?userId={user_id}") != 200:
+            return "blocked (timed out after 10 s)"
+        return f"{(time.perf_counter() - start) * 1000:.1f} ms"
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+def run(name: str, command: list[str], port: int, args: argparse.Namespace, database_url: str) -> None:
+    process = start_server(command, port, database_url, {"STATUS_BUS_ENABLED": "true"})
+    try:
+        base = f"http://127.0.0.1:{port}"
+        user_id, token = f"bench{port}{int(time.time())}"[-16:], "bench-token"
+        request(f"{base}/register-user", {"userId": user_id}, token, "POST")
+        request(f"{base}/update-status", {"userId": user_id, "details": "Benchmarking", "language": "python"}, token, "POST")
+
+        throughput(base, user_id, args.clients, 1)  # warm up
+        rps, p99, failed = throughput(base, user_id, args.clients, args.seconds)
+        slow = with_slow_clients(port, user_id, args.slow_clients)
+        streaming = with_streams(port, user_id, args.streams)
+
+        print(f"{name:<28} {rps:>8.0f} req/s   p99 {p99:>7.1f} ms   failed {failed:>4}   request with {args.slow_clients} slow clients: {slow}, with {args.streams} open streams: {streaming}")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark gunicorn (sync) against uvicorn (ASGI)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent /get-status pollers")
+    parser.add_argument("--slow-clients", type=int, default=200)
+    parser.add_argument("--streams", type=int, default=200, help="open /stream-status connections")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        workers = str(args.workers)
+        run(f"gunicorn sync x{workers}", [sys.executable, "-m", "gunicorn", "main:app", "--workers", workers, "--bind", "127.0.0.1:5101"], 5101, args, database_url)
+        run(f"uvicorn asgi x{workers}", [sys.executable, "-m", "uvicorn", "asgi:app", "--workers", workers, "--port", "5102", "--log-level", "warning"], 5102, args, database_url)
+
+
+if __name__ == "__main__":
+    main()
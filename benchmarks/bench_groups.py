@@ -0,0 +1,123 @@
+"""
+Benchmark for the group presence rollups (modules/utils/group_presence.py) with groups of 1,000 members:
+what /group-status costs from the in-memory rollup vs reading and classifying every member's status
+on each request, what record() adds to /update-status, and how long building a rollup (first request
+for a group) and the background refresh take. Statuses are stored in a temporary SQLite database.
+
+Usage (from the repo root):
+  python benchmarks/bench_groups.py
+  python benchmarks/bench_groups.py --groups 20 --members 1000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from sqlalchemy import insert  # noqa: E402
+from modules.utils.auth_tokens import hash_token  # noqa: E402
+from modules.utils.database import Database, User  # noqa: E402
+from modules.utils.group_presence import DATA_DIR, Group, GroupMember, GroupPresence, _seen_at  # noqa: E402
+from modules.utils.storage_backend import DATETIME_NOW  # noqa: E402
+
+LANGUAGES = ["python", "typescript", "rust", "go", "markdown", "json"]
+
+
+def scan(backend: Database, members: list[str], max_age_s: float) -> dict:
+    """What /group-status would do without the rollup: read every member's status and classify it."""
+    now = time.time()
+    online, idle, languages = [], [], Counter()
+    presence = backend.get_presence(members)
+    for user_id in members:
+        p = presence.get(user_id)
+        seen_at = _seen_at(p) if p is not None else None
+        if seen_at is None or now - seen_at >= max_age_s:
+            continue
+        (idle if p.is_idling else online).append(user_id)
+        if p.language:
+            languages[p.language] += 1
+    return {"online": online, "idle": idle, "top_languages": languages.most_common(5)}
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the group presence rollups")
+    parser.add_argument("--groups", type=int, default=10)
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--online", type=float, default=0.3, help="share of members with a recent status")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    db_file = "bench_groups.db"
+    for suffix in ("", "-wal", "-shm"):
+        (DATA_DIR / f"{db_file}{suffix}").unlink(missing_ok=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = Database(url=f"sqlite:///{Path(tmp) / 'users.db'}", token_cache_ttl_s=300)
+        groups = {f"group-{g}": [f"{g:04d}{m:012d}" for m in range(args.members)] for g in range(args.groups)}
+        users = [user_id for members in groups.values() for user_id in members]
+
+        token = "bench-token"
+        hashed = hash_token(token)  # once, hashing per user would take most of the setup time
+        with backend.engine.begin() as conn:
+            conn.execute(insert(User), [{"user_id": user_id, "auth_token": hashed, "created_at": DATETIME_NOW(), "status_data": {}} for user_id in users])
+        for user_id in users:
+            if rng.random() < args.online:
+                backend.update_status(user_id, token, {"language": rng.choice(LANGUAGES), "isIdling": rng.random() < 0.2})
+
+        presence = GroupPresence(db_file, refresh_s=3600, max_members=args.members, storage=backend)
+        try:
+            with presence.engine.begin() as conn:
+                conn.execute(insert(Group), [{"name": name, "invite_code": "bench", "created_at": DATETIME_NOW(), "version": 1} for name in groups])
+                conn.execute(insert(GroupMember), [
+                    {"group_name": name, "user_id": user_id, "joined_at": DATETIME_NOW()}
+                    for name, members in groups.items() for user_id in members
+                ])
+
+            start = time.perf_counter()
+            for name in groups:
+                presence.summary(name)
+            load_s = (time.perf_counter() - start) / len(groups)
+
+            name, members = next(iter(groups.items()))
+            rollup = presence.summary(name, member_ids=True)
+            naive = scan(backend, members, presence.max_age_s)
+            assert sorted(rollup["online"]) == sorted(naive["online"]) and sorted(rollup["idle"]) == sorted(naive["idle"])
+
+            summary_s = timed(lambda: presence.summary(name, member_ids=True), 2000)
+            scan_s = timed(lambda: scan(backend, members, presence.max_age_s), 50)
+
+            status = {"language": "python", "isIdling": False}
+            heartbeats = [rng.choice(members) for _ in range(20000)]
+            start = time.perf_counter()
+            for user_id in heartbeats:
+                presence.record(user_id, status)
+            member_us = (time.perf_counter() - start) / len(heartbeats) * 1e6
+            outsider_us = timed(lambda: presence.record("not-in-a-group", status), 20000) * 1e6
+
+            refresh_s = timed(presence.refresh, 3)
+        finally:
+            presence.close()
+            backend.close()
+            for suffix in ("", "-wal", "-shm"):
+                (DATA_DIR / f"{db_file}{suffix}").unlink(missing_ok=True)
+
+    print(f"{args.groups} groups x {args.members} members, {args.online:.0%} with a recent status")
+    print(f"/group-status     {summary_s * 1000:>8.3f} ms from the rollup, {scan_s * 1000:.1f} ms reading and classifying every member")
+    print(f"record()          {member_us:>8.2f} us per heartbeat of a member, {outsider_us:.2f} us for users in no loaded group")
+    print(f"first request     {load_s * 1000:>8.1f} ms to build a group's rollup")
+    print(f"refresh()         {refresh_s * 1000:>8.1f} ms for all {len(users)} members (background, every GROUP_REFRESH_S)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+/get-status throughput of each GUNICORN_PROFILE in app/gunicorn.conf.py, with concurrent pollers.
+
+Usage (from the repo root; the asgi profile needs uvicorn and a2wsgi):
+  python benchmarks/bench_gunicorn.py --clients 32 --seconds 5
+  python benchmarks/bench_gunicorn.py --profiles sync gthread --workers 4
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_asgi import request, start_server, throughput
+
+
+def run(profile: str, port: int, args: argparse.Namespace, database_url: str) -> None:
+    extra_env = {"GUNICORN_PROFILE": profile, "GUNICORN_BIND": f"127.0.0.1:{port}"}
+    if args.workers:
+        extra_env["GUNICORN_WORKERS"] = str(args.workers)
+
+    process = start_server([sys.executable, "-m", "gunicorn"], port, database_url, extra_env)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        user_id, token = f"bench{port}{int(time.time())}"[-16:], "bench-token"
+        request(f"{base}/register-user", {"userId": user_id}, token, "POST")
+        request(f"{base}/update-status", {"userId": user_id, "details": "Benchmarking", "language": "python"}, token, "POST")
+
+        throughput(base, user_id, args.clients, 1)  # warm up
+        rps, p99, failed = throughput(base, user_id, args.clients, args.seconds)
+        print(f"{profile:<10} {rps:>8.0f} req/s   p99 {p99:>7.1f} ms   failed {failed:>4}")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the gunicorn profiles")
+    parser.add_argument("--profiles", nargs="+", default=["sync", "gthread", "asgi"])
+    parser.add_argument("--workers", type=int, default=0, help="override the CPU-based worker count")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent /get-status pollers")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        for i, profile in enumerate(args.profiles):
+            run(profile, 5201 + i, args, database_url)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark for the heartbeat history (modules/utils/history_db.py): what record() adds to each
+/update-status, how fast the background writer stores batches (including the daily stats), how many
+bytes a heartbeat takes compared to a plain table with the strings repeated in every row, and how
+long /get-stats takes for one user over the whole period, from daily_stats vs from the raw heartbeats.
+
+Usage (from the repo root):
+  python benchmarks/bench_history.py
+  python benchmarks/bench_history.py --users 10 --days 365
+"""
+import argparse
+import random
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from modules.utils.history_db import DAY_S, HistoryDatabase, _credit  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def heartbeats(users: int, days: int, interval_s: int) -> list[tuple[str, float, dict]]:
+    """A few coding hours per user per day, one heartbeat every `interval_s`, switching files now and then."""
+    rng = random.Random(42)
+    start_day = int(time.time()) // DAY_S - days
+    result = []
+
+    for u in range(users):
+        user_id = f"{rng.randint(0, 10**16):016d}"
+        workspace = f"project-{rng.randint(0, 20)}"
+        for day in range(days):
+            ts = (start_day + day) * DAY_S + rng.randint(8, 12) * 3600
+            for _ in range(rng.randint(2, 4) * 3600 // interval_s):
+                ts += interval_s
+                if rng.random() < 0.05:
+                    workspace = f"project-{rng.randint(0, 20)}"
+                language = rng.choice(["python", "typescript", "rust", "markdown"])
+                result.append((user_id, ts, {
+                    "appName": "Visual Studio Code",
+                    "fileName": f"{rng.choice(['main', 'utils', 'index', 'test'])}_{rng.randint(0, 30)}.{language[:2]}",
+                    "gitBranch": rng.choice(["main", "dev", f"feature-{u}"]),
+                    "gitRepo": f"https://github.com/someone/{workspace}",
+                    "isIdling": rng.random() < 0.1,
+                    "language": language,
+                    "workspace": workspace,
+                }))
+    return result
+
+
+def plain_table_bytes(path: Path, rows: list[tuple[str, float, dict]]) -> int:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE heartbeats (id INTEGER PRIMARY KEY, user_id TEXT, ts INTEGER, language TEXT, workspace TEXT, git_repo TEXT, git_branch TEXT, file_name TEXT, is_idling INTEGER)")
+    conn.execute("CREATE INDEX ix_user_ts ON heartbeats (user_id, ts)")
+    conn.executemany("INSERT INTO heartbeats VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?)", [
+        (user_id, int(ts), s["language"], s["workspace"], s["gitRepo"], s["gitBranch"], s["fileName"], s["isIdling"])
+        for user_id, ts, s in rows
+    ])
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    return path.stat().st_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the heartbeat history")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--interval", type=int, default=30, help="seconds between heartbeats")
+    args = parser.parse_args()
+
+    rows = heartbeats(args.users, args.days, args.interval)
+    history_file = DATA_DIR / "bench_history.db"
+    plain_file = DATA_DIR / "bench_history_plain.db"
+    for path in (history_file, plain_file):
+        path.unlink(missing_ok=True)
+
+    try:
+        # huge interval/max_pending: nothing is written until flush() is called below
+        history = HistoryDatabase(history_file.name, flush_ms=3_600_000, retention_days=0, max_pending=len(rows) + 1)
+
+        start = time.perf_counter()
+        for user_id, ts, status in rows:
+            history.record(user_id, status, ts)
+        record_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        history.flush()
+        flush_s = time.perf_counter() - start
+
+        user_id = rows[0][0]
+        first_day, last_day = int(rows[0][1]) // DAY_S, int(rows[-1][1]) // DAY_S
+        start = time.perf_counter()
+        for _ in range(20):
+            stats = history.stats(user_id, first_day, last_day)
+        stats_s = (time.perf_counter() - start) / 20
+
+        # the same total the naive way: load every heartbeat of the period and replay it
+        start = time.perf_counter()
+        beats = history.heartbeats(user_id, first_day * DAY_S, (last_day + 1) * DAY_S)
+        seconds: dict = {}
+        for last, beat in zip(beats, beats[1:]):
+            _credit(seconds, 0, (last["timestamp"], 0, 0, 0, last["isIdling"]), beat["timestamp"])
+        scan_s = time.perf_counter() - start
+        assert sum(value for key, value in seconds.items() if key[2] == 0) == stats["total"]
+        history.close()
+
+        conn = sqlite3.connect(history_file)
+        conn.execute("VACUUM")
+        conn.close()
+        history_bytes = history_file.stat().st_size
+        plain_bytes = plain_table_bytes(plain_file, rows)
+    finally:
+        for path in (history_file, plain_file):
+            path.unlink(missing_ok=True)
+
+    print(f"{len(rows)} heartbeats ({args.users} users, {args.days} days, every {args.interval} s)")
+    print(f"record()          {record_s / len(rows) * 1e6:>8.2f} us per heartbeat (the only cost on the request path)")
+    print(f"background write  {len(rows) / flush_s:>8.0f} heartbeats/s")
+    print(f"history.db        {history_bytes / 1024:>8.0f} KiB   {history_bytes / len(rows):>5.1f} bytes/heartbeat")
+    print(f"plain table       {plain_bytes / 1024:>8.0f} KiB   {plain_bytes / len(rows):>5.1f} bytes/heartbeat")
+    print(f"stats, {last_day - first_day + 1} days    {stats_s * 1000:>8.2f} ms from daily_stats, {scan_s * 1000:.0f} ms replaying {len(beats)} heartbeats")
+
+
+if __name__ == "__main__":
+    main()
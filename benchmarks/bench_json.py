@@ -0,0 +1,62 @@
+"""
+Benchmark JSON encoding of the /get-status response with Flask's default provider
+and with FastJSONProvider (uses orjson when installed).
+
+Usage (from the repo root):
+  python benchmarks/bench_json.py
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from modules.utils import json_provider  # noqa: E402
+from modules.utils.json_provider import FastJSONProvider  # noqa: E402
+
+# same shape get_status.route builds
+PAYLOAD = {
+    "created_at": "2025-08-22T11:49:12.174000+00:00",
+    "last_updated": "2025-08-22T11:52:01.512000+00:00",
+    "status": {
+        "appName": "Visual Studio Code",
+        "details": "Editing blueprint_tools.py",
+        "fileName": "blueprint_tools.py",
+        "gitBranch": "master",
+        "gitRepo": "vscode-status-api",
+        "isDebugging": False,
+        "isIdling": False,
+        "language": "python",
+        "languageIcon": "https://raw.githubusercontent.com/PowerPCFan/vscode-status-api/refs/heads/master/assets/icons/python.png",
+        "timestamp": 1755863352174,
+        "workspace": "vscode-status-api",
+    },
+    "user_id": "8551517423728874",
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark JSON providers on the /get-status payload")
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {"stdlib (default)": DefaultJSONProvider(app), "FastJSONProvider": FastJSONProvider(app)}
+
+    with app.app_context():
+        outputs = {name: provider.response(PAYLOAD).get_data() for name, provider in providers.items()}
+        assert len(set(outputs.values())) == 1, "providers produced different bytes"
+
+        for name, provider in providers.items():
+            seconds = timeit.timeit(lambda: provider.response(PAYLOAD), number=args.number)
+            print(f"{name:<18} {seconds / args.number * 1e6:>6.2f} us/response")
+
+    if json_provider.orjson is None:
+        print("orjson is not installed, FastJSONProvider is using the stdlib fallback")
+
+
+if __name__ == "__main__":
+    main()
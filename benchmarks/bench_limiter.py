@@ -0,0 +1,92 @@
+"""
+Compares the rate limit storages: latency of one limiter hit, and accuracy when several
+worker processes share one limit (like gunicorn --workers N behind one IP).
+
+Usage (from the repo root):
+  python benchmarks/bench_limiter.py --workers 4
+memcached is included when it is reachable on localhost:11211.
+"""
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from limits import parse  # noqa: E402
+from limits.storage import storage_from_string  # noqa: E402
+from limits.strategies import STRATEGIES  # noqa: E402
+import modules.utils.limiter_storage  # noqa: E402,F401  (registers the sqlite:// scheme)
+
+
+def _limiter(uri: str, strategy: str):
+    return STRATEGIES[strategy](storage_from_string(uri))
+
+
+def latency(uri: str, strategy: str, hits: int) -> float:
+    limiter = _limiter(uri, strategy)
+    item = parse(f"{hits * 10} per minute")
+    key = uuid.uuid4().hex
+
+    start = time.perf_counter()
+    for _ in range(hits):
+        limiter.hit(item, key)
+    return (time.perf_counter() - start) / hits * 1e6
+
+
+def _worker(uri: str, strategy: str, limit: str, key: str, attempts: int, allowed) -> None:
+    limiter = _limiter(uri, strategy)  # every process gets its own storage instance, like a gunicorn worker
+    item = parse(limit)
+    count = sum(1 for _ in range(attempts) if limiter.hit(item, key))
+    with allowed.get_lock():
+        allowed.value += count
+
+
+def accuracy(uri: str, strategy: str, workers: int, limit: int) -> int:
+    allowed = multiprocessing.Value("i", 0)
+    key = uuid.uuid4().hex
+    processes = [
+        multiprocessing.Process(target=_worker, args=(uri, strategy, f"{limit} per minute", key, limit * 2, allowed))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return allowed.value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark rate limit storages")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--hits", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storages = [
+            ("memory", "memory://", "moving-window"),
+            ("sqlite", f"sqlite:///{Path(tmp) / 'rate_limits.db'}", "sliding-window-counter"),
+            ("sqlite", f"sqlite:///{Path(tmp) / 'rate_limits.db'}", "fixed-window"),
+        ]
+
+        try:
+            if storage_from_string("memcached://localhost:11211").check():
+                storages.insert(0, ("memcached", "memcached://localhost:11211", "fixed-window"))
+        except Exception:
+            pass
+        if storages[0][0] != "memcached":
+            print("memcached not reachable on localhost:11211, skipping it")
+
+        print(f"{'storage':<10} {'strategy':<24} {'us/hit':>8}   allowed with {args.workers} workers (limit {args.limit})")
+        for name, uri, strategy in storages:
+            us = latency(uri, strategy, args.hits)
+            allowed = accuracy(uri, strategy, args.workers, args.limit)
+            print(f"{name:<10} {strategy:<24} {us:>8.1f}   {allowed}")
+
+
+if __name__ == "__main__":
+    main()
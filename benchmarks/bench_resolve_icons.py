@@ -0,0 +1,78 @@
+"""
+Bulk icon resolution on a synthetic corpus (100k file names by default, with the repetition
+real history has): one language_image.get() call per file vs resolve_many(), and the
+POST /resolve-icons endpoint end to end (through Flask's test client).
+
+Usage (from the repo root):
+  python benchmarks/bench_resolve_icons.py --files 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+os.environ.setdefault("RATE_LIMITING", "false")
+
+from modules.utils import language_image  # noqa: E402
+
+STEMS = ["index", "main", "app", "utils", "test_api", "README", "config", "server", "Dockerfile", "webpack.config", "package"]
+
+
+def corpus(files: int, unique: int) -> list[tuple[str, str]]:
+    imgmap = json.loads(language_image.map_file.read_text(encoding="utf-8"))
+    languages = [entry["language"] for entry in imgmap["KNOWN_LANGUAGES"]] + [""] * 50  # many clients send no language
+    extensions = [pattern for pattern in imgmap["KNOWN_EXTENSIONS"] if not pattern.startswith("/")] + [".py", ".ts", ".md"]
+
+    rng = random.Random(42)
+    pool = []
+    for _ in range(unique):
+        extension = rng.choice(extensions)
+        file_name = extension if not extension.startswith(".") else f"{rng.choice(STEMS)}{rng.randint(0, 50)}{extension}"
+        pool.append((rng.choice(languages), file_name))
+    return [rng.choice(pool) for _ in range(files)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark bulk icon resolution")
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--unique", type=int, default=20_000, help="distinct (language, fileName) pairs in the corpus")
+    args = parser.parse_args()
+
+    queries = corpus(args.files, args.unique)
+    language_image.get("", "warmup.py", False)
+
+    start = time.perf_counter()
+    one_by_one = [language_image.get(language, file_name, False) for language, file_name in queries]
+    single_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bulk = list(language_image.resolve_many(queries))
+    bulk_s = time.perf_counter() - start
+    assert bulk == one_by_one
+
+    from main import create_app
+    from modules.utils import gv
+    client = create_app().test_client()
+    batch = min(10_000, gv.RESOLVE_ICONS_MAX_ITEMS)  # the endpoint caps each request, so the corpus is sent in batches
+
+    start = time.perf_counter()
+    lines = 0
+    for i in range(0, len(queries), batch):
+        body = {"files": [{"language": language, "fileName": file_name} for language, file_name in queries[i:i + batch]]}
+        response = client.post("/resolve-icons", data=json.dumps(body), content_type="application/json")
+        lines += response.get_data().count(b"\n")
+    http_s = time.perf_counter() - start
+    assert lines == len(queries)
+
+    print(f"{len(queries)} files, {len(set(queries))} distinct")
+    print(f"get() per file         {single_s * 1000:>8.0f} ms   {len(queries) / single_s:>10.0f} files/s")
+    print(f"resolve_many()         {bulk_s * 1000:>8.0f} ms   {len(queries) / bulk_s:>10.0f} files/s")
+    print(f"POST /resolve-icons    {http_s * 1000:>8.0f} ms   {len(queries) / http_s:>10.0f} files/s  (batches of {batch}, incl. JSON + streaming)")
+
+
+if __name__ == "__main__":
+    main()
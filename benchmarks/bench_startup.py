@@ -0,0 +1,76 @@
+"""
+Measures how long a fresh process takes to `import main` and to build the app (`main.app`, what every
+gunicorn master and test run pays), whether either touched disk (status DB or SQLite rate limiter file),
+and how long the first request then takes on a new database and on one that already exists.
+
+Usage (from the repo root):
+  python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+# runs inside the child process, prints one JSON line
+CHILD = """
+import json, os, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+files_after_import = os.listdir({tmp!r})
+app = main.app
+built = time.perf_counter()
+files_after_build = os.listdir({tmp!r})
+app.test_client().get("/check-if-user-exists?userId=bench")
+first_request = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "build_ms": (built - imported) * 1000,
+    "first_request_ms": (first_request - built) * 1000,
+    "touched_disk_on_import": bool(files_after_import),
+    "touched_disk_on_build": bool(files_after_build),
+}}))
+"""
+
+
+def run_once(tmp: Path) -> dict:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp / 'startup.db'}",
+        "RATE_LIMITING": "true",
+        "RATE_LIMIT_STORAGE": "sqlite",
+        "RATE_LIMIT_STORAGE_URI": f"sqlite:///{tmp / 'rate_limits.db'}",
+        "TELEMETRY_DISCORD_WEBHOOK_URL": "",
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(tmp=str(tmp))],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure app import and first request time")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    fresh, existing = [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            fresh.append(run_once(Path(tmp)))
+            existing.append(run_once(Path(tmp)))  # same files again, the schema is there now
+
+    print(f"import main                   median {statistics.median(r['import_ms'] for r in fresh):>8.1f} ms")
+    print(f"build the app (main.app)      median {statistics.median(r['build_ms'] for r in fresh):>8.1f} ms")
+    print(f"first request, new database   median {statistics.median(r['first_request_ms'] for r in fresh):>8.1f} ms")
+    print(f"first request, existing one   median {statistics.median(r['first_request_ms'] for r in existing):>8.1f} ms")
+    print(f"touched disk on import: {any(r['touched_disk_on_import'] for r in fresh)}, when building the app: {any(r['touched_disk_on_build'] for r in fresh)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Latency from a status change to its notification through the status bus (modules/utils/status_bus.py):
+  - in-process: two StatusBus instances on the same file (like two workers), publish on one and
+    time how long until a subscriber of the other sees the event, for a few poll intervals
+  - end to end: gunicorn with several workers, an SSE client on /stream-status and POST /update-status
+    sent to whichever worker takes it, timed until the event arrives on the stream
+
+Usage (from the repo root, the end-to-end part needs gunicorn):
+  python benchmarks/bench_status_bus.py --events 200 --workers 4
+"""
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from bench_asgi import request, start_server  # noqa: E402
+from modules.utils.status_bus import DATA_DIR, StatusBus  # noqa: E402
+
+
+def summary(latencies: list[float]) -> str:
+    ms = sorted(latency * 1000 for latency in latencies)
+    return f"median {statistics.median(ms):>6.1f} ms   p99 {ms[int(len(ms) * 0.99) - 1]:>6.1f} ms   max {ms[-1]:>6.1f} ms"
+
+
+def in_process(events: int, poll_ms: int) -> None:
+    db_file = "bench_status_bus.db"
+    for suffix in ("", "-wal", "-shm"):
+        (DATA_DIR / f"{db_file}{suffix}").unlink(missing_ok=True)
+
+    try:
+        publisher = StatusBus(db_file, poll_ms=poll_ms)
+        subscriber = StatusBus(db_file, poll_ms=poll_ms)
+        subscription = subscriber.subscribe("bench")
+
+        latencies: list[float] = []
+        received = 0
+        for i in range(events):
+            start = time.perf_counter()
+            publisher.publish("bench", {"details": f"Editing file_{i}.py"})
+            while True:
+                batch = subscription.wait(5)
+                if batch:
+                    break
+            latencies.append(time.perf_counter() - start)
+            received += len(batch)
+            subscription.advance(batch[-1].seq)
+            time.sleep(poll_ms / 1000 * 0.37)  # don't always publish right after a poll
+
+        subscriber.close()
+        assert received == events
+        print(f"in-process, poll {poll_ms:>3} ms   {summary(latencies)}")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            (DATA_DIR / f"{db_file}{suffix}").unlink(missing_ok=True)
+
+
+def end_to_end(events: int, workers: int, port: int) -> None:
+    extra_env = {
+        "STATUS_BUS_ENABLED": "true",
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_WORKERS": str(workers),
+        "GUNICORN_THREADS": "8",
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = start_server([sys.executable, "-m", "gunicorn"], port, f"sqlite:///{Path(tmp) / 'bench.db'}", extra_env)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            user_id, token = f"busbench{int(time.time())}"[-16:], "bench-token"
+            request(f"{base}/register-user", {"userId": user_id}, token, "POST")
+
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            conn.request("GET", f"/stream-status?userId={user_id}")
+            stream = conn.getresponse()
+
+            received = threading.Event()
+            arrivals: list[float] = []
+
+            def read() -> None:
+                try:
+                    for line in stream:
+                        if line.startswith(b"data:") and json.loads(line[5:]).get("status", {}).get("details", "").startswith("Bench"):
+                            arrivals.append(time.perf_counter())
+                            received.set()
+                except (OSError, AttributeError):
+                    pass  # connection closed at the end
+
+            threading.Thread(target=read, daemon=True).start()
+            time.sleep(0.5)
+
+            latencies: list[float] = []
+            for i in range(events):
+                received.clear()
+                start = time.perf_counter()
+                request(f"{base}/update-status", {"userId": user_id, "details": f"Bench {i}"}, token, "POST")
+                if not received.wait(5):
+                    raise RuntimeError(f"event {i} never arrived")
+                latencies.append(arrivals[-1] - start)
+
+            request(f"{base}/delete-user", {"userId": user_id}, token, "DELETE")
+            conn.close()
+            print(f"end to end, {workers} workers  {summary(latencies)}  (POST /update-status -> SSE event, default 50 ms poll)")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the status bus")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5301)
+    parser.add_argument("--skip-server", action="store_true", help="only run the in-process part")
+    args = parser.parse_args()
+
+    for poll_ms in (10, 50):
+        in_process(args.events, poll_ms)
+    if not args.skip_server:
+        end_to_end(args.events, args.workers, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compares the old status layout (one JSON blob per row) with the typed status columns:
+stored bytes per row and time to load + decode statuses.
+
+Usage (from the repo root):
+  python benchmarks/bench_status_layout.py --rows 20000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from sqlalchemy import JSON, String, create_engine, func, select, text  # noqa: E402
+from sqlalchemy.orm import DeclarativeBase, Mapped, MappedColumn, sessionmaker  # noqa: E402
+from modules.utils.database import Base, User, STATUS_COLUMNS, STATUS_SELECT, pack_status, unpack_status  # noqa: E402
+
+
+class LegacyBase(DeclarativeBase):
+    pass
+
+
+class LegacyUser(LegacyBase):
+    __tablename__ = "users"
+
+    user_id: Mapped[str] = MappedColumn(String(32), primary_key=True)
+    auth_token: Mapped[str] = MappedColumn(String(128), nullable=False)
+    created_at: Mapped[str] = MappedColumn(String)
+    last_updated: Mapped[str | None] = MappedColumn(String, nullable=True)
+    status_data: Mapped[dict[str, Any]] = MappedColumn(JSON)
+
+
+def sample_status(i: int) -> dict[str, Any]:
+    return {
+        "appName": "Visual Studio Code",
+        "details": f"Editing module_{i}.py",
+        "fileName": f"module_{i}.py",
+        "gitBranch": "master",
+        "gitRepo": "vscode-status-api",
+        "isDebugging": False,
+        "isIdling": i % 5 == 0,
+        "language": "python",
+        "timestamp": 1755863352174 + i,
+        "workspace": "vscode-status-api",
+    }
+
+
+def build(path: Path, rows: int, legacy: bool) -> sessionmaker:
+    engine = create_engine(f"sqlite:///{path}")
+    (LegacyBase if legacy else Base).metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as session:
+        for i in range(rows):
+            common = dict(user_id=f"{i:016d}", auth_token="token", created_at="2025-01-01T00:00:00+00:00", last_updated="2025-01-01T00:00:00+00:00")
+            if legacy:
+                session.add(LegacyUser(**common, status_data=sample_status(i)))
+            else:
+                columns, overflow = pack_status(sample_status(i))
+                session.add(User(**common, **columns, status_data=overflow))
+        session.commit()
+
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+
+    return Session
+
+
+def status_bytes(Session: sessionmaker, legacy: bool) -> float:
+    if legacy:
+        expr = func.length(LegacyUser.status_data)
+        model = LegacyUser
+    else:
+        columns = [getattr(User, column) for column, _ in STATUS_COLUMNS.values()]
+        expr = sum((func.coalesce(func.length(column), 0) for column in columns), func.length(User.status_data))
+        model = User
+
+    with Session() as session:
+        return session.execute(select(func.avg(expr)).select_from(model)).scalar_one()
+
+
+def decode_time(Session: sessionmaker, legacy: bool) -> float:
+    # same read path get_status uses: a plain column select, not the ORM object
+    start = time.perf_counter()
+    with Session() as session:
+        if legacy:
+            decoded = list(session.execute(select(LegacyUser.status_data)).scalars())
+        else:
+            decoded = [unpack_status(row) for row in session.execute(select(*STATUS_SELECT))]
+    elapsed = time.perf_counter() - start
+    assert len(decoded) > 0
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the status storage layout")
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for legacy in (True, False):
+            label = "json blob" if legacy else "typed columns"
+            path = Path(tmp) / f"{'legacy' if legacy else 'columns'}.db"
+            Session = build(path, args.rows, legacy)
+            per_row = status_bytes(Session, legacy)
+            seconds = min(decode_time(Session, legacy) for _ in range(3))
+            print(f"{label:<14} status bytes/row {per_row:>6.1f}   file {path.stat().st_size / 1024:>8.0f} KiB   load+decode {seconds * 1e6 / args.rows:>6.2f} us/row")
+
+
+if __name__ == "__main__":
+    main()
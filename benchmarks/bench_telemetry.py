@@ -0,0 +1,106 @@
+"""
+Benchmark for the telemetry query API (modules/utils/telemetry_stats.py): how long the rollup into the
+bucket tables takes (catching up on months of rows once, then every few seconds of new ones), and how long
+a query over the last 30/90 days takes from the bucket tables vs grouping the raw telemetry rows, with
+and without the (timestamp, endpoint) index.
+
+Usage (from the repo root):
+  python benchmarks/bench_telemetry.py
+  python benchmarks/bench_telemetry.py --days 180 --rows 5000000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from sqlalchemy import case, desc, func, insert, select, text  # noqa: E402
+from modules.utils import telemetry_stats  # noqa: E402
+from modules.utils.telemetry_db import Database, Telemetry  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+ENDPOINTS = ["/get-status"] * 12 + ["/update-status"] * 6 + ["/", "/check-if-user-exists", "/register-user", "/delete-user", "/icons/python.png", "/get-stats"]
+
+
+def fill(database: Database, rows: int, days: int, now: int) -> None:
+    rng = random.Random(42)
+    ips = [f"203.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(5000)]
+    batch = []
+    with database.engine.begin() as conn:
+        for _ in range(rows):
+            status = 500 if rng.random() < 0.002 else 404 if rng.random() < 0.05 else 200
+            batch.append({"ip": rng.choice(ips), "endpoint": rng.choice(ENDPOINTS), "method": "GET", "status": status, "timestamp": now - rng.randint(0, days * 86400)})
+            if len(batch) == 100_000:
+                conn.execute(insert(Telemetry), batch)
+                batch.clear()
+        if batch:
+            conn.execute(insert(Telemetry), batch)
+
+
+def raw_query(database: Database, start: int, end: int, top: int) -> None:
+    """The same numbers (hourly series, top endpoints and IPs) straight from the telemetry table."""
+    in_range = (Telemetry.timestamp >= start) & (Telemetry.timestamp < end)
+    with database.engine.connect() as conn:
+        bucket = Telemetry.timestamp - Telemetry.timestamp % 3600
+        conn.execute(select(bucket, func.count(), func.sum(case((Telemetry.status >= 500, 1), else_=0))).where(in_range).group_by(bucket)).all()
+        conn.execute(select(Telemetry.endpoint, func.count()).where(in_range).group_by(Telemetry.endpoint).order_by(desc(func.count())).limit(top)).all()
+        conn.execute(select(Telemetry.ip, func.count()).where(in_range).group_by(Telemetry.ip).order_by(desc(func.count())).limit(top)).all()
+
+
+def timed(fn, repeat: int = 3) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the telemetry query API")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    db_file = DATA_DIR / "bench_telemetry.db"
+    db_file.unlink(missing_ok=True)
+    now = int(time.time())
+
+    try:
+        database = Database(db_file.name)
+        fill(database, args.rows, args.days, now)
+
+        start = time.perf_counter()
+        telemetry_stats.rollup(database)
+        catch_up_s = time.perf_counter() - start
+
+        fill(database, 1000, 0, now)  # a few seconds' worth of new requests
+        start = time.perf_counter()
+        telemetry_stats.rollup(database)
+        incremental_ms = (time.perf_counter() - start) * 1000
+
+        results = []
+        for days in (30, args.days):
+            since = now - days * 86400
+            aggregate_s = timed(lambda: telemetry_stats.query(since, now, "hour", args.top, database))
+            indexed_s = timed(lambda: raw_query(database, since, now, args.top), 1)
+            results.append((days, aggregate_s, indexed_s))
+
+        with database.engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_telemetry_timestamp_endpoint"))
+        for i, (days, aggregate_s, indexed_s) in enumerate(results):
+            since = now - days * 86400
+            results[i] = (days, aggregate_s, indexed_s, timed(lambda: raw_query(database, since, now, args.top), 1))
+        database.engine.dispose()
+    finally:
+        db_file.unlink(missing_ok=True)
+
+    print(f"{args.rows} requests over {args.days} days")
+    print(f"rollup            {catch_up_s:>8.1f} s to catch up on all of them ({args.rows / catch_up_s:.0f} rows/s), {incremental_ms:.1f} ms for 1000 new ones")
+    for days, aggregate_s, indexed_s, scan_s in results:
+        print(f"last {days:>3} days     {aggregate_s * 1000:>8.1f} ms from the bucket tables, {indexed_s * 1000:.0f} ms from raw rows with the (timestamp, endpoint) index, {scan_s * 1000:.0f} ms without")
+
+
+if __name__ == "__main__":
+    main()
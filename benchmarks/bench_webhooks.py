@@ -0,0 +1,113 @@
+"""
+Benchmark for the status-change webhooks (modules/utils/status_webhooks.py): what status_changed()
+adds to /update-status (unchanged status vs queued delivery), and how fast the dispatcher empties
+the queue into local HTTP receivers, with batching, the per-target concurrency limit and a receiver
+that fails every other request (so the retries with backoff show up too).
+
+Usage (from the repo root):
+  python benchmarks/bench_webhooks.py
+  python benchmarks/bench_webhooks.py --users 200 --changes 20 --per-target 4
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from modules.utils import status_webhooks  # noqa: E402
+from modules.utils.status_webhooks import DATA_DIR, WebhookQueue  # noqa: E402
+
+
+class Receiver:
+    """Local webhook target counting requests, events and the most requests it had in flight at once."""
+
+    def __init__(self, flaky: bool = False, delay_s: float = 0.005):
+        self.requests = self.events = self.inflight = self.max_inflight = 0
+        self.lock = threading.Lock()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with receiver.lock:
+                    receiver.requests += 1
+                    receiver.inflight += 1
+                    receiver.max_inflight = max(receiver.max_inflight, receiver.inflight)
+                    fail = flaky and receiver.requests % 2 == 0
+                time.sleep(delay_s)  # a receiver that does some work
+                with receiver.lock:
+                    receiver.inflight -= 1
+                    if not fail:
+                        receiver.events += len(json.loads(body)["events"])
+                self.send_response(500 if fail else 204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the status-change webhooks")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--changes", type=int, default=20, help="status changes per user")
+    parser.add_argument("--per-target", type=int, default=2)
+    args = parser.parse_args()
+
+    db_file = "bench_webhooks.db"
+    for suffix in ("", "-wal", "-shm"):
+        (DATA_DIR / f"{db_file}{suffix}").unlink(missing_ok=True)
+
+    status_webhooks.BACKOFF_BASE_S = 0.05  # retries within the benchmark instead of after seconds
+    receivers = [Receiver(), Receiver(), Receiver(flaky=True)]
+    queue = WebhookQueue(db_file, poll_ms=10, max_attempts=20, per_target=args.per_target, max_per_user=5, allow_private=True)
+
+    try:
+        users = [f"{i:016d}" for i in range(args.users)]
+        for i, user_id in enumerate(users):
+            queue.register(user_id, receivers[i % len(receivers)].url)
+
+        # the same status again and again: the common heartbeat case
+        start = time.perf_counter()
+        queue.status_changed(users[0], {"details": "same"})
+        for _ in range(10_000):
+            queue.status_changed(users[0], {"details": "same"})
+        unchanged_us = (time.perf_counter() - start) / 10_000 * 1e6
+
+        total = args.users * args.changes
+        start = time.perf_counter()
+        for change in range(args.changes):
+            for user_id in users:
+                queue.status_changed(user_id, {"details": f"Editing file_{change}.py"})
+        changed_us = (time.perf_counter() - start) / total * 1e6
+        queued = queue.pending()
+
+        start = time.perf_counter()
+        queue.start()
+        expected = queued
+        while sum(r.events for r in receivers) < expected and time.perf_counter() - start < 120:
+            time.sleep(0.01)
+        deliver_s = time.perf_counter() - start
+        delivered = sum(r.events for r in receivers)
+        left = queue.pending()
+        queue.close()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            (DATA_DIR / f"{db_file}{suffix}").unlink(missing_ok=True)
+
+    posts = sum(r.requests for r in receivers)
+    print(f"{args.users} users with a webhook, {args.changes} status changes each, {len(receivers)} receivers (one fails every other request)")
+    print(f"status_changed()  {unchanged_us:>8.2f} us unchanged status, {changed_us:.0f} us when it queues a delivery")
+    print(f"delivered         {delivered:>8} of {queued} events in {deliver_s:.2f} s ({delivered / deliver_s:.0f} events/s), {left} left in the queue")
+    print(f"requests          {posts:>8} POSTs ({delivered / max(posts, 1):.1f} events per POST), max in flight per receiver {[r.max_inflight for r in receivers]} (limit {args.per_target})")
+
+
+if __name__ == "__main__":
+    main()
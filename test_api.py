@@ -1,10 +1,17 @@
 import requests
 import json
 import time
+import hmac
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
 import random
 import sqlite3
 import argparse
+import os
+import subprocess
 import sys
+import tempfile
 from pathlib import Path
 from typing import Dict, Any, Tuple, Optional
 
@@ -13,11 +20,22 @@ Comprehensive test suite for VSCode Status API
 
 This test suite covers all API endpoints with various scenarios:
 - Health check
-- User registration (success, errors)
-- Status updates (success, authentication, validation errors)
-- Status retrieval (success, not found, validation errors)  
+- Lazy startup (importing the app from this checkout creates no files or threads before the first request)
+- User registration (success, errors, unknown before and found right after)
+- Status updates (success, authentication, validation errors, oversized bodies, unchanged status not rewritten)
+- Storage backend (a user's whole lifecycle, kept where the server's DATABASE_BACKEND keeps users)
+- Token storage (hashed at rest, old plaintext tokens rehashed on use; needs the local SQLite file)
+- Status retrieval (success, not found, validation errors, an update read back from every worker, field types kept, JSON bodies as the default encoder writes them)
+- Icons (ETag revalidation, immutable ?v= URLs, unknown icons, bulk /resolve-icons, size variants and iconSize, .map.json reloaded without a restart; needs the local map)
+- Heartbeat history and /get-stats (time between heartbeats counted, ranges, errors)
 - User existence checks
-- User deletion (success, errors)
+- Status streaming over server-sent events (/stream-status)
+- Status-change webhooks (delivered to a local HTTP receiver)
+- Group presence (join, /group-status, leave)
+- Admin telemetry query and route metrics (need --admin-token)
+- Client IP from X-Forwarded-For only for the server's TRUSTED_PROXY_HOPS (needs --admin-token)
+- User deletion (success, errors, old token rejected after registering the same ID again)
+- Rate limiting, with whichever limiter storage the server uses (misses cost more than normal requests)
 
 The tests create a new user during the test run to ensure proper authentication
 and avoid conflicts with existing users that may have different tokens.
@@ -31,6 +49,10 @@ Test Notes:
 
 # Configuration
 BASE_URL = "http://localhost:5000"
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # the server's ADMIN_TOKEN, the admin tests are skipped without it
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))  # the server's TRUSTED_PROXY_HOPS
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "sqlite").lower()  # the server's DATABASE_BACKEND
+ICON_MAP_RELOAD_S = float(os.getenv("ICON_MAP_RELOAD_S", "5"))  # the server's ICON_MAP_RELOAD_S
 
 # Generate random IDs and tokens for each test run to avoid conflicts
 TEST_USER_ID_EXISTING = str(random.randint(1000000000000000, 9999999999999999))  # For testing existing user scenarios
@@ -78,12 +100,12 @@ def make_request(method: str, endpoint: str, data: Optional[Dict[Any, Any]] = No
             raise ValueError(f"Unsupported HTTP method: {method}")
             
         return response.status_code, response.json() if response.text else {}
+    except json.JSONDecodeError as e:
+        print(f"JSON decode error: {e}")
+        return response.status_code if response is not None else 0, {"raw_response": response.text if response is not None else "No response"}
     except requests.exceptions.RequestException as e:
         print(f"Request failed: {e}")
         return 0, {"error": str(e)}
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        return response.status_code if response else 0, {"raw_response": response.text if response else "No response"}
 
 def is_rate_limited(status_code: int, response: Dict[Any, Any]) -> bool:
     """Check if the response indicates rate limiting"""
@@ -152,10 +174,93 @@ def test_health_check():
     log_test_result("health_check", success, f"Expected 200 with message 'OK', got {status_code}")
     return success
 
+# =============================================================================
+# STARTUP TESTS
+# =============================================================================
+
+# runs in a fresh process from app/, prints one JSON line
+STARTUP_CHILD = """
+import json, os, threading
+import main
+after_import = (os.listdir({tmp!r}), threading.active_count())
+app = main.app
+after_build = (os.listdir({tmp!r}), threading.active_count())
+from modules.utils import database, language_image, telemetry_db
+untouched = database._db is None and telemetry_db._db is None and language_image._resolver is None
+status_code = app.test_client().get("/check-if-user-exists?userId={user_id}").status_code
+print(json.dumps({{"after_import": after_import, "after_build": after_build, "untouched": untouched,
+                  "status_code": status_code, "after_request": os.listdir({tmp!r})}}))
+"""
+
+def test_lazy_startup():
+    """Test that importing main and building the app creates no files and starts no threads, the first request does"""
+    print("\n=== Testing Lazy Startup ===")
+
+    #* imports the app from this checkout, like benchmarks/bench_startup.py
+    app_dir = script_dir / "app"
+    if not (app_dir / "main.py").exists():
+        print("Result: SKIPPED (no app/ next to this script)")
+        log_test_result("lazy_startup", True, "Skipped, no local app")
+        return True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_BACKEND": "sqlite",
+            "DATABASE_URL": f"sqlite:///{Path(tmp) / 'startup.db'}",
+            "RATE_LIMITING": "true",
+            "RATE_LIMIT_STORAGE": "sqlite",
+            "RATE_LIMIT_STORAGE_URI": f"sqlite:///{Path(tmp) / 'rate_limits.db'}",
+            "TELEMETRY_DISCORD_WEBHOOK_URL": "",
+        }
+        try:
+            output = subprocess.run(
+                [sys.executable, "-c", STARTUP_CHILD.format(tmp=tmp, user_id=TEST_USER_ID_RANDOM)],
+                cwd=app_dir, env=env, capture_output=True, text=True, timeout=60,
+            )
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+        except (subprocess.SubprocessError, json.JSONDecodeError, IndexError) as e:
+            print(f"Startup failed: {e}")
+            log_test_result("lazy_startup", False, f"Startup failed: {e}")
+            return False
+
+    print(f"Files/Threads After Import: {result['after_import']}")
+    print(f"Files/Threads After Building The App: {result['after_build']}")
+    print(f"Databases And Icon Map Untouched: {result['untouched']}")
+    print(f"First Request: {result['status_code']}, Files After: {sorted(result['after_request'])}")
+    success = (
+        result['after_import'] == [[], 1]
+        and result['after_build'] == [[], 1]
+        and result['untouched']
+        and result['status_code'] == 404
+        and 'startup.db' in result['after_request']
+    )
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("lazy_startup", success, "Expected no files or threads until the first request, and the database created by it")
+    return success
+
 # =============================================================================
 # REGISTER USER TESTS
 # =============================================================================
 
+def test_unknown_user_before_register():
+    """Test that the user about to be registered is unknown first, so the later tests see the negative cache invalidated"""
+    print("\n=== Testing Unknown User Before Register ===")
+
+    # looked up several times so every worker has seen the miss, the repeats are answered from the negative cache
+    # when NEGATIVE_CACHE_TTL_S is set (the read-back tests after registering then fail if it's stale on any worker)
+    codes = [make_request('GET', '/get-status', params={"userId": REGISTERED_USER_ID})[0] for _ in range(8)]
+    status_code, response = make_request('GET', '/check-if-user-exists', params={"userId": REGISTERED_USER_ID})
+
+    print(f"Get Status Codes: {codes}")
+    print(f"Exists Response: {response}")
+    success = codes == [404] * 8 and status_code == 404 and response.get('exists') is False
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("unknown_user_before_register", success, "Expected 404 and exists=False before registering")
+    return success
+
 def test_register_user_success():
     """Test successful user registration"""
     print("\n=== Testing Register User (Success) ===")
@@ -316,6 +421,56 @@ def test_update_status_success():
     log_test_result("update_status_success", success, f"Expected 200 for successful update, got {status_code}")
     return success
 
+def test_tokens_hashed_at_rest():
+    """Test that tokens are stored hashed, and that a plaintext token from before hashing is rehashed on first use"""
+    print("\n=== Testing Tokens Hashed At Rest ===")
+
+    #* only works when the server uses the local SQLite file (data/user_statuses.db)
+    if not DB_FILE.exists():
+        print("Result: SKIPPED (no local database file)")
+        log_test_result("tokens_hashed_at_rest", True, "Skipped, no local database")
+        return True
+
+    conn = sqlite3.connect(DB_FILE, timeout=5)
+    try:
+        row = conn.execute("SELECT auth_token FROM users WHERE user_id = ?", (REGISTERED_USER_ID,)).fetchone()
+        if row is None:
+            print("Result: SKIPPED (the server doesn't use the local database file)")
+            log_test_result("tokens_hashed_at_rest", True, "Skipped, server uses another database")
+            return True
+
+        hashed = row[0] != REGISTERED_USER_TOKEN and row[0].startswith("sha256$")
+
+        # a user as an old version stored them, with the token in plaintext
+        legacy_user_id = str(random.randint(1000000000000000, 9999999999999999))
+        legacy_token = f"legacy-token-{random.randint(100000, 999999)}"
+        with conn:
+            conn.execute(
+                "INSERT INTO users (user_id, auth_token, created_at, status_data) VALUES (?, ?, ?, '{}')",
+                (legacy_user_id, legacy_token, "2024-01-01T00:00:00+00:00"),
+            )
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {legacy_token}"
+        }
+        status_code, _ = make_request('POST', '/update-status', {"userId": legacy_user_id, "language": "python"}, headers)
+        stored = conn.execute("SELECT auth_token FROM users WHERE user_id = ?", (legacy_user_id,)).fetchone()[0]
+
+        with conn:
+            conn.execute("DELETE FROM users WHERE user_id = ?", (legacy_user_id,))
+    finally:
+        conn.close()
+
+    print(f"Registered Token Hashed: {hashed}")
+    print(f"Legacy Update Status Code: {status_code}")
+    print(f"Legacy Token Now: {stored[:7]}...")
+    success = hashed and status_code == 200 and stored.startswith("sha256$")
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("tokens_hashed_at_rest", success, "Expected hashed tokens, and the plaintext one accepted and rehashed")
+    return success
+
 def test_update_status_user_not_found():
     """Test status update for non-existent user"""
     print("\n=== Testing Update Status (User Not Found) ===")
@@ -430,6 +585,35 @@ def test_update_status_no_auth():
     log_test_result("update_status_no_auth", success, f"Expected 401 for missing auth, got {status_code}")
     return success
 
+def test_update_status_invalid_body():
+    """Test that oversized bodies get 413 and fields of the wrong type or length get 400"""
+    print("\n=== Testing Update Status (Invalid Body) ===")
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {REGISTERED_USER_TOKEN}"
+    }
+
+    # well above MAX_REQUEST_BYTES (16 KiB by default)
+    too_large, _ = make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, "details": "x" * 1_000_000}, headers)
+
+    # the same without a Content-Length (chunked), it has to be cut off while reading instead
+    body = json.dumps({"userId": REGISTERED_USER_ID, "details": "x" * 1_000_000}).encode()
+    try:
+        chunked = requests.post(f"{BASE_URL}/update-status", data=(body[i:i + 65536] for i in range(0, len(body), 65536)), headers=headers, timeout=10).status_code
+    except requests.exceptions.ConnectionError:
+        chunked = 413  # the server may close the connection right after answering, before the body is sent
+    wrong_type, response = make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, "isIdling": "yes"}, headers)
+    too_long, _ = make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, "language": "x" * 1000}, headers)
+
+    print(f"Status Codes: too large {too_large}, chunked {chunked}, wrong type {wrong_type}, too long {too_long}")
+    print(f"Wrong Type Response: {response}")
+    success = too_large == 413 and chunked == 413 and wrong_type == 400 and too_long == 400
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("update_status_invalid_body", success, f"Expected 413/413/400/400, got {too_large}/{chunked}/{wrong_type}/{too_long}")
+    return success
+
 # =============================================================================
 # GET STATUS TESTS
 # =============================================================================
@@ -488,6 +672,865 @@ def test_get_status_no_userid():
     log_test_result("get_status_no_userid", success, f"Expected 400 for missing userId, got {status_code}")
     return success
 
+def settled_status(user_id: str, details: Optional[str] = None, reads: int = 8, timeout: float = 5) -> Tuple[int, Dict[Any, Any]]:
+    """
+    /get-status once every worker agrees: `reads` requests in a row with the same details and last_updated
+    (and the expected details, if given). With STATUS_COALESCE_MS only the worker that took an update has it
+    until the flush, so a single read could come from any of them. Gives up after `timeout` seconds,
+    or right away with the 429 response once /get-status is rate limited.
+    """
+    deadline = time.time() + timeout
+    while True:
+        results = [make_request('GET', '/get-status', params={"userId": user_id}) for _ in range(reads)]
+        limited = next((result for result in results if is_rate_limited(*result)), None)
+        if limited is not None:
+            return limited
+        seen = {(code, response.get('status', {}).get('details'), response.get('last_updated')) for code, response in results}
+        if len(seen) == 1 and (details is None or results[0][1].get('status', {}).get('details') == details):
+            return results[0]
+        if time.time() >= deadline:
+            print(f"Workers still disagree: {sorted(seen, key=str)}")
+            return results[-1]
+        time.sleep(0.1)
+
+def test_get_status_read_back():
+    """Test that /get-status returns an update on every worker, within STATUS_COALESCE_MS when updates are buffered"""
+    print("\n=== Testing Get Status (Read Back Update) ===")
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {REGISTERED_USER_TOKEN}"
+    }
+    details = f"Read back test {random.randint(100000, 999999)}"
+
+    status_code, _ = make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, "details": details, "language": "python"}, headers)
+    update_ok = status_code == 200
+
+    status_code, response = settled_status(REGISTERED_USER_ID, details)
+    if is_rate_limited(status_code, response):
+        print("Result: SKIPPED (/get-status is rate limited)")
+        log_test_result("get_status_read_back", True)
+        return True
+    success = update_ok and status_code == 200 and response.get('status', {}).get('details') == details
+
+    print(f"Status Code: {status_code}")
+    print(f"Status: {response.get('status')}")
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+
+    log_test_result("get_status_read_back", success, "Expected the status that was just sent")
+    return success
+
+def test_unchanged_status_keeps_last_updated():
+    """Test that resending the same status doesn't move last_updated (it's only bumped every STATUS_TOUCH_INTERVAL_S)"""
+    print("\n=== Testing Unchanged Status (last_updated) ===")
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {REGISTERED_USER_TOKEN}"
+    }
+    data = {"userId": REGISTERED_USER_ID, "details": f"Unchanged test {random.randint(100000, 999999)}", "language": "python"}
+
+    # both reads wait until every worker agrees, otherwise one buffered on another worker could be compared
+    make_request('POST', '/update-status', data, headers)
+    first_code, first = settled_status(REGISTERED_USER_ID, data["details"])
+
+    time.sleep(1.1)  # so a rewrite would get a visibly different timestamp
+    status_code, _ = make_request('POST', '/update-status', data, headers)
+    second_code, second = settled_status(REGISTERED_USER_ID, data["details"])
+    if is_rate_limited(first_code, first) or is_rate_limited(second_code, second):
+        print("Result: SKIPPED (/get-status is rate limited)")
+        log_test_result("unchanged_status_keeps_last_updated", True)
+        return True
+
+    print(f"Status Code: {status_code}")
+    print(f"last_updated: {first.get('last_updated')} -> {second.get('last_updated')}")
+    success = status_code == 200 and bool(first.get('last_updated')) and first.get('last_updated') == second.get('last_updated')
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("unchanged_status_keeps_last_updated", success, "Expected the same last_updated after resending the same status")
+    return success
+
+def test_status_field_types():
+    """Test that every known status field comes back with the type it was sent as, and unknown fields are kept in the overflow"""
+    print("\n=== Testing Status Field Types ===")
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {REGISTERED_USER_TOKEN}"
+    }
+    # False and True in the two boolean fields, so neither a missing column nor a 0/1 integer passes
+    status = {
+        "appName": "Visual Studio Code",
+        "details": f"Field types test {random.randint(100000, 999999)}",
+        "fileName": "main.rs",
+        "gitBranch": "feature/typed-columns",
+        "gitRepo": "vscode-status-api",
+        "isDebugging": False,
+        "isIdling": True,
+        "language": "rust",
+        "timestamp": int(time.time() * 1000),
+        "workspace": "test-workspace",
+    }
+    extra = {"languageIcon": "https://example.com/rust.png", "editorTheme": "Dark+"}
+
+    update_code, _ = make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, **status, **extra}, headers)
+    status_code, response = settled_status(REGISTERED_USER_ID, status["details"])
+    if is_rate_limited(status_code, response):
+        print("Result: SKIPPED (/get-status is rate limited)")
+        log_test_result("status_field_types", True)
+        return True
+
+    returned = response.get('status', {})
+    mismatched = [key for key, value in status.items() if returned.get(key) != value or type(returned.get(key)) is not type(value)]
+
+    # with the local SQLite file, the known fields have to be in their typed columns and only the rest in status_data
+    row = None
+    if DB_FILE.exists():
+        conn = sqlite3.connect(DB_FILE, timeout=5)
+        try:
+            deadline = time.time() + 5  # with STATUS_COALESCE_MS the row is written at the next flush
+            while True:
+                row = conn.execute(
+                    "SELECT details, is_debugging, is_idling, language, status_timestamp, status_data FROM users WHERE user_id = ?",
+                    (REGISTERED_USER_ID,),
+                ).fetchone()
+                if row is None or row[0] == status["details"] or time.time() >= deadline:
+                    break
+                time.sleep(0.1)
+        finally:
+            conn.close()
+
+    print(f"Status Code: {status_code}")
+    print(f"Mismatched Fields: {mismatched}")
+    print(f"Stored Row: {row}")
+    success = (
+        update_code == 200
+        and status_code == 200
+        and not mismatched
+        and (row is None or row[1:5] == (0, 1, "rust", status["timestamp"]) and json.loads(row[5]) == extra)
+    )
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("status_field_types", success, "Expected every field back with its type, and only unknown fields in status_data")
+    return success
+
+def test_json_responses():
+    """Test that /get-status bodies are exactly what Flask's default JSON provider writes, whichever encoder the server uses"""
+    print("\n=== Testing JSON Responses ===")
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {REGISTERED_USER_TOKEN}"
+    }
+    # plain ASCII, then the two cases a faster encoder would write differently: non-ASCII text and floats
+    cases = [
+        {"details": f"JSON test {random.randint(100000, 999999)}", "timestamp": int(time.time() * 1000)},
+        {"details": f"Édition ✓ 日本語 🐍 {random.randint(100000, 999999)}", "timestamp": int(time.time() * 1000)},
+        {"details": f"JSON float test {random.randint(100000, 999999)}", "timestamp": time.time() * 1000 + 0.25},
+    ]
+
+    failures = []
+    for case in cases:
+        make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, "language": "python", **case}, headers)
+        status_code, response = settled_status(REGISTERED_USER_ID, case["details"])
+        if is_rate_limited(status_code, response):
+            print("Result: SKIPPED (/get-status is rate limited)")
+            log_test_result("json_responses", True)
+            return True
+
+        try:
+            raw = requests.get(f"{BASE_URL}/get-status", params={"userId": REGISTERED_USER_ID})
+            parsed = raw.json()
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            failures.append(f"{case['details']}: {e}")
+            continue
+
+        # sorted keys, compact separators, \u escapes for non-ASCII and a trailing newline
+        expected = json.dumps(parsed, sort_keys=True, separators=(",", ":")) + "\n"
+        if (
+            raw.status_code != 200
+            or raw.headers.get('Content-Type') != 'application/json'
+            or raw.text != expected
+            or parsed.get('status', {}).get('details') != case["details"]
+            or parsed.get('status', {}).get('timestamp') != case["timestamp"]
+        ):
+            failures.append(f"{raw.status_code} {raw.headers.get('Content-Type')} {raw.text!r}")
+
+    print(f"Failures: {failures}")
+    success = not failures
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("json_responses", success, f"Expected bodies identical to the default JSON provider's, got {failures}")
+    return success
+
+# =============================================================================
+# STORAGE BACKEND TESTS
+# =============================================================================
+
+def test_storage_backend():
+    """Test a user's whole lifecycle through the server's DATABASE_BACKEND, and that the configured backend is the one holding it"""
+    print("\n=== Testing Storage Backend ===")
+
+    user_id = str(random.randint(1000000000000000, 9999999999999999))
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {TEST_AUTH_TOKEN}"
+    }
+    details = f"Storage backend test {random.randint(100000, 999999)}"
+
+    register_code, response = make_request('POST', '/register-user', {"userId": user_id}, headers)
+    if is_rate_limited(register_code, response):
+        print("Result: SKIPPED (registration is rate limited)")
+        log_test_result("storage_backend", True)
+        return True
+
+    # asked several times, so with several workers each one has to find the user in the shared store
+    exists_codes = [make_request('GET', '/check-if-user-exists', params={"userId": user_id})[0] for _ in range(8)]
+    update_code, _ = make_request('POST', '/update-status', {"userId": user_id, "details": details, "language": "python"}, headers)
+    get_code, response = settled_status(user_id, details)
+    read_back = is_rate_limited(get_code, response) or (get_code == 200 and response.get('status', {}).get('details') == details)
+
+    # sqlite keeps users in data/user_statuses.db, postgresql and memory never write them there
+    in_file = None
+    if DB_FILE.exists():
+        conn = sqlite3.connect(DB_FILE, timeout=5)
+        try:
+            in_file = conn.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    delete_code, _ = make_request('DELETE', '/delete-user', {"userId": user_id}, headers)
+    gone_codes = [make_request('GET', '/check-if-user-exists', params={"userId": user_id})[0] for _ in range(8)]
+
+    print(f"Backend: {DATABASE_BACKEND}, In {DB_FILE.name}: {in_file}")
+    print(f"Status Codes: register {register_code}, exists {exists_codes}, update {update_code}, get {get_code}, delete {delete_code}, exists after {gone_codes}")
+    success = (
+        register_code == 201
+        and exists_codes == [200] * 8
+        and update_code == 200
+        and read_back
+        and delete_code == 200
+        and gone_codes == [404] * 8
+        and (in_file is None or in_file == (DATABASE_BACKEND == "sqlite"))
+    )
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("storage_backend", success, f"Expected the user registered, read back, deleted and stored where {DATABASE_BACKEND} keeps it")
+    return success
+
+# =============================================================================
+# ICON TESTS
+# =============================================================================
+
+def test_icon_serving():
+    """Test that icons are served with an ETag, revalidated with 304, and cached forever under their ?v= hash"""
+    print("\n=== Testing Icon Serving ===")
+
+    try:
+        response = requests.get(f"{BASE_URL}/icons/python.png")
+        etag = response.headers.get('ETag', '')
+        content_hash = etag.removeprefix('W/').strip('"')
+        not_modified = requests.get(f"{BASE_URL}/icons/python.png", headers={"If-None-Match": etag})
+        versioned = requests.get(f"{BASE_URL}/icons/python.png", params={"v": content_hash})
+        missing = requests.get(f"{BASE_URL}/icons/not-a-real-language-{random.randint(100000, 999999)}.png")
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed: {e}")
+        log_test_result("icon_serving", False, f"Request failed: {e}")
+        return False
+
+    print(f"Status Codes: {response.status_code}, revalidated {not_modified.status_code}, versioned {versioned.status_code}, missing {missing.status_code}")
+    print(f"ETag: {etag}")
+    print(f"Versioned Cache-Control: {versioned.headers.get('Cache-Control')}")
+    success = (
+        response.status_code == 200
+        and response.headers.get('Content-Type') == 'image/png'
+        and response.content.startswith(b'\x89PNG')
+        and bool(content_hash)
+        and not_modified.status_code == 304
+        and 'immutable' in versioned.headers.get('Cache-Control', '')
+        and 'immutable' not in response.headers.get('Cache-Control', '')
+        and missing.status_code == 404
+    )
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("icon_serving", success, "Expected a PNG with an ETag, 304 on revalidation, immutable caching with ?v= and 404 for unknown icons")
+    return success
+
+def test_resolve_icons():
+    """Test that /resolve-icons streams one icon per file, in order, and rejects a malformed list"""
+    print("\n=== Testing Resolve Icons ===")
+
+    files = [
+        {"language": "python", "fileName": "main.py"},
+        {"language": "", "fileName": "Dockerfile"},
+        {"language": "python", "fileName": "main.py"},
+    ]
+
+    try:
+        response = requests.post(f"{BASE_URL}/resolve-icons", json={"files": files})
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+        print(f"Request failed: {e}")
+        log_test_result("resolve_icons", False, f"Request failed: {e}")
+        return False
+
+    invalid_code, invalid = make_request('POST', '/resolve-icons', {"files": [{"language": 42}]})
+
+    print(f"Status Code: {response.status_code}")
+    print(f"Lines: {lines}")
+    print(f"Invalid Status Code: {invalid_code}")
+    success = (
+        response.status_code == 200
+        and response.headers.get('Content-Type', '').startswith('application/x-ndjson')
+        and [line.get('fileName') for line in lines] == [item['fileName'] for item in files]
+        and all(line.get('icon') for line in lines)
+        and lines[0] == lines[2]
+        and invalid_code == 400 and 'error' in invalid
+    )
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("resolve_icons", success, "Expected one icon line per file in order, and 400 for a malformed list")
+    return success
+
+def test_icon_variants():
+    """Test the /icons/<size>/ variants from tools/optimize_icons.py, and that iconSize picks the smallest one at least that big"""
+    print("\n=== Testing Icon Variants ===")
+
+    #* the sizes come from the build next to this script, the server has to serve the same one
+    manifest_file = script_dir / "assets" / "build" / "icons" / "manifest.json"
+    if not manifest_file.exists():
+        print("Result: SKIPPED (tools/optimize_icons.py hasn't been run)")
+        log_test_result("icon_variants", True, "Skipped, no icon build")
+        return True
+
+    manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+    sizes = manifest["sizes"]
+    variants = manifest["icons"]["python"]["variants"]
+
+    def png_size(content: bytes) -> Tuple[int, int]:
+        # width and height from the IHDR chunk right after the signature
+        return int.from_bytes(content[16:20], "big"), int.from_bytes(content[20:24], "big")
+
+    failures = []
+    try:
+        for size in sizes:
+            response = requests.get(f"{BASE_URL}/icons/{size}/python.png")
+            if (
+                response.status_code != 200
+                or not response.content.startswith(b'\x89PNG')
+                or png_size(response.content) != (size, size)
+                or response.headers.get('ETag', '').removeprefix('W/').strip('"') != variants[str(size)]["hash"]
+            ):
+                failures.append(f"{size} px: {response.status_code} {response.headers.get('ETag')}")
+
+        unbuilt = requests.get(f"{BASE_URL}/icons/{max(sizes) + 1}/python.png")
+        if unbuilt.status_code != 404:
+            failures.append(f"{max(sizes) + 1} px (not built): {unbuilt.status_code}")
+
+        # one pixel over the smallest variant has to get the next one up, never a smaller one
+        wanted = sizes[0] + 1
+        expected = next((size for size in sizes if size >= wanted), None)
+        status_code, response = make_request('GET', '/get-status', params={"userId": REGISTERED_USER_ID, "iconSize": str(wanted)})
+        _, plain = make_request('GET', '/get-status', params={"userId": REGISTERED_USER_ID})
+        icon_url = response.get('status', {}).get('languageIcon', '')
+        if is_rate_limited(status_code, response):
+            print("/get-status is rate limited, iconSize not checked")
+        elif icon_url.startswith("https://raw.githubusercontent.com/"):
+            # without ICON_BASE_URL the icons aren't self-hosted, iconSize can't change anything
+            if icon_url != plain.get('status', {}).get('languageIcon'):
+                failures.append(f"iconSize changed a raw.githubusercontent.com URL: {icon_url}")
+        elif expected is not None:
+            path = icon_url[icon_url.index("/icons/"):]
+            variant = requests.get(f"{BASE_URL}{path}")
+            if not path.startswith(f"/icons/{expected}/") or variant.status_code != 200 or png_size(variant.content) != (expected, expected):
+                failures.append(f"iconSize={wanted}: {icon_url} ({variant.status_code})")
+    except (requests.exceptions.RequestException, ValueError) as e:
+        failures.append(f"Request failed: {e}")
+
+    print(f"Sizes: {sizes}")
+    print(f"Failures: {failures}")
+    success = not failures
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("icon_variants", success, f"Expected each built size at its exact dimensions and iconSize rounded up to one, got {failures}")
+    return success
+
+def test_icon_map_reload():
+    """Test that every worker picks up a changed .map.json within ICON_MAP_RELOAD_S, and keeps the previous map if the new one is broken"""
+    print("\n=== Testing Icon Map Reload ===")
+
+    #* edits the map next to this script, the server has to read the same file
+    map_file = script_dir / "assets" / "icons" / ".map.json"
+    if ICON_MAP_RELOAD_S <= 0 or not map_file.exists():
+        print("Result: SKIPPED (reloading is off or there's no local icon map)")
+        log_test_result("icon_map_reload", True, "Skipped, no reloadable icon map")
+        return True
+
+    language = f"test-language-{random.randint(100000, 999999)}"
+    timeout = ICON_MAP_RELOAD_S * 2 + 5
+
+    limited = False
+
+    def icons() -> set:
+        # asked several times, so with several workers each one has to have reloaded
+        nonlocal limited
+        found = set()
+        for _ in range(8):
+            try:
+                response = requests.post(f"{BASE_URL}/resolve-icons", json={"files": [{"language": language, "fileName": ""}]})
+                if response.status_code == 429:
+                    limited = True
+                    return found
+                found.add(json.loads(response.text.splitlines()[0]).get('icon', '').split('?')[0].rsplit('/', 1)[-1])
+            except (requests.exceptions.RequestException, json.JSONDecodeError, IndexError):
+                found.add(None)
+        return found
+
+    def wait_for(icon: str) -> bool:
+        deadline = time.time() + timeout
+        while icons() != {icon}:
+            if limited or time.time() >= deadline:
+                return False
+            time.sleep(0.5)
+        return True
+
+    original = map_file.read_bytes()
+    icon_map = json.loads(original)
+    # an invalid /regex/i pattern is only skipped, the rest of the map still has to load
+    icon_map["KNOWN_LANGUAGES"].insert(0, {"language": language, "image": "rust"})
+    icon_map["KNOWN_EXTENSIONS"][f"/[{language}/i"] = {"image": "rust"}
+
+    try:
+        map_file.write_text(json.dumps(icon_map, indent="\t"), encoding="utf-8")
+        added = wait_for("rust.png")
+
+        # a map that can't be parsed is ignored
+        map_file.write_text("{ not json", encoding="utf-8")
+        time.sleep(ICON_MAP_RELOAD_S * 2 + 0.5)
+        kept = icons() == {"rust.png"}
+    finally:
+        map_file.write_bytes(original)
+    removed = wait_for("vscode.png")
+
+    if limited:
+        print("Result: SKIPPED (/resolve-icons is rate limited)")
+        log_test_result("icon_map_reload", True)
+        return True
+
+    print(f"Reload Interval: {ICON_MAP_RELOAD_S}s")
+    print(f"Added: {added}, Kept After A Broken Map: {kept}, Removed Again: {removed}")
+    success = added and kept and removed
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("icon_map_reload", success, "Expected the new language on every worker, the map kept through a broken file, and gone after restoring it")
+    return success
+
+# =============================================================================
+# HISTORY TESTS
+# =============================================================================
+
+def test_history_counts_heartbeats():
+    """Test that heartbeats are written to the history, by checking the time between two of them shows up in /get-stats"""
+    print("\n=== Testing History (Heartbeats Counted) ===")
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {REGISTERED_USER_TOKEN}"
+    }
+    language = f"history-test-{random.randint(100000, 999999)}"
+
+    #* the server needs HISTORY_ENABLED=true
+    status_code, response = make_request('GET', '/get-stats', params={"userId": REGISTERED_USER_ID, "range": "today"})
+    if status_code == 404 and 'raw_response' in response:
+        print("Result: SKIPPED (history is disabled on this server)")
+        log_test_result("history_counts_heartbeats", True, "Skipped, history not enabled")
+        return True
+
+    time.sleep(1.1)  # only the first heartbeat of a user per second is kept, and the earlier tests just sent one
+    make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, "language": language, "details": "first"}, headers)
+    time.sleep(2)
+    make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, "language": language, "details": "second"}, headers)
+    time.sleep(1.5)  # the history is written in the background every HISTORY_FLUSH_MS (1000 by default)
+
+    status_code, response = make_request('GET', '/get-stats', params={"userId": REGISTERED_USER_ID, "range": "today"})
+
+    seconds = next((item.get('seconds', 0) for item in response.get('languages', []) if item.get('name') == language), 0)
+    print(f"Status Code: {status_code}")
+    print(f"Seconds Counted For {language}: {seconds}")
+    success = status_code == 200 and seconds >= 1
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("history_counts_heartbeats", success, f"Expected the ~2 s between the heartbeats to be counted, got {seconds}")
+    return success
+
+def test_get_stats():
+    """Test the /get-stats response shape, custom ranges, and errors for a bad range or an unknown user"""
+    print("\n=== Testing Get Stats ===")
+
+    status_code, response = make_request('GET', '/get-stats', params={"userId": REGISTERED_USER_ID, "range": "14d"})
+
+    #* the server needs HISTORY_ENABLED=true
+    if status_code == 404 and 'raw_response' in response:
+        print("Result: SKIPPED (history is disabled on this server)")
+        log_test_result("get_stats", True, "Skipped, history not enabled")
+        return True
+
+    bad_range, _ = make_request('GET', '/get-stats', params={"userId": REGISTERED_USER_ID, "range": "forever"})
+    unknown_user, _ = make_request('GET', '/get-stats', params={"userId": TEST_USER_ID_RANDOM})
+
+    print(f"Status Code: {status_code}")
+    print(f"Response: {response}")
+    print(f"Bad Range: {bad_range}, Unknown User: {unknown_user}")
+    expected_keys = {'user_id', 'range', 'from', 'to', 'total_seconds', 'languages', 'workspaces', 'git_branches'}
+    success = (
+        status_code == 200
+        and expected_keys.issubset(response)
+        and response.get('range') == '14d'
+        and isinstance(response.get('total_seconds'), int)
+        and bad_range == 400
+        and unknown_user == 404
+    )
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("get_stats", success, f"Expected 200 with the stats, 400 for a bad range and 404 for an unknown user, got {status_code}/{bad_range}/{unknown_user}")
+    return success
+
+# =============================================================================
+# STREAM TESTS
+# =============================================================================
+
+def test_stream_status():
+    """Test that /stream-status starts with the current status and then pushes a change as it happens"""
+    print("\n=== Testing Stream Status ===")
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {REGISTERED_USER_TOKEN}"
+    }
+    details = f"Stream test {random.randint(100000, 999999)}"
+    events = []
+
+    try:
+        with requests.get(f"{BASE_URL}/stream-status", params={"userId": REGISTERED_USER_ID}, stream=True, timeout=(5, 20)) as response:
+            #* the server needs STATUS_BUS_ENABLED=true
+            if response.status_code == 404 and not response.headers.get('Content-Type', '').startswith('application/json'):
+                print("Result: SKIPPED (the status bus is disabled on this server)")
+                log_test_result("stream_status", True, "Skipped, status bus not enabled")
+                return True
+
+            print(f"Status Code: {response.status_code}")
+            deadline = time.time() + 15
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if line.startswith('data: '):
+                    events.append(json.loads(line[len('data: '):]))
+                    if len(events) == 1:  # the current status, now change it
+                        make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, "details": details, "language": "python"}, headers)
+                    elif events[-1].get('status', {}).get('details') == details:
+                        break
+                if time.time() > deadline:
+                    break
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed: {e}")
+
+    print(f"Events: {events}")
+    success = (
+        len(events) >= 2
+        and events[0].get('user_id') == REGISTERED_USER_ID
+        and events[-1].get('status', {}).get('details') == details
+    )
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("stream_status", success, "Expected the current status first and then the change")
+    return success
+
+# =============================================================================
+# WEBHOOK TESTS
+# =============================================================================
+
+def start_webhook_receiver() -> Tuple[HTTPServer, list]:
+    """Local HTTP server that records every POST it gets as (headers, body)"""
+    received = []
+
+    class Receiver(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            received.append((dict(self.headers), body))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Receiver)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received
+
+def test_webhook_delivery():
+    """Test that status changes are POSTed, signed, to a registered webhook, whichever worker handles them"""
+    print("\n=== Testing Webhook Delivery ===")
+
+    server, received = start_webhook_receiver()
+    url = f"http://127.0.0.1:{server.server_address[1]}/hook"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {REGISTERED_USER_TOKEN}"
+    }
+
+    try:
+        # heartbeats before registering, so every worker has looked up (and may cache) that the user has no webhooks
+        for _ in range(8):
+            make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, "details": "Before the webhook", "language": "python"}, headers)
+
+        status_code, response = make_request('POST', '/register-webhook', {"userId": REGISTERED_USER_ID, "url": url}, headers)
+        print(f"Register Status Code: {status_code}")
+        print(f"Register Response: {response}")
+
+        #* the server needs WEBHOOKS_ENABLED=true, and WEBHOOK_ALLOW_PRIVATE=true to send to localhost
+        if status_code == 404 or (status_code == 400 and 'public address' in response.get('error', '')):
+            print("Result: SKIPPED (webhooks are disabled or can't reach localhost on this server)")
+            log_test_result("webhook_delivery", True, "Skipped, webhooks not enabled for localhost")
+            return True
+
+        if status_code != 201 or 'secret' not in response:
+            print("Result: FAIL")
+            log_test_result("webhook_delivery", False, f"Expected 201 for webhook registration, got {status_code}")
+            return False
+
+        # one change per request, right after registering, so they land on different workers
+        sent = [f"Webhook test {random.randint(100000, 999999)} #{i}" for i in range(8)]
+        for details in sent:
+            make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, "details": details, "language": "python"}, headers)
+
+        delivered: list = []
+        signed = True
+        deadline = time.time() + 15
+        while time.time() < deadline:
+            for request_headers, body in received[len(delivered):]:
+                expected = "sha256=" + hmac.new(response['secret'].encode(), body, hashlib.sha256).hexdigest()
+                signed = signed and hmac.compare_digest(request_headers.get('X-Webhook-Signature', ''), expected)
+                delivered.append([event.get('status', {}).get('details') for event in json.loads(body).get('events', [])])
+            if set(sent) <= {details for batch in delivered for details in batch}:
+                break
+            time.sleep(0.1)
+
+        missing = set(sent) - {details for batch in delivered for details in batch}
+        print(f"Delivered: {len(delivered)} requests, missing {len(missing)} of {len(sent)} changes")
+        success = signed and bool(delivered) and not missing
+
+        status_code, _ = make_request('DELETE', '/delete-webhook', {"userId": REGISTERED_USER_ID, "url": url}, headers)
+        success = success and status_code == 200
+
+        print(f"Result: {'PASS' if success else 'FAIL'}")
+        log_test_result("webhook_delivery", success, "Expected signed deliveries of every change and 200 on delete")
+        return success
+    finally:
+        server.shutdown()
+
+# =============================================================================
+# GROUP TESTS
+# =============================================================================
+
+def test_group_status():
+    """Test creating a group, seeing the member online in /group-status, and leaving it"""
+    print("\n=== Testing Group Status ===")
+
+    group = f"test-group-{random.randint(100000, 999999)}"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {REGISTERED_USER_TOKEN}"
+    }
+
+    status_code, response = make_request('POST', '/join-group', {"userId": REGISTERED_USER_ID, "group": group}, headers)
+    print(f"Join Status Code: {status_code}")
+    print(f"Join Response: {response}")
+
+    #* the server needs GROUPS_ENABLED=true
+    if status_code == 404 and 'raw_response' in response:
+        print("Result: SKIPPED (groups are disabled on this server)")
+        log_test_result("group_status", True, "Skipped, groups not enabled")
+        return True
+
+    if status_code != 201 or 'inviteCode' not in response:
+        print("Result: FAIL")
+        log_test_result("group_status", False, f"Expected 201 for creating a group, got {status_code}")
+        return False
+
+    make_request('POST', '/update-status', {"userId": REGISTERED_USER_ID, "language": "python", "isIdling": False}, headers)
+
+    #* without credentials only the counts, the member IDs would be enough to read their statuses
+    status_code, summary = make_request('GET', '/group-status', params={"group": group})
+    print(f"Group Status Code: {status_code}")
+    print(f"Group Status: {summary}")
+    success = (
+        status_code == 200
+        and 'online' not in summary and 'offline' not in summary
+        and summary.get('counts') == {'online': 1, 'idle': 0, 'offline': 0}
+        and summary.get('top_languages') == [{'name': 'python', 'members': 1}]
+    )
+
+    params = {"group": group, "userId": REGISTERED_USER_ID}
+    status_code, _ = make_request('GET', '/group-status', headers={"Authorization": f"Bearer {INVALID_AUTH_TOKEN}"}, params=params)
+    success = success and status_code == 401
+
+    status_code, summary = make_request('GET', '/group-status', headers=headers, params=params)
+    print(f"Member Group Status: {summary}")
+    success = success and status_code == 200 and summary.get('online') == [REGISTERED_USER_ID] and summary.get('offline') == []
+
+    # asked several times so every worker has the group's rollup loaded before it's deleted
+    codes = [make_request('GET', '/group-status', params={"group": group})[0] for _ in range(8)]
+    success = success and codes == [200] * 8
+
+    status_code, _ = make_request('DELETE', '/leave-group', {"userId": REGISTERED_USER_ID, "group": group}, headers)
+    success = success and status_code == 200
+
+    # the last member leaving deletes the group, every worker has to notice
+    codes = [make_request('GET', '/group-status', params={"group": group})[0] for _ in range(8)]
+    print(f"After Leaving Status Codes: {codes}")
+    success = success and codes == [404] * 8
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("group_status", success, "Expected counts for anyone, member IDs only for members, and the group gone after leaving")
+    return success
+
+# =============================================================================
+# ADMIN TESTS
+# =============================================================================
+
+def test_admin_telemetry():
+    """Test the admin telemetry query rejects a wrong token and counts this test run's requests"""
+    print("\n=== Testing Admin Telemetry ===")
+
+    if not ADMIN_TOKEN:
+        print("Result: SKIPPED (no --admin-token given)")
+        log_test_result("admin_telemetry", True, "Skipped, no admin token")
+        return True
+
+    status_code, _ = make_request('GET', '/admin/telemetry', headers={"Authorization": f"Bearer {INVALID_AUTH_TOKEN}"})
+    rejected = status_code == 401
+
+    params = {"from": str(int(time.time()) - 3600), "bucket": "minute", "top": "5"}
+    status_code, response = make_request('GET', '/admin/telemetry', headers={"Authorization": f"Bearer {ADMIN_TOKEN}"}, params=params)
+
+    print(f"Status Code: {status_code}")
+    print(f"Totals: {response.get('totals')}")
+    print(f"Top Endpoints: {response.get('top_endpoints')}")
+
+    endpoints = [item.get('endpoint') for item in response.get('top_endpoints', [])]
+    success = (
+        rejected
+        and status_code == 200
+        and response.get('totals', {}).get('requests', 0) > 0
+        and len(response.get('series', [])) >= 60
+        and '/update-status' in endpoints
+    )
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("admin_telemetry", success, f"Expected 401 for a wrong token and 200 with this run's requests, got {status_code}")
+    return success
+
+def test_forwarded_for():
+    """Test the client IP comes from X-Forwarded-For only for the server's TRUSTED_PROXY_HOPS (the IPs show up in admin telemetry)"""
+    print("\n=== Testing X-Forwarded-For ===")
+
+    if not ADMIN_TOKEN:
+        print("Result: SKIPPED (no --admin-token given)")
+        log_test_result("forwarded_for", True, "Skipped, no admin token")
+        return True
+
+    headers = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
+    params = {"from": str(int(time.time()) - 60), "to": str(int(time.time()) + 60), "bucket": "minute", "top": "100"}
+
+    # addresses from the documentation ranges no earlier run has used yet, so only this test's requests can list them
+    _, response = make_request('GET', '/admin/telemetry', headers=headers, params=params)
+    seen = {item.get('ip') for item in response.get('top_ips', [])}
+    spoofed = next(ip for ip in (f"198.51.100.{n}" for n in random.sample(range(1, 255), 254)) if ip not in seen)  # made up by the client
+    proxied = next(ip for ip in (f"203.0.113.{n}" for n in random.sample(range(1, 255), 254)) if ip not in seen)  # added by the one "proxy"
+    # the hops counted from the right, 0 has to ignore the header entirely
+    expected = {0: None, 1: proxied, 2: spoofed}.get(TRUSTED_PROXY_HOPS)
+
+    for _ in range(3):
+        make_request('GET', '/', headers={"X-Forwarded-For": f"{spoofed}, {proxied}"})
+
+    status_code, response = make_request('GET', '/admin/telemetry', headers=headers, params=params)
+    ips = [item.get('ip') for item in response.get('top_ips', [])]
+
+    print(f"Status Code: {status_code}")
+    print(f"Trusted Hops: {TRUSTED_PROXY_HOPS}, Expected IP: {expected}")
+    print(f"Top IPs: {ips}")
+
+    success = (
+        status_code == 200
+        and all(ip not in ips for ip in (spoofed, proxied) if ip != expected)
+        and (expected is None or expected in ips)
+    )
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("forwarded_for", success, f"Expected {expected or 'the connecting IP'} with {TRUSTED_PROXY_HOPS} trusted hops, got {ips}")
+    return success
+
+def test_admin_metrics():
+    """Test the admin metrics rejects a wrong token and shows the requests this test run made"""
+    print("\n=== Testing Admin Metrics ===")
+
+    if not ADMIN_TOKEN:
+        print("Result: SKIPPED (no --admin-token given)")
+        log_test_result("admin_metrics", True, "Skipped, no admin token")
+        return True
+
+    status_code, _ = make_request('GET', '/admin/metrics', headers={"Authorization": f"Bearer {INVALID_AUTH_TOKEN}"})
+    rejected = status_code == 401
+
+    # a couple of requests the answering worker has definitely seen
+    for _ in range(3):
+        make_request('GET', '/get-status', params={"userId": REGISTERED_USER_ID})
+    status_code, response = make_request('GET', '/admin/metrics', headers={"Authorization": f"Bearer {ADMIN_TOKEN}"})
+
+    print(f"Status Code: {status_code}")
+    print(f"/get-status: {response.get('routes', {}).get('/get-status')}")
+
+    get_status = response.get('routes', {}).get('/get-status', {})
+    success = (
+        rejected
+        and status_code == 200
+        and isinstance(response.get('pid'), int)
+        and get_status.get('requests', 0) >= 1
+        and get_status.get('avg_ms', -1) >= 0
+    )
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("admin_metrics", success, f"Expected 401 for a wrong token and 200 with /get-status counted, got {status_code}")
+    return success
+
+def test_admin_cache_stats():
+    """Test that repeated lookups of an unknown user ID show up as suppressed in the negative cache stats"""
+    print("\n=== Testing Admin Cache Stats ===")
+
+    if not ADMIN_TOKEN:
+        print("Result: SKIPPED (no --admin-token given)")
+        log_test_result("admin_cache_stats", True, "Skipped, no admin token")
+        return True
+
+    headers = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
+    _, before = make_request('GET', '/admin/metrics', headers=headers)
+    if 'negative_cache' not in before.get('caches', {}):
+        print("Result: SKIPPED (NEGATIVE_CACHE_TTL_S is 0 or the backend has no negative cache)")
+        log_test_result("admin_cache_stats", True, "Skipped, no negative cache")
+        return True
+
+    unknown_user = str(random.randint(1000000000000000, 9999999999999999))
+    codes = [make_request('GET', '/get-status', params={"userId": unknown_user})[0] for _ in range(3)]
+    status_code, after = make_request('GET', '/admin/metrics', headers=headers)
+
+    suppressed = after.get('caches', {}).get('negative_cache', {}).get('suppressed', 0) - before['caches']['negative_cache']['suppressed']
+    print(f"Lookups: {codes}, suppressed by the negative cache: {suppressed}")
+
+    # the first lookup goes to the database, the other two are answered from the cache
+    success = status_code == 200 and codes == [404, 404, 404] and suppressed >= 2
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("admin_cache_stats", success, f"Expected at least 2 suppressed lookups, got {suppressed}")
+    return success
+
 # =============================================================================
 # CHECK IF USER EXISTS TESTS
 # =============================================================================
@@ -498,7 +1541,9 @@ def test_check_user_exists_true():
     
     params = {"userId": REGISTERED_USER_ID}  # Use the newly registered user
     
-    status_code, response = make_request('GET', '/check-if-user-exists', params=params)
+    # asked several times, so with several workers each one has to know about the user
+    results = [make_request('GET', '/check-if-user-exists', params=params) for _ in range(8)]
+    status_code, response = next((r for r in results if r[0] != 200 or r[1].get('exists') is not True), results[0])
     
     success = status_code == 200 and response.get('exists') == True
     
@@ -695,6 +1740,101 @@ def test_delete_user_no_auth():
     log_test_result("delete_user_no_auth", success, f"Expected 401 for missing auth, got {status_code}")
     return success
 
+# =============================================================================
+# RATE LIMIT TESTS (at the very end, they use up this client's limits)
+# =============================================================================
+
+def test_reregistered_user_old_token():
+    """Test that after deleting and registering the same ID again only the new token works, on every worker"""
+    print("\n=== Testing Re-registered User (Old Token) ===")
+
+    user_id = str(random.randint(1000000000000000, 9999999999999999))
+    old_token = f"test-token-{random.randint(100000, 999999)}"
+    new_token = f"test-token-{random.randint(100000, 999999)}"
+
+    def auth(token: str) -> Dict[str, str]:
+        return {"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+
+    status_code, response = make_request('POST', '/register-user', {"userId": user_id}, auth(old_token))
+    if is_rate_limited(status_code, response):
+        print("Result: SKIPPED (registration is rate limited)")
+        log_test_result("reregistered_user_old_token", True)
+        return True
+
+    # several heartbeats so every worker has checked (and with TOKEN_CACHE_TTL_S, cached) the old token
+    for _ in range(8):
+        make_request('POST', '/update-status', {"userId": user_id, "appName": "Visual Studio Code"}, auth(old_token))
+
+    make_request('DELETE', '/delete-user', {"userId": user_id}, auth(old_token))
+    register_code, response = make_request('POST', '/register-user', {"userId": user_id}, auth(new_token))
+    if is_rate_limited(register_code, response):
+        print("Result: SKIPPED (registration is rate limited)")
+        log_test_result("reregistered_user_old_token", True)
+        return True
+
+    old_codes = [make_request('POST', '/update-status', {"userId": user_id, "appName": "Visual Studio Code"}, auth(old_token))[0] for _ in range(8)]
+    new_code, _ = make_request('POST', '/update-status', {"userId": user_id, "appName": "Visual Studio Code"}, auth(new_token))
+    make_request('DELETE', '/delete-user', {"userId": user_id}, auth(new_token))
+
+    print(f"Register Again Status Code: {register_code}")
+    print(f"Old Token Status Codes: {old_codes}")
+    print(f"New Token Status Code: {new_code}")
+    success = register_code == 201 and old_codes == [401] * 8 and new_code == 200
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("reregistered_user_old_token", success, "Expected the old token to be rejected by every worker after registering again")
+    return success
+
+def test_rate_limiter_storage():
+    """Test that the configured limiter storage (memory, SQLite, memcached...) enforces /trigger-rate-limit's 1 per minute"""
+    print("\n=== Testing Rate Limiter Storage ===")
+
+    first_code, first = make_request('GET', '/trigger-rate-limit')
+    print(f"First Status Code: {first_code}")
+
+    #* the route only exists with RATE_LIMITING enabled
+    if first_code == 404 and 'raw_response' in first:
+        print("Result: SKIPPED (rate limiting is disabled on this server)")
+        log_test_result("rate_limiter_storage", True, "Skipped, rate limiting not enabled")
+        return True
+
+    second_code, second = make_request('GET', '/trigger-rate-limit')
+    print(f"Second Status Code: {second_code}")
+    print(f"Second Response: {second}")
+
+    # the first one is 429 too if the tests ran less than a minute ago
+    success = first_code in (200, 429) and is_rate_limited(second_code, second)
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("rate_limiter_storage", success, f"Expected 429 for the second request within a minute, got {second_code}")
+    return success
+
+def test_cost_aware_limits():
+    """Test that lookups of unknown users use up /get-status's 45 per minute about three times as fast as normal ones"""
+    print("\n=== Testing Cost-Aware Rate Limits ===")
+
+    # at the normal cost this client would have at least 45 - (earlier /get-status calls) left; a miss costs 3x
+    limited_after = None
+    for i in range(30):
+        status_code, response = make_request('GET', '/get-status', params={"userId": str(random.randint(1000000000000000, 9999999999999999))})
+        if is_rate_limited(status_code, response):
+            limited_after = i
+            break
+
+    if limited_after is None:
+        status_code, response = make_request('GET', '/trigger-rate-limit')
+        if status_code == 404 and 'raw_response' in response:
+            print("Result: SKIPPED (rate limiting is disabled on this server)")
+            log_test_result("cost_aware_limits", True, "Skipped, rate limiting not enabled")
+            return True
+
+    print(f"Rate limited after {limited_after} unknown user lookups")
+    success = limited_after is not None
+
+    print(f"Result: {'PASS' if success else 'FAIL'}")
+    log_test_result("cost_aware_limits", success, "Expected unknown user lookups to be rate limited within 30 requests")
+    return success
+
 # =============================================================================
 # MAIN TEST RUNNER
 # =============================================================================
@@ -757,6 +1897,32 @@ Examples:
         help='Base URL for the API (default: http://localhost:5000)'
     )
     
+    parser.add_argument(
+        '--admin-token',
+        default=os.getenv('ADMIN_TOKEN'),
+        help='The server\'s ADMIN_TOKEN, enables the admin endpoint tests (default: $ADMIN_TOKEN)'
+    )
+    
+    parser.add_argument(
+        '--database-backend',
+        default=DATABASE_BACKEND,
+        help='The server\'s DATABASE_BACKEND, only "sqlite" stores users in data/user_statuses.db (default: $DATABASE_BACKEND or sqlite)'
+    )
+    
+    parser.add_argument(
+        '--trusted-proxy-hops',
+        type=int,
+        default=TRUSTED_PROXY_HOPS,
+        help='The server\'s TRUSTED_PROXY_HOPS, which X-Forwarded-For entry the client IP should come from (default: $TRUSTED_PROXY_HOPS or 0)'
+    )
+    
+    parser.add_argument(
+        '--icon-map-reload-s',
+        type=float,
+        default=ICON_MAP_RELOAD_S,
+        help='The server\'s ICON_MAP_RELOAD_S, how long the icon map reload test waits (default: $ICON_MAP_RELOAD_S or 5, 0 skips it)'
+    )
+    
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -770,8 +1936,12 @@ def main():
     args = parse_arguments()
     
     # Set global URL
-    global BASE_URL
+    global BASE_URL, ADMIN_TOKEN, TRUSTED_PROXY_HOPS, DATABASE_BACKEND, ICON_MAP_RELOAD_S
     BASE_URL = args.url.rstrip('/')
+    ADMIN_TOKEN = args.admin_token
+    TRUSTED_PROXY_HOPS = args.trusted_proxy_hops
+    DATABASE_BACKEND = args.database_backend.lower()
+    ICON_MAP_RELOAD_S = args.icon_map_reload_s
     
     print("=" * 60)
     print("VSCODE STATUS API - COMPREHENSIVE TEST SUITE")
@@ -799,6 +1969,12 @@ def main():
         # Health check first
         test_health_check,
         
+        # Startup tests
+        test_lazy_startup,
+        
+        # Not registered yet (checks the negative cache doesn't outlive registration)
+        test_unknown_user_before_register,
+        
         # Register user tests
         test_register_user_success,
         test_register_user_already_exists,
@@ -807,15 +1983,49 @@ def main():
         
         # Update status tests
         test_update_status_success,
+        test_tokens_hashed_at_rest,
         test_update_status_user_not_found,
         test_update_status_wrong_token,
         test_update_status_no_userid,
         test_update_status_no_auth,
+        test_update_status_invalid_body,
         
         # Get status tests
         test_get_status_success,
         test_get_status_user_not_found,
         test_get_status_no_userid,
+        test_get_status_read_back,
+        test_unchanged_status_keeps_last_updated,
+        test_status_field_types,
+        test_json_responses,
+        
+        # Storage backend tests
+        test_storage_backend,
+        
+        # Icon tests
+        test_icon_serving,
+        test_resolve_icons,
+        test_icon_variants,
+        test_icon_map_reload,
+        
+        # History tests (skipped unless the server has them enabled)
+        test_history_counts_heartbeats,
+        test_get_stats,
+        
+        # Stream tests (skipped unless the server has the status bus enabled)
+        test_stream_status,
+        
+        # Webhook tests (skipped unless the server has them enabled)
+        test_webhook_delivery,
+        
+        # Group tests (skipped unless the server has them enabled)
+        test_group_status,
+        
+        # Admin tests (skipped without --admin-token)
+        test_admin_telemetry,
+        test_forwarded_for,
+        test_admin_metrics,
+        test_admin_cache_stats,
         
         # Check user exists tests
         test_check_user_exists_true,
@@ -828,6 +2038,11 @@ def main():
         test_delete_user_wrong_token,
         test_delete_user_no_userid,
         test_delete_user_no_auth,
+        test_reregistered_user_old_token,
+        
+        # Rate limit tests (skipped unless the server has rate limiting enabled)
+        test_rate_limiter_storage,
+        test_cost_aware_limits,
     ]
     
     print("\n" + "=" * 40)
@@ -0,0 +1,71 @@
+"""
+Builds a single sprite sheet of every icon in assets/icons plus a JSON offset index, served at
+/icons/sprite.png and /icons/sprite.json, so a dashboard can load all icons with one request.
+
+Usage (from the repo root, needs `pip install pillow`):
+  python tools/build_icon_sprite.py             # 64 px cells
+  python tools/build_icon_sprite.py --size 32
+Restart the API afterwards so it picks up the new files.
+"""
+import argparse
+import json
+import math
+import sys
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from modules.utils.icon_store import BUILD_DIR, ICONS_DIR, SPRITE_NAME, content_hash  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:
+    sys.exit("Building the sprite sheet needs Pillow: pip install pillow")
+
+
+def build(size: int) -> dict:
+    paths = sorted(ICONS_DIR.glob("*.png"))
+    columns = math.ceil(math.sqrt(len(paths)))
+    rows = math.ceil(len(paths) / columns)
+
+    sheet = Image.new("RGBA", (columns * size, rows * size), (0, 0, 0, 0))
+    offsets: dict[str, list[int]] = {}
+
+    for i, path in enumerate(paths):
+        x, y = (i % columns) * size, (i // columns) * size
+        with Image.open(path) as icon:
+            sheet.paste(icon.convert("RGBA").resize((size, size), Image.Resampling.LANCZOS), (x, y))
+        offsets[path.stem] = [x, y]
+
+    buffer = BytesIO()
+    sheet.save(buffer, format="PNG", optimize=True)
+    data = buffer.getvalue()
+
+    BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    (BUILD_DIR / f"{SPRITE_NAME}.png").write_bytes(data)
+
+    index = {
+        "image": f"/icons/{SPRITE_NAME}.png?v={content_hash(data)}",  # relative to the API's base URL
+        "size": size,
+        "width": columns * size,
+        "height": rows * size,
+        "icons": offsets,  # name -> [x, y] of its size x size cell
+    }
+    (BUILD_DIR / f"{SPRITE_NAME}.json").write_text(json.dumps(index, separators=(",", ":"), sort_keys=True), encoding="utf-8")
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the icon sprite sheet")
+    parser.add_argument("--size", type=int, default=64, help="cell size in pixels")
+    args = parser.parse_args()
+
+    index = build(args.size)
+    sprite_bytes = (BUILD_DIR / f"{SPRITE_NAME}.png").stat().st_size
+    source_bytes = sum(path.stat().st_size for path in ICONS_DIR.glob("*.png"))
+    print(f"{len(index['icons'])} icons -> {index['width']}x{index['height']} sprite, {sprite_bytes / 1024:.0f} KiB (individual files: {source_bytes / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Re-encodes every icon referenced by assets/icons/.map.json losslessly, builds fixed-size
+variants of each one and writes a manifest, then reports how many bytes that saves.
+The API serves the results at /icons/<name>.png and /icons/<size>/<name>.png.
+
+Usage (from the repo root, needs `pip install pillow`):
+  python tools/optimize_icons.py                    # 16, 32 and 64 px variants
+  python tools/optimize_icons.py --sizes 24 48 96
+Restart the API afterwards so it picks up the new files.
+"""
+import argparse
+import json
+import sys
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from modules.utils.icon_store import ICONS_DIR, MANIFEST_FILE, OPTIMIZED_DIR, content_hash  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:
+    sys.exit("Optimizing icons needs Pillow: pip install pillow")
+
+# always used by language_image.get even though .map.json doesn't mention them
+FALLBACK_ICONS: set[str] = {"idle", "vscode"}
+
+
+def referenced_icons() -> list[str]:
+    imgmap = json.loads((ICONS_DIR / ".map.json").read_text(encoding="utf-8"))
+    names = {entry["image"] for entry in imgmap["KNOWN_LANGUAGES"]}
+    names |= {entry["image"] for entry in imgmap["KNOWN_EXTENSIONS"].values()}
+    return sorted(name for name in names | FALLBACK_ICONS if (ICONS_DIR / f"{name}.png").exists())
+
+
+def encode(image: Image.Image) -> bytes:
+    # fully opaque RGBA -> RGB drops the alpha channel without changing a single pixel
+    if image.mode == "RGBA" and image.getextrema()[3] == (255, 255):
+        image = image.convert("RGB")
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True)  # no pnginfo, so metadata chunks are dropped
+    return buffer.getvalue()
+
+
+def optimize(name: str, sizes: list[int]) -> dict:
+    source = ICONS_DIR / f"{name}.png"
+    original = source.read_bytes()
+
+    with Image.open(source) as image:
+        image.load()
+        reencoded = encode(image)
+        data = reencoded if len(reencoded) < len(original) else original  # never worse than the committed file
+        (OPTIMIZED_DIR / f"{name}.png").write_bytes(data)
+
+        entry = {"bytes": len(original), "optimized_bytes": len(data), "hash": content_hash(data), "variants": {}}
+
+        rgba = image.convert("RGBA")
+        for size in sizes:
+            variant = encode(rgba.resize((size, size), Image.Resampling.LANCZOS))
+            (OPTIMIZED_DIR / str(size) / f"{name}.png").write_bytes(variant)
+            entry["variants"][str(size)] = {"bytes": len(variant), "hash": content_hash(variant)}
+
+    return entry
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Optimize the icons and build size variants")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 32, 64], help="variant sizes in pixels")
+    args = parser.parse_args()
+    sizes = sorted(set(args.sizes))
+
+    for size in sizes:
+        (OPTIMIZED_DIR / str(size)).mkdir(parents=True, exist_ok=True)
+
+    icons = {name: optimize(name, sizes) for name in referenced_icons()}
+    MANIFEST_FILE.write_text(json.dumps({"sizes": sizes, "icons": icons}, indent=2, sort_keys=True), encoding="utf-8")
+
+    original = sum(entry["bytes"] for entry in icons.values())
+    optimized = sum(entry["optimized_bytes"] for entry in icons.values())
+    print(f"{len(icons)} icons: {original / 1024:.0f} KiB -> {optimized / 1024:.0f} KiB lossless, saved {(original - optimized) / 1024:.0f} KiB ({(1 - optimized / original) * 100:.1f}%)")
+    for size in sizes:
+        variant = sum(entry["variants"][str(size)]["bytes"] for entry in icons.values())
+        print(f"  {size:>4} px variants: {variant / 1024:>6.0f} KiB, saves {(original - variant) / 1024:.0f} KiB ({(1 - variant / original) * 100:.1f}%) for clients that display icons at that size")
+
+
+if __name__ == "__main__":
+    main()
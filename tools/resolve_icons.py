@@ -0,0 +1,53 @@
+"""
+Resolves icons for many (language, fileName) pairs offline, with the same resolver as the API
+(e.g. to precompute icons for imported history). Reads one pair per line and writes one JSON object
+per line, like POST /resolve-icons.
+
+Input lines are either JSON objects ({"language": "python", "fileName": "main.py"}) or
+"<language>\t<fileName>" (language may be empty).
+
+Usage (from the repo root):
+  python tools/resolve_icons.py files.tsv > icons.ndjson
+  cat files.ndjson | python tools/resolve_icons.py --size 32
+Set ICON_BASE_URL to get self-hosted icon URLs instead of GitHub ones.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Iterator, TextIO
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from modules.utils.language_image import resolve_many  # noqa: E402
+
+
+def read_queries(stream: TextIO) -> Iterator[tuple[str, str]]:
+    for line in stream:
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        if line.lstrip().startswith("{"):
+            item = json.loads(line)
+            yield item.get("language", ""), item.get("fileName", "")
+        else:
+            language, _, file_name = line.rpartition("\t")
+            yield language, file_name
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resolve icon URLs for (language, fileName) pairs")
+    parser.add_argument("input", nargs="?", help="input file (default: stdin)")
+    parser.add_argument("--size", type=int, help="icon size in px, see /get-status iconSize")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") if args.input else sys.stdin as stream:
+        queries = list(read_queries(stream))
+
+    out = sys.stdout
+    for (language, file_name), icon in zip(queries, resolve_many(queries, args.size)):
+        out.write(json.dumps({"fileName": file_name, "icon": icon, "language": language}, separators=(",", ":")) + "\n")
+
+
+if __name__ == "__main__":
+    main()
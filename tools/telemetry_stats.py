@@ -0,0 +1,72 @@
+"""
+Request counts, error rates and the busiest endpoints/IPs from data/telemetry.db, like GET /admin/telemetry
+but without going through the API (and without ADMIN_TOKEN).
+
+--from/--to take unix seconds or ISO 8601 (UTC unless it has an offset) and default to the last 24 hours.
+
+Usage (from the repo root):
+  python tools/telemetry_stats.py
+  python tools/telemetry_stats.py --from 2025-08-01 --to 2025-09-01 --bucket hour --top 20
+  python tools/telemetry_stats.py --from 2025-08-22T12:00 --bucket minute --json > stats.json
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from modules.utils import telemetry_stats  # noqa: E402
+
+
+def parse_time(value: str) -> int:
+    ts = telemetry_stats.parse_time(value)
+    if ts is None:
+        raise argparse.ArgumentTypeError(f"not unix seconds or an ISO 8601 date/time: {value}")
+    return ts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query the request telemetry")
+    parser.add_argument("--from", dest="start", type=parse_time, help="start of the range (default: 24 hours before --to)")
+    parser.add_argument("--to", dest="end", type=parse_time, help="end of the range (default: now)")
+    parser.add_argument("--bucket", choices=list(telemetry_stats.PERIODS), default="hour")
+    parser.add_argument("--top", type=int, default=10, help="how many endpoints/IPs to list")
+    parser.add_argument("--json", action="store_true", help="print the same JSON as /admin/telemetry")
+    args = parser.parse_args()
+
+    end = args.end if args.end is not None else int(time.time())
+    start = args.start if args.start is not None else end - 24 * 3600
+    if start >= end:
+        parser.error("--from must be before --to")
+
+    try:
+        stats = telemetry_stats.query(start, end, args.bucket, args.top)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return
+
+    totals = stats["totals"]
+    print(f"{stats['from']} to {stats['to']}")
+    print(f"{totals['requests']} requests, {totals['client_errors']} 4xx, {totals['server_errors']} 5xx ({totals['error_rate']:.2%} errors)")
+
+    print(f"\n{'per ' + stats['bucket']:<27} {'requests':>9} {'4xx':>7} {'5xx':>7}")
+    for point in stats["series"]:
+        if point["requests"]:
+            print(f"{point['time']:<27} {point['requests']:>9} {point['client_errors']:>7} {point['server_errors']:>7}")
+
+    print(f"\n{'top endpoints':<40} {'requests':>9} {'errors':>8}")
+    for endpoint in stats["top_endpoints"]:
+        print(f"{endpoint['endpoint'][:40]:<40} {endpoint['requests']:>9} {endpoint['error_rate']:>8.2%}")
+
+    print(f"\n{'top IPs':<40} {'requests':>9}")
+    for ip in stats["top_ips"]:
+        print(f"{ip['ip']:<40} {ip['requests']:>9}")
+
+
+if __name__ == "__main__":
+    main()